@@ -1,6 +1,7 @@
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from enum import Enum
+from typing import Dict, Optional
 
 
 class EnvironmentType(str, Enum):
@@ -11,11 +12,30 @@ class EnvironmentType(str, Enum):
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # asyncpg URL for the async routers; derived from DATABASE_URL when unset
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # False serves the async routers from the sync engine in worker threads,
+    # for installs without asyncpg
+    ASYNC_DATABASE_ENABLED: bool = True
     SECRET_KEY: SecretStr
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080
     ENVIRONMENT: EnvironmentType = EnvironmentType.development
     VERSION: str = "1.0.0"
+    # "memory" (in-process trigram index) or "pg_trgm" (needs the GIN index migration)
+    STATION_SEARCH_BACKEND: str = "memory"
+    # Days to keep notifications, keyed "<notification_type>.read",
+    # "<notification_type>.unread", or plain "read"/"unread" as the fallback.
+    # A type and state matching no key is kept forever.
+    NOTIFICATION_RETENTION_DAYS: Dict[str, int] = {
+        "read": 90,
+        "unread": 365,
+        "threshold_alert.read": 30,
+        "forecast_alert.read": 14,
+        "forecast_alert.unread": 30,
+    }
+    # Purged notifications are archived here as gzipped NDJSON; unset skips archiving
+    NOTIFICATION_ARCHIVE_DIR: Optional[str] = None
 
     # Explicit path to .env file
     model_config = SettingsConfigDict(
@@ -1,9 +1,16 @@
-from sqlalchemy import create_engine
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 from .config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+ASYNC_SQLALCHEMY_DATABASE_URL = (
+    settings.ASYNC_DATABASE_URL
+    or make_url(SQLALCHEMY_DATABASE_URL).set(drivername="postgresql+asyncpg")
+)
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
@@ -18,6 +25,53 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+
+def _naive_utc(value):
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _strip_timezones(conn, cursor, statement, parameters, context, executemany):
+    # Timestamp columns are stored as naive UTC. psycopg2 drops the offset of
+    # aware datetimes by itself; asyncpg refuses them, so convert them here.
+    if executemany:
+        parameters = [tuple(map(_naive_utc, row)) for row in parameters]
+    elif parameters:
+        parameters = tuple(map(_naive_utc, parameters))
+    return statement, parameters
+
+
+if settings.ASYNC_DATABASE_ENABLED:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    # Non-blocking engine for the async routers (stations, measurements, notifications)
+    async_engine = create_async_engine(
+        ASYNC_SQLALCHEMY_DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=20,
+        max_overflow=10
+    )
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _strip_timezones, retval=True)
+
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        # Nothing may lazy-load after a commit; responses are built from loaded state
+        expire_on_commit=False
+    )
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+
+# Sessions behind ThreadedSession, configured like AsyncSessionLocal
+ThreadedSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine
+)
+
 Base = declarative_base()
 
 
@@ -33,3 +87,87 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+class ThreadedSession:
+    """
+    Stand-in for AsyncSession when ASYNC_DATABASE_ENABLED is off.
+
+    Offers the awaitable methods the async routers use, each running on a
+    sync Session in a worker thread, so the routes keep the event loop free
+    without asyncpg. Results come back fully buffered, as they do from
+    AsyncSession.
+    """
+
+    def __init__(self, db):
+        self.sync_session = db
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def refresh(self, instance, *args, **kwargs):
+        await run_in_threadpool(self.sync_session.refresh, instance, *args, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+async def get_async_db():
+    """
+    Async counterpart of get_db; queries are awaited instead of blocking the event loop
+    Usage in FastAPI routes:
+    async def some_endpoint(db: AsyncSession = Depends(get_async_db)):
+        ...
+    """
+    if AsyncSessionLocal is None:
+        db = ThreadedSession(ThreadedSessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
+        return
+
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def run_sync_db(fn, *args):
+    """
+    Call fn(session, *args) with a sync session in a worker thread.
+
+    For helpers written against the sync Session (the station caches, bulk
+    ingest, rollups) when called from async routes: they hold threading
+    locks while they query, which must not happen on the event loop.
+    """
+    def call():
+        db = SessionLocal()
+        try:
+            return fn(db, *args)
+        finally:
+            db.close()
+
+    return await run_in_threadpool(call)
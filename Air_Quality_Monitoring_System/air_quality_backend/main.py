@@ -1,3 +1,4 @@
+import logging
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 from .routers import auth, users, stations, measurements, contributions, notifications, forum
@@ -10,6 +11,11 @@ from .routers import (
     notifications
 )
 from .config import settings
+from .database import SessionLocal
+from .utils.leaderboard import reputation_leaderboard
+from .utils.pagination import NEXT_CURSOR_HEADER
+from .utils.reputation import reputation_aggregator
+from .utils.votes import vote_counter
 
 app = FastAPI(
     title="Air Quality Monitoring System API",
@@ -26,6 +32,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include routers (same as before)
@@ -44,6 +51,20 @@ async def startup_event():
     print(f"Starting Air Quality API version {settings.VERSION}")
     print(f"Environment: {settings.ENVIRONMENT}")
     print(f"Database: {settings.DATABASE_URL}")
+    # Rebuild the leaderboard up front; if this fails, the first request loads it
+    try:
+        with SessionLocal() as db:
+            reputation_leaderboard.load(db)
+    except Exception as e:
+        logging.error(f"Leaderboard load error: {str(e)}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Write out vote counter deltas still waiting for their flush
+    vote_counter.flush()
+    # and reputation events recorded since the last fold
+    reputation_aggregator.fold()
 
 
 @app.get("/health", tags=["System"])
@@ -1,7 +1,7 @@
 from sqlalchemy import (
-    Column, Integer, String, ForeignKey,
-    DateTime, Boolean, DECIMAL,
-    JSON, Enum, text
+    Column, Integer, BigInteger, SmallInteger, String, ForeignKey,
+    DateTime, Boolean, DECIMAL, Float,
+    JSON, Enum, text, UniqueConstraint, Index, Computed, DDL, event
 )
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -18,6 +18,26 @@ class NotificationType(enum.Enum):
     forecast_alert = "forecast_alert"
     system_update = "system_update"
 
+class JobStatus(enum.Enum):
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+class VoteTarget(enum.Enum):
+    post = "post"
+    comment = "comment"
+
+class ReputationEventType(enum.Enum):
+    opening_balance = "opening_balance"
+    upvote_received = "upvote_received"
+    upvote_withdrawn = "upvote_withdrawn"
+    comment_posted = "comment_posted"
+    report_verified = "report_verified"
+    report_upheld = "report_upheld"
+    report_false = "report_false"
+    activity = "activity"
+
 class ContributionStatus(enum.Enum):
     pending = "pending"
     approved = "approved"
@@ -60,6 +80,9 @@ class Station(Base):
     updated_at = Column(DateTime, onupdate=func.now())
 
     measurements = relationship("Measurement", back_populates="station")
+    __table_args__ = (
+        Index('ix_stations_name_id', station_name, station_id),
+    )
 
 class Measurement(Base):  # Renamed from TspAqi
     __tablename__ = "measurements"
@@ -76,6 +99,10 @@ class Measurement(Base):  # Renamed from TspAqi
     aqi = Column(Integer)
     source = Column(String(50), nullable=False)
     station = relationship("Station", back_populates="measurements")
+    __table_args__ = (
+        UniqueConstraint('station_id', 'timestamp', name='uix_station_timestamp'),
+        Index('ix_measurements_timestamp_id', timestamp.desc(), measurement_id.desc()),
+    )
 
 class WeatherCondition(Base):
     __tablename__ = "weather_conditions"
@@ -90,6 +117,9 @@ class WeatherCondition(Base):
     weather_condition = Column(String(50))
     measurement_time = Column(DateTime, server_default=func.now())
     created_at = Column(DateTime, server_default=func.now())
+    __table_args__ = (
+        Index('ix_weather_conditions_station_time', station_id, measurement_time),
+    )
 
 class AQIAggregation(Base):
     __tablename__ = "aqi_aggregations"
@@ -107,7 +137,85 @@ class AQIAggregation(Base):
     aggregation_type = Column(String(20), nullable=False)
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime, nullable=False)
+    # Readings behind the bucket, so coarser buckets can be rolled up from finer ones
+    sample_count = Column(Integer, nullable=False, server_default=text('0'))
     created_at = Column(DateTime, server_default=func.now())
+    __table_args__ = (
+        UniqueConstraint(
+            'station_id', 'aggregation_type', 'start_time',
+            name='uix_aggregation_station_type_start'
+        ),
+    )
+
+class MeasurementChange(Base):
+    __tablename__ = "measurement_changes"
+
+    # Written by the triggers below: one row per station and hour a statement
+    # inserted, updated or deleted readings in, within the same transaction
+    change_id = Column(BigInteger, primary_key=True)
+    station_id = Column(Integer, nullable=False)
+    bucket = Column(DateTime, nullable=False)
+    # Readers consume the log by transaction, as for reputation_events
+    txid = Column(
+        BigInteger, nullable=False,
+        server_default=text("CAST(CAST(pg_current_xact_id() AS text) AS bigint)")
+    )
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_measurement_changes_txid', txid),
+    )
+
+MEASUREMENT_CHANGE_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION log_measurement_changes() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO measurement_changes (station_id, bucket)
+            SELECT DISTINCT station_id, date_trunc('hour', "timestamp")
+            FROM new_rows WHERE "timestamp" IS NOT NULL;
+        ELSIF TG_OP = 'UPDATE' THEN
+            INSERT INTO measurement_changes (station_id, bucket)
+            SELECT station_id, date_trunc('hour', "timestamp") FROM new_rows WHERE "timestamp" IS NOT NULL
+            UNION
+            SELECT station_id, date_trunc('hour', "timestamp") FROM old_rows WHERE "timestamp" IS NOT NULL;
+        ELSE
+            INSERT INTO measurement_changes (station_id, bucket)
+            SELECT DISTINCT station_id, date_trunc('hour', "timestamp")
+            FROM old_rows WHERE "timestamp" IS NOT NULL;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER measurements_log_insert AFTER INSERT ON measurements
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION log_measurement_changes()
+    """,
+    """
+    CREATE TRIGGER measurements_log_update AFTER UPDATE ON measurements
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION log_measurement_changes()
+    """,
+    """
+    CREATE TRIGGER measurements_log_delete AFTER DELETE ON measurements
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION log_measurement_changes()
+    """,
+)
+
+# So create_all builds the same triggers as the migration
+for _statement in MEASUREMENT_CHANGE_DDL:
+    event.listen(Measurement.__table__, "after_create", DDL(_statement))
+
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermark"
+
+    # Single row: every change logged below last_txid is in aqi_aggregations
+    watermark_id = Column(Integer, primary_key=True)
+    last_txid = Column(BigInteger, nullable=False, server_default=text('0'))
+    updated_at = Column(DateTime, server_default=func.now())
 
 class Prediction(Base):
     __tablename__ = "predictions"
@@ -138,6 +246,42 @@ class Notification(Base):
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime, server_default=func.now())
 
+    __table_args__ = (
+        Index('ix_notifications_user_created', user_id, created_at.desc(), notification_id.desc()),
+        Index(
+            'ix_notifications_user_unread_created',
+            user_id, created_at.desc(), notification_id.desc(),
+            postgresql_where=text("is_read = false")
+        ),
+    )
+
+class NotificationJob(Base):
+    __tablename__ = "notification_jobs"
+
+    job_id = Column(Integer, primary_key=True, index=True)
+    status = Column(
+        Enum(JobStatus, name="job_status"),
+        nullable=False,
+        server_default="pending"
+    )
+    created_by = Column(Integer, ForeignKey("users.user_id", ondelete="SET NULL"))
+    total_recipients = Column(Integer, nullable=False, server_default=text('0'))
+    sent = Column(Integer, nullable=False, server_default=text('0'))
+    # Recipients are walked in user_id order; everything up to here is sent
+    last_user_id = Column(Integer, nullable=False, server_default=text('0'))
+    error = Column(String)
+    created_at = Column(DateTime, server_default=func.now())
+    finished_at = Column(DateTime)
+
+class AlertState(Base):
+    __tablename__ = "alert_states"
+
+    user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    station_id = Column(Integer, ForeignKey("stations.station_id", ondelete="CASCADE"), primary_key=True)
+    # True from an alert until readings drop back below the re-arm level
+    is_active = Column(Boolean, nullable=False, server_default=text('false'))
+    last_alert_at = Column(DateTime)
+
 class PublicContribution(Base):
     __tablename__ = "public_contributions"
 
@@ -153,8 +297,31 @@ class PublicContribution(Base):
     overall_aqi = Column(DECIMAL(5, 2))
     source = Column(String(50), nullable=False)  # Added from previous changes
     additional_info = Column(String, nullable=True)  # Added from previous changes
+    timestamp = Column(DateTime, nullable=True)  # When the reading was taken, if known
     status = Column(Enum(ContributionStatus, name="contribution_status"), default="pending")
     created_at = Column(DateTime, server_default=func.now())
+    promoted_at = Column(DateTime, nullable=True)  # Copied into measurements
+    suspicion_score = Column(Float, nullable=True)  # Highest robust z-score against nearby stations
+    screened_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_public_contributions_created', created_at.desc(), contribution_id.desc()),
+        Index(
+            'ix_public_contributions_status_created',
+            status, created_at.desc(), contribution_id.desc()
+        ),
+        Index(
+            'ix_public_contributions_status_suspicion',
+            status, suspicion_score.desc(), contribution_id.desc()
+        ),
+        Index(
+            'ix_public_contributions_unpromoted',
+            contribution_id,
+            postgresql_where=text(
+                "status = 'approved' AND promoted_at IS NULL AND station_id IS NOT NULL"
+            )
+        ),
+    )
 
 class SystemLog(Base):
     __tablename__ = "system_logs"
@@ -165,6 +332,19 @@ class SystemLog(Base):
     message = Column(String, nullable=False)
     log_time = Column(DateTime, server_default=func.now())
 
+# Hot ranking, as popularised by Reddit: log10 of the net votes plus age
+# in units of HOT_DECAY_SECONDS since HOT_EPOCH. A post needs ten times
+# the votes to keep its place against one that much newer. The score
+# never changes with the clock, so it is stored and only recomputed,
+# by Postgres, when the votes on the post change.
+HOT_EPOCH = 1704067200  # 2024-01-01 UTC
+HOT_DECAY_SECONDS = 45000
+POST_SCORE_SQL = "COALESCE(upvotes, 0) - COALESCE(downvotes, 0)"
+HOT_SCORE_SQL = (
+    f"sign({POST_SCORE_SQL}) * log(greatest(abs({POST_SCORE_SQL}), 1))"
+    f" + (extract(epoch from created_at) - {HOT_EPOCH}) / {HOT_DECAY_SECONDS}"
+)
+
 class Post(Base):
     __tablename__ = "posts"
 
@@ -176,8 +356,15 @@ class Post(Base):
     downvotes = Column(Integer, default=0)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now())
+    score = Column(Integer, Computed(POST_SCORE_SQL, persisted=True))
+    hot_score = Column(Float, Computed(HOT_SCORE_SQL, persisted=True))
 
     user = relationship("User", back_populates="posts")
+    __table_args__ = (
+        Index('ix_posts_created', created_at.desc(), post_id.desc()),
+        Index('ix_posts_score', score.desc(), post_id.desc()),
+        Index('ix_posts_hot_score', hot_score.desc(), post_id.desc()),
+    )
     comments = relationship("Comment", back_populates="post")
 
 class Comment(Base):
@@ -188,12 +375,24 @@ class Comment(Base):
     user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
     content = Column(String, nullable=False)
     upvotes = Column(Integer, default=0)
+    downvotes = Column(Integer, default=0)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
 
     post = relationship("Post", back_populates="comments")
     user = relationship("User", back_populates="comments")
 
+class Vote(Base):
+    __tablename__ = "votes"
+
+    # One vote per user and post/comment; upvotes/downvotes on the target
+    # are counters kept in step with these rows
+    user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    target_type = Column(Enum(VoteTarget, name="vote_target"), primary_key=True)
+    target_id = Column(Integer, primary_key=True)
+    value = Column(SmallInteger, nullable=False)  # 1 or -1
+    created_at = Column(DateTime, server_default=func.now())
+
 class UserReputation(Base):
     __tablename__ = "user_reputation"
 
@@ -206,6 +405,36 @@ class UserReputation(Base):
 
     user = relationship("User", back_populates="reputation")
 
+class ReputationEvent(Base):
+    __tablename__ = "reputation_events"
+
+    # Append-only; user_reputation is these rows folded together
+    event_id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
+    event_type = Column(Enum(ReputationEventType, name="reputation_event_type"), nullable=False)
+    aura_delta = Column(Integer, nullable=False, server_default=text('0'))
+    credibility_delta = Column(Integer, nullable=False, server_default=text('0'))
+    # Writing transaction; the aggregator folds by transaction, not by id,
+    # since ids are handed out before their transactions commit
+    txid = Column(
+        BigInteger, nullable=False,
+        server_default=text("CAST(CAST(pg_current_xact_id() AS text) AS bigint)")
+    )
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_reputation_events_txid', txid),
+        Index('ix_reputation_events_user', user_id),
+    )
+
+class ReputationWatermark(Base):
+    __tablename__ = "reputation_watermark"
+
+    # Single row: every transaction below last_txid has been folded in
+    watermark_id = Column(Integer, primary_key=True)
+    last_txid = Column(BigInteger, nullable=False, server_default=text('0'))
+    updated_at = Column(DateTime, server_default=func.now())
+
 class ReportStatus(enum.Enum):
     pending = "pending"
     verified = "verified"
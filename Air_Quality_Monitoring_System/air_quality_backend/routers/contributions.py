@@ -1,14 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from ..database import get_db
+from ..database import SessionLocal, get_db, run_sync_db
 from ..models import PublicContribution, User, UserRole, Station
 from ..schemas import (
+    ContributionReview,
+    ContributionReviewResult,
     PublicContributionCreate,
     PublicContributionResponse,
     ContributionStatus
 )
+from ..utils.aqi import fill_missing_aqi
 from ..utils.auth import get_current_active_user
+from ..utils.ingest import MAX_BULK_ROWS, ingest_contribution_rows, parse_rows
+from ..utils.pagination import keyset_paginate, set_next_cursor
+from ..utils.promotion import promote_contributions
+from ..utils.rollup import rollup_scheduler
+from ..utils.screening import screen_contributions
+import json
+import logging
 
 router = APIRouter(prefix="/contributions", tags=["Contributions"])
 
@@ -30,6 +41,29 @@ async def verify_data_contributor(current_user: User = Depends(get_current_activ
         )
     return current_user
 
+# Copies newly approved readings into measurements; runs after the response
+def promote_approved():
+    db = SessionLocal()
+    try:
+        if promote_contributions(db)["inserted"]:
+            rollup_scheduler.schedule()
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Promotion error: {str(e)}")
+    finally:
+        db.close()
+
+# Scores new pending readings against nearby stations; runs after the response
+def screen_pending():
+    db = SessionLocal()
+    try:
+        screen_contributions(db)
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Screening error: {str(e)}")
+    finally:
+        db.close()
+
 @router.post(
     "/",
     response_model=PublicContributionResponse,
@@ -37,6 +71,7 @@ async def verify_data_contributor(current_user: User = Depends(get_current_activ
 )
 async def create_contribution(
     contribution: PublicContributionCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(verify_data_contributor)
 ):
@@ -67,9 +102,13 @@ async def create_contribution(
                 detail=f"{field} must be a number, got {type(value).__name__}"
             )
 
+    # Score the readings when the contributor did not supply an AQI
+    values = contribution.model_dump()
+    fill_missing_aqi([values], "overall_aqi")
+
     # Create new contribution
     new_contribution = PublicContribution(
-        **contribution.model_dump(),
+        **values,
         user_id=current_user.user_id,
         status=ContributionStatus.pending
     )
@@ -77,22 +116,152 @@ async def create_contribution(
     db.add(new_contribution)
     db.commit()
     db.refresh(new_contribution)
+
+    if new_contribution.station_id is not None:
+        background_tasks.add_task(screen_pending)
     return new_contribution
 
+@router.post("/bulk")
+async def create_contributions_bulk(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(verify_data_contributor)
+):
+    """
+    Submit many readings at once as pending contributions.
+
+    Body is CSV (text/csv), NDJSON (application/x-ndjson) or a JSON array,
+    with the fields of POST /contributions plus an optional timestamp.
+    Valid rows are inserted; the response is NDJSON: a summary line, then
+    one line per rejected row with its zero-based position in the payload.
+    """
+    try:
+        rows = parse_rows(await request.body(), request.headers.get("content-type", ""))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if len(rows) > MAX_BULK_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_BULK_ROWS} readings per request"
+        )
+
+    try:
+        inserted, errors = await run_sync_db(ingest_contribution_rows, rows, current_user.user_id)
+    except Exception as e:
+        logging.error(f"Database error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if inserted:
+        background_tasks.add_task(screen_pending)
+
+    def report():
+        yield json.dumps({"received": len(rows), "inserted": inserted, "rejected": len(errors)}) + "\n"
+        for error in errors:
+            yield json.dumps(error) + "\n"
+
+    return StreamingResponse(report(), media_type="application/x-ndjson")
+
 @router.get("/", response_model=List[PublicContributionResponse])
 async def get_contributions(
+    response: Response,
     db: Session = Depends(get_db),
     status_filter: Optional[ContributionStatus] = None,
-    limit: int = 100,
+    order: str = Query("new", description="new, or suspicion (most suspicious first)"),
+    min_suspicion: Optional[float] = None,
+    max_suspicion: Optional[float] = None,
+    limit: int = Query(100, ge=1, le=500),
     offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: User = Depends(verify_data_contributor)  # Restrict to data_contributors
 ):
+    if order not in ("new", "suspicion"):
+        raise HTTPException(status_code=400, detail="order must be one of: new, suspicion")
+
     query = db.query(PublicContribution)
 
     if status_filter:
         query = query.filter(PublicContribution.status == status_filter)
 
-    return query.order_by(PublicContribution.created_at.desc()).limit(limit).offset(offset).all()
+    if min_suspicion is not None:
+        query = query.filter(PublicContribution.suspicion_score >= min_suspicion)
+
+    if max_suspicion is not None:
+        query = query.filter(PublicContribution.suspicion_score <= max_suspicion)
+
+    if order == "suspicion":
+        # Unscored rows have no place in this order and are left out
+        query = query.filter(PublicContribution.suspicion_score.isnot(None))
+        keys = (PublicContribution.suspicion_score, PublicContribution.contribution_id)
+    else:
+        keys = (PublicContribution.created_at, PublicContribution.contribution_id)
+
+    contributions, next_cursor = keyset_paginate(query, keys, cursor, limit, offset=offset)
+    set_next_cursor(response, next_cursor)
+    return contributions
+
+@router.patch("/review", response_model=ContributionReviewResult)
+async def review_contributions(
+    review: ContributionReview,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    _: User = Depends(verify_admin)
+):
+    """
+    Approve or reject many contributions in one UPDATE (Admin only).
+
+    Targets the listed contribution_ids, or every contribution matching the
+    filters when none are listed; either way only rows still in
+    current_status (pending by default) change. A request with neither
+    must set all to true. Approved readings are then copied into
+    measurements in the background, so approved rows already copied
+    cannot be moved back out of approved.
+    """
+    filters = (
+        review.station_id, review.user_id, review.source, review.created_after,
+        review.created_before, review.min_suspicion, review.max_suspicion
+    )
+    if review.contribution_ids is None and all(value is None for value in filters) and not review.all:
+        raise HTTPException(
+            status_code=400,
+            detail="Give contribution_ids or a filter, or set all to true to review every contribution"
+        )
+
+    query = db.query(PublicContribution).filter(PublicContribution.status == review.current_status)
+
+    if review.contribution_ids is not None:
+        query = query.filter(PublicContribution.contribution_id.in_(review.contribution_ids))
+    if review.station_id is not None:
+        query = query.filter(PublicContribution.station_id == review.station_id)
+    if review.user_id is not None:
+        query = query.filter(PublicContribution.user_id == review.user_id)
+    if review.source is not None:
+        query = query.filter(PublicContribution.source == review.source)
+    if review.created_after:
+        query = query.filter(PublicContribution.created_at >= review.created_after)
+    if review.created_before:
+        query = query.filter(PublicContribution.created_at < review.created_before)
+    if review.min_suspicion is not None:
+        query = query.filter(PublicContribution.suspicion_score >= review.min_suspicion)
+    if review.max_suspicion is not None:
+        query = query.filter(PublicContribution.suspicion_score <= review.max_suspicion)
+
+    if review.current_status == ContributionStatus.approved and review.status != ContributionStatus.approved:
+        promoted = query.filter(PublicContribution.promoted_at.isnot(None)).count()
+        if promoted:
+            raise HTTPException(
+                status_code=409,
+                detail=f"{promoted} contribution(s) already copied into measurements cannot leave approved"
+            )
+        # Also skip rows a concurrent promotion copies before this UPDATE
+        query = query.filter(PublicContribution.promoted_at.is_(None))
+
+    updated = query.update({PublicContribution.status: review.status}, synchronize_session=False)
+    db.commit()
+
+    if updated and review.status == ContributionStatus.approved:
+        background_tasks.add_task(promote_approved)
+    return {"updated": updated}
 
 @router.get("/{contribution_id}", response_model=PublicContributionResponse)
 async def get_contribution_details(
@@ -109,16 +278,29 @@ async def get_contribution_details(
 async def update_contribution_status(
     contribution_id: int,
     new_status: ContributionStatus,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     _: User = Depends(verify_admin)
 ):
-    contribution = db.query(PublicContribution).get(contribution_id)
+    # Locked, so a promotion run either finished with the row or skips it
+    contribution = db.query(PublicContribution).filter(
+        PublicContribution.contribution_id == contribution_id
+    ).with_for_update().first()
     if not contribution:
         raise HTTPException(status_code=404, detail="Contribution not found")
 
+    if contribution.promoted_at is not None and new_status != ContributionStatus.approved:
+        raise HTTPException(
+            status_code=409,
+            detail="Contribution already copied into measurements cannot leave approved"
+        )
+
     contribution.status = new_status
     db.commit()
     db.refresh(contribution)
+
+    if new_status == ContributionStatus.approved:
+        background_tasks.add_task(promote_approved)
     return contribution
 
 @router.delete("/{contribution_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -1,30 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ..database import get_db
-from ..models import Post, Comment, UserReputation, Report, User, ReportStatus
+from ..models import Post, Comment, UserReputation, Report, User, ReportStatus, ReputationEventType, VoteTarget
 from ..schemas import (
     PostCreate, PostResponse, CommentCreate, CommentResponse,
-    UserReputationResponse, ReportCreate, ReportResponse
+    UserReputationResponse, LeaderboardResponse, LeaderboardRank, ReportCreate, ReportResponse
 )
 from ..utils.auth import get_current_active_user, verify_admin
-from ..utils.reputation import update_aura_points, update_credibility_points
+from ..utils.leaderboard import LEADERBOARD_METRICS, reputation_leaderboard
+from ..utils.pagination import keyset_paginate, set_next_cursor
+from ..utils.reputation import record_events, record_report_outcome, reputation_aggregator
+from ..utils.votes import clear_vote, set_vote, vote_counter
 
 router = APIRouter(prefix="/forum", tags=["Forum"])
 
+# Sort keys of each feed order; the last one breaks ties for keyset paging
+FEED_ORDERS = {
+    "new": (Post.created_at, Post.post_id),
+    "top": (Post.score, Post.post_id),
+    "hot": (Post.hot_score, Post.post_id),
+}
+
+# Plain columns plus the author's name from one joined query, no ORM objects
+def feed_query(db: Session):
+    return db.query(
+        Post.post_id, Post.user_id, Post.title, Post.content,
+        Post.created_at, Post.updated_at, Post.upvotes, Post.downvotes,
+        Post.score, Post.hot_score, User.username
+    ).join(User, User.user_id == Post.user_id)
+
+# The vote row is the source of truth and is committed here, with the
+# author's reputation event for an upvote cast or withdrawn (also when it
+# turns into a downvote); the target's counters follow
+# through the write-behind vote_counter, and user_reputation through the
+# reputation_aggregator. Returns the author of the target and the
+# (upvotes, downvotes) change.
+def record_vote(db: Session, user_id: int, target_type: VoteTarget, target_id: int, value: int, withdraw: bool = False):
+    model, key, label = (
+        (Post, Post.post_id, "Post") if target_type == VoteTarget.post
+        else (Comment, Comment.comment_id, "Comment")
+    )
+    author_id = db.query(model.user_id).filter(key == target_id).scalar()
+    if author_id is None:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    delta = (clear_vote if withdraw else set_vote)(db, user_id, target_type, target_id, value)
+    if delta[0] > 0:
+        record_events(db, [(author_id, ReputationEventType.upvote_received)])
+    elif delta[0] < 0:
+        record_events(db, [(author_id, ReputationEventType.upvote_withdrawn)])
+    db.commit()
+    vote_counter.add(target_type, target_id, delta)
+    if delta[0]:
+        reputation_aggregator.schedule()
+    return author_id, delta
+
 # Posts
 @router.post("/posts", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
 async def create_post(post: PostCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
     new_post = Post(**post.model_dump(), user_id=current_user.user_id)
     db.add(new_post)
+    record_events(db, [(current_user.user_id, ReputationEventType.activity)])
     db.commit()
+    reputation_aggregator.schedule()
     db.refresh(new_post)
     return {**new_post.__dict__, "username": current_user.username}
 
 @router.get("/posts", response_model=List[PostResponse])
-async def get_posts(db: Session = Depends(get_db)):
-    posts = db.query(Post).join(User).all()
-    return [{**post.__dict__, "username": post.user.username} for post in posts]
+async def get_posts(
+    response: Response,
+    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None
+):
+    posts, next_cursor = keyset_paginate(feed_query(db), FEED_ORDERS["new"], cursor, limit)
+    set_next_cursor(response, next_cursor)
+    return [post._asdict() for post in posts]
+
+@router.get("/feed", response_model=List[PostResponse])
+async def get_feed(
+    response: Response,
+    db: Session = Depends(get_db),
+    sort: str = Query("hot", description="new, top (net votes) or hot"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None
+):
+    """
+    One page of posts, newest, best voted or hottest first.
+
+    All three orders read a stored column through its own index, so a page
+    costs the same however large the forum or deep the cursor. Pass the
+    X-Next-Cursor header of one page as `cursor` for the next.
+    """
+    if sort not in FEED_ORDERS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(FEED_ORDERS)}")
+
+    posts, next_cursor = keyset_paginate(feed_query(db), FEED_ORDERS[sort], cursor, limit)
+    set_next_cursor(response, next_cursor)
+    return [post._asdict() for post in posts]
 
 # Comments
 @router.post("/comments", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
@@ -34,7 +107,9 @@ async def create_comment(comment: CommentCreate, db: Session = Depends(get_db),
         raise HTTPException(status_code=404, detail="Post not found")
     new_comment = Comment(**comment.model_dump(), user_id=current_user.user_id)
     db.add(new_comment)
+    record_events(db, [(current_user.user_id, ReputationEventType.activity)])
     db.commit()
+    reputation_aggregator.schedule()
     db.refresh(new_comment)
     return {**new_comment.__dict__, "username": current_user.username}
 
@@ -46,87 +121,49 @@ async def get_comments(post_id: int, db: Session = Depends(get_db)):
 # Voting - Posts
 @router.post("/posts/{post_id}/upvote")
 async def upvote_post(post_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    post = db.query(Post).filter(Post.post_id == post_id).first()
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-    post.upvotes += 1
-    db.commit()
-    update_aura_points(db, post.user_id)
+    record_vote(db, current_user.user_id, VoteTarget.post, post_id, 1)
     return {"message": "Upvoted successfully"}
 
 @router.delete("/posts/{post_id}/upvote")
 async def undo_upvote_post(post_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    post = db.query(Post).filter(Post.post_id == post_id).first()
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-    if post.upvotes > 0:
-        post.upvotes -= 1
-        db.commit()
-        # Optionally, adjust reputation points here if needed
+    record_vote(db, current_user.user_id, VoteTarget.post, post_id, 1, withdraw=True)
+    # Optionally, adjust reputation points here if needed
     return {"message": "Upvote removed"}
 
 @router.post("/posts/{post_id}/downvote")
 async def downvote_post(post_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    post = db.query(Post).filter(Post.post_id == post_id).first()
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-    post.downvotes += 1
-    db.commit()
+    record_vote(db, current_user.user_id, VoteTarget.post, post_id, -1)
     # Optionally, adjust reputation points here if needed
     return {"message": "Downvoted successfully"}
 
 @router.delete("/posts/{post_id}/downvote")
 async def undo_downvote_post(post_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    post = db.query(Post).filter(Post.post_id == post_id).first()
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-    if post.downvotes > 0:
-        post.downvotes -= 1
-        db.commit()
-        # Optionally, adjust reputation points here if needed
+    record_vote(db, current_user.user_id, VoteTarget.post, post_id, -1, withdraw=True)
+    # Optionally, adjust reputation points here if needed
     return {"message": "Downvote removed"}
 
 # Voting - Comments
 @router.post("/comments/{comment_id}/upvote")
 async def upvote_comment(comment_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    comment = db.query(Comment).filter(Comment.comment_id == comment_id).first()
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-    comment.upvotes += 1
-    db.commit()
-    update_aura_points(db, comment.user_id)
+    record_vote(db, current_user.user_id, VoteTarget.comment, comment_id, 1)
     return {"message": "Upvoted successfully"}
 
 @router.delete("/comments/{comment_id}/upvote")
 async def undo_upvote_comment(comment_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    comment = db.query(Comment).filter(Comment.comment_id == comment_id).first()
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-    if comment.upvotes > 0:
-        comment.upvotes -= 1
-        db.commit()
-        # Optionally, adjust reputation points here if needed
+    record_vote(db, current_user.user_id, VoteTarget.comment, comment_id, 1, withdraw=True)
+    # Optionally, adjust reputation points here if needed
     return {"message": "Upvote removed"}
 
 @router.post("/comments/{comment_id}/downvote")
 async def downvote_comment(comment_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    comment = db.query(Comment).filter(Comment.comment_id == comment_id).first()
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-    comment.downvotes += 1
-    db.commit()
+    record_vote(db, current_user.user_id, VoteTarget.comment, comment_id, -1)
     # Optionally, adjust reputation points here if needed
     return {"message": "Downvoted successfully"}
 
 @router.delete("/comments/{comment_id}/downvote")
 async def undo_downvote_comment(comment_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    comment = db.query(Comment).filter(Comment.comment_id == comment_id).first()
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-    if comment.downvotes > 0:
-        comment.downvotes -= 1
-        db.commit()
-        # Optionally, adjust reputation points here if needed
+    record_vote(db, current_user.user_id, VoteTarget.comment, comment_id, -1, withdraw=True)
+    # Optionally, adjust reputation points here if needed
     return {"message": "Downvote removed"}
 
 # Reputation
@@ -137,6 +174,54 @@ async def get_reputation(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Reputation not found")
     return reputation
 
+@router.get("/leaderboard", response_model=LeaderboardResponse)
+async def get_leaderboard(
+    db: Session = Depends(get_db),
+    by: str = Query("aura", description="aura or credibility"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Users ranked by aura or credibility points, `offset` places down.
+
+    Served from the in-memory leaderboard, which seeks to any rank in
+    O(log n) and is kept current by reputation folds, so no page sorts
+    user_reputation.
+    """
+    if by not in LEADERBOARD_METRICS:
+        raise HTTPException(status_code=400, detail=f"by must be one of: {', '.join(LEADERBOARD_METRICS)}")
+
+    total, entries = reputation_leaderboard.top(db, by, offset, limit)
+    usernames = dict(
+        db.query(User.user_id, User.username).filter(User.user_id.in_([entry[1] for entry in entries])).all()
+    ) if entries else {}
+    return {
+        "by": by,
+        "total": total,
+        "entries": [
+            {
+                "rank": rank, "user_id": user_id, "username": usernames.get(user_id),
+                "aura_points": aura, "credibility_points": credibility,
+            }
+            for rank, user_id, aura, credibility in entries
+        ],
+    }
+
+@router.get("/leaderboard/{user_id}", response_model=LeaderboardRank)
+async def get_leaderboard_rank(user_id: int, db: Session = Depends(get_db)):
+    found = reputation_leaderboard.rank(db, user_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Reputation not found")
+    total, aura, credibility, ranks = found
+    return {
+        "user_id": user_id,
+        "total": total,
+        "aura_points": aura,
+        "credibility_points": credibility,
+        "aura_rank": ranks["aura"],
+        "credibility_rank": ranks["credibility"],
+    }
+
 # Reports
 @router.post("/reports", response_model=ReportResponse, status_code=status.HTTP_201_CREATED)
 async def create_report(report: ReportCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
@@ -152,7 +237,8 @@ async def update_report_status(report_id: int, status: ReportStatus, db: Session
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     report.status = status
+    record_report_outcome(db, report, status)
     db.commit()
-    update_credibility_points(db, report, status)
+    reputation_aggregator.schedule()
     db.refresh(report)
     return report
\ No newline at end of file
@@ -3,10 +3,11 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 from typing import List
 from ..database import get_db
-from ..models import Comment, User, Post
+from ..models import Comment, User, Post, ReputationEventType, VoteTarget
 from ..schemas import CommentCreate, CommentResponse
 from ..utils.auth import get_current_active_user
-from ..utils.reputation import update_aura_points
+from ..utils.reputation import record_events, reputation_aggregator
+from .forum import record_vote
 
 router = APIRouter(prefix="/forum", tags=["Forum Comments"])
 
@@ -34,12 +35,15 @@ async def create_comment(
         )
         
         db.add(new_comment)
+        # The user's aura point for commenting, folded in by the aggregator
+        record_events(db, [
+            (current_user.user_id, ReputationEventType.comment_posted),
+            (current_user.user_id, ReputationEventType.activity),
+        ])
         db.commit()
+        reputation_aggregator.schedule()
         db.refresh(new_comment)
         
-        # Update the user's aura points
-        update_aura_points(db, current_user.user_id)
-        
         return CommentResponse(
             comment_id=new_comment.comment_id,
             post_id=new_comment.post_id,
@@ -86,10 +90,5 @@ async def upvote_comment(
     db: Session = Depends(get_db), 
     current_user: User = Depends(get_current_active_user)
 ):
-    comment = db.query(Comment).filter(Comment.comment_id == comment_id).first()
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-    comment.upvotes += 1
-    db.commit()
-    update_aura_points(db, comment.user_id)
+    record_vote(db, current_user.user_id, VoteTarget.comment, comment_id, 1)
     return {"message": "Upvoted successfully"}
\ No newline at end of file
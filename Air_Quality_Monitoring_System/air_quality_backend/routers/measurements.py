@@ -1,12 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, WebSocket
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional
-from ..database import get_db
-from ..models import Measurement, Station, User, UserRole
-from ..schemas import MeasurementCreate, MeasurementResponse
+from ..database import get_async_db, run_sync_db
+from ..models import AQIAggregation, Measurement, Station, User, UserRole, WeatherCondition
+from ..schemas import (
+    AQIAggregationResponse,
+    BulkIngestResponse,
+    MeasurementCreate,
+    MeasurementResponse,
+    MeasurementWeatherColumns,
+    NowCastResponse
+)
+from ..utils.alerts import evaluate_alerts
+from ..utils.aqi import compute_aqi, fill_missing_aqi
+from ..utils.asof import MEASUREMENT_FIELDS, WEATHER_FIELDS, align_weather
 from ..utils.auth import get_current_active_user
+from ..utils.export import EXPORT_FORMATS, EXPORT_POLLUTANTS, export_statement, stream_measurements
+from ..utils.geo import station_geo_index
+from ..utils.ingest import MAX_BULK_ROWS, ingest_measurement_rows, parse_rows
+from ..utils.nowcast import nowcast_buffers
+from ..utils.pagination import keyset_paginate_async, keyset_paginate_rows_async, set_next_cursor
+from ..utils.rollup import AGGREGATION_TYPES, rollup_scheduler
+from ..utils.stream import KEEPALIVE_SECONDS, Subscription, measurement_hub
+from ..utils.unread import unread_counter
+import asyncio
+import json
 import logging
+import math
 
 router = APIRouter(prefix="/measurements", tags=["Measurements"])
 
@@ -24,15 +48,47 @@ async def verify_admin(current_user: User = Depends(get_current_active_user)):
     return current_user
 
 
-def calculate_bounding_box(lat: float, lon: float, radius_km: float):
-    """Approximate bounding box for nearby stations"""
-    delta = radius_km / 111  # 1 degree ≈ 111km
-    return (
-        lat - delta,
-        lat + delta,
-        lon - delta,
-        lon + delta
-    )
+def raise_threshold_alerts(db: Session, records: List[dict]):
+    # Alerting must never fail an ingest that has already been committed
+    try:
+        notified = evaluate_alerts(db, records)
+        db.commit()
+        unread_counter.add(notified)
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Alert error: {str(e)}")
+
+
+async def resolve_stream_stations(station_ids: Optional[List[int]], bbox: Optional[str]) -> set:
+    if not station_ids and not bbox:
+        raise HTTPException(status_code=400, detail="Pass station_id and/or bbox")
+
+    selected = set(station_ids or ())
+    if bbox:
+        try:
+            south, west, north, east = (float(part) for part in bbox.split(","))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="bbox must be south,west,north,east")
+        geo_index = await run_sync_db(station_geo_index.get)
+        selected.update(geo_index.in_box(south, west, north, east))
+
+    if not selected:
+        raise HTTPException(status_code=404, detail="No stations in bbox")
+    return selected
+
+
+async def sse_events(subscription: Subscription):
+    try:
+        while True:
+            try:
+                batch = await asyncio.wait_for(subscription.next_batch(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment line, keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: measurements\ndata: {json.dumps(batch)}\n\n"
+    finally:
+        measurement_hub.unsubscribe(subscription)
 
 
 # -------------------------
@@ -42,61 +98,342 @@ def calculate_bounding_box(lat: float, lon: float, radius_km: float):
 @router.post("/", response_model=MeasurementResponse, status_code=status.HTTP_201_CREATED)
 async def create_measurement(
         measurement: MeasurementCreate,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         _: User = Depends(verify_admin)
 ):
     try:
-        station = db.query(Station).get(measurement.station_id)
+        station = await db.get(Station, measurement.station_id)
         if not station:
             raise HTTPException(status_code=404, detail="Station not found")
 
         # Handle timestamp
         timestamp = measurement.timestamp or datetime.now(timezone.utc)
 
-        new_measurement = Measurement(
-            **measurement.model_dump(exclude={"timestamp"}),
-            timestamp=timestamp
-        )
+        values = measurement.model_dump(exclude={"timestamp"})
+        fill_missing_aqi([values])
+
+        new_measurement = Measurement(**values, timestamp=timestamp)
 
         db.add(new_measurement)
-        db.commit()
-        db.refresh(new_measurement)
-        return new_measurement
+        await db.commit()
+        await db.refresh(new_measurement)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logging.error(f"Database error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    rollup_scheduler.schedule()
+    record = {**values, "timestamp": new_measurement.timestamp}
+    measurement_hub.publish([record])
+    await run_sync_db(raise_threshold_alerts, [record])
+    return new_measurement
+
+
+@router.post("/bulk", response_model=BulkIngestResponse)
+async def create_measurements_bulk(
+        request: Request,
+        _: User = Depends(verify_admin)
+):
+    """
+    Ingest many readings at once (Admin only).
+
+    Body is a JSON array, NDJSON (application/x-ndjson) or CSV (text/csv).
+    Valid rows are upserted on (station_id, timestamp); invalid rows are
+    skipped and reported by their zero-based position in the payload.
+    """
+    try:
+        rows = parse_rows(await request.body(), request.headers.get("content-type", ""))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if len(rows) > MAX_BULK_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_BULK_ROWS} readings per request"
+        )
+
+    try:
+        records, errors, inserted, updated = await run_sync_db(ingest_measurement_rows, rows)
+    except Exception as e:
+        logging.error(f"Database error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if records:
+        rollup_scheduler.schedule()
+    measurement_hub.publish(records)
+    await run_sync_db(raise_threshold_alerts, records)
+    return {
+        "received": len(rows),
+        "accepted": len(records),
+        "inserted": inserted,
+        "updated": updated,
+        "rejected": len(errors),
+        "errors": errors
+    }
+
 
 @router.get("/", response_model=List[MeasurementResponse])
 async def get_measurements(
-        db: Session = Depends(get_db),
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
         station_id: Optional[int] = None,
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None,
-        limit: int = 100,
-        offset: int = 0
+        limit: int = Query(100, ge=1, le=1000),
+        offset: int = 0,
+        cursor: Optional[str] = None
 ):
-    query = db.query(Measurement)
+    query = select(Measurement)
 
     if station_id:
-        query = query.filter(Measurement.station_id == station_id)
+        query = query.where(Measurement.station_id == station_id)
 
     if start_time:
-        query = query.filter(Measurement.timestamp >= start_time)
+        query = query.where(Measurement.timestamp >= start_time)
 
     if end_time:
-        query = query.filter(Measurement.timestamp <= end_time)
+        query = query.where(Measurement.timestamp <= end_time)
+
+    measurements, next_cursor = await keyset_paginate_async(
+        db,
+        query,
+        (Measurement.timestamp, Measurement.measurement_id),
+        cursor, limit, offset=offset
+    )
+    set_next_cursor(response, next_cursor)
+    return measurements
+
 
-    return query.order_by(Measurement.timestamp.desc()).limit(limit).offset(offset).all()
+@router.get("/export")
+async def export_measurements(
+        station_id: Optional[List[int]] = Query(None, description="Repeat to export several stations"),
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        pollutant: Optional[List[str]] = Query(None, description="Repeat to pick columns; default is all"),
+        format: str = Query("ndjson", description="ndjson or csv")
+):
+    """
+    Stream measurement history, oldest first, as NDJSON or CSV.
+
+    Unlike GET /measurements this is not paginated: rows are read through a
+    server-side cursor and written out as they arrive, so memory use does not
+    grow with the size of the export.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+        )
+
+    pollutants = tuple(pollutant) if pollutant else EXPORT_POLLUTANTS
+    unknown = sorted(set(pollutants) - set(EXPORT_POLLUTANTS))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown pollutant(s): {', '.join(unknown)}"
+        )
+
+    stmt = export_statement(station_id, start_time, end_time, pollutants)
+    return StreamingResponse(
+        stream_measurements(stmt, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="measurements.{format}"'}
+    )
+
+
+@router.get("/aggregates", response_model=List[AQIAggregationResponse])
+async def get_aggregates(
+        station_id: int,
+        db: AsyncSession = Depends(get_async_db),
+        interval: str = Query("hourly", description="hourly, daily or monthly"),
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        limit: int = Query(1000, ge=1, le=10000)
+):
+    """
+    AQI avg/min/max per hour, day or month for one station, oldest first.
+
+    Served from aqi_aggregations only. Writes schedule a background rollup
+    of the hours they touched, so buckets trail new readings by about
+    ROLLUP_DELAY_SECONDS.
+    """
+    if interval not in AGGREGATION_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"interval must be one of: {', '.join(AGGREGATION_TYPES)}"
+        )
+
+    query = select(AQIAggregation).where(
+        AQIAggregation.station_id == station_id,
+        AQIAggregation.aggregation_type == interval
+    )
+
+    if start_time:
+        query = query.where(AQIAggregation.end_time > start_time)
+
+    if end_time:
+        query = query.where(AQIAggregation.start_time <= end_time)
+
+    return (await db.scalars(query.order_by(AQIAggregation.start_time).limit(limit))).all()
+
+
+@router.get("/nowcast", response_model=NowCastResponse)
+async def get_nowcast(
+        station_id: int,
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    EPA NowCast for PM2.5/PM10 and the 8-hour ozone average of one station.
+
+    Served from in-memory hourly ring buffers that only fold in readings
+    ingested since the last sync, never from a 12-hour scan of raw rows.
+    """
+    station = await db.get(Station, station_id)
+    if not station:
+        raise HTTPException(status_code=404, detail="Station not found")
+
+    values = await run_sync_db(nowcast_buffers.get, station_id)
+    aqi, dominant = compute_aqi({
+        "pm25": [values["pm25_nowcast"]],
+        "pm10": [values["pm10_nowcast"]],
+        "ozone": [values["ozone_8h"]],
+    })
+
+    return {
+        "station_id": station_id,
+        "as_of": datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0),
+        **{key: round(value, 1) if value is not None else None for key, value in values.items()},
+        "aqi": None if math.isnan(aqi[0]) else int(aqi[0]),
+        "dominant_pollutant": dominant[0]
+    }
+
+
+@router.get("/with_weather", response_model=MeasurementWeatherColumns)
+async def get_measurements_with_weather(
+        db: AsyncSession = Depends(get_async_db),
+        station_id: Optional[List[int]] = Query(None, description="Repeat for several stations; default is all"),
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        tolerance_minutes: int = Query(60, ge=1, le=1440),
+        limit: int = Query(10000, ge=1, le=100000),
+        cursor: Optional[str] = None
+):
+    """
+    Measurements with the weather in effect at each reading, as columns.
+
+    Each reading is paired with the latest weather report of its station
+    taken at most `tolerance_minutes` earlier (an as-of join); readings
+    with none keep their row with null weather values. Rows are ordered by
+    station, then time, and the window defaults to the last 24 hours.
+    Pass the X-Next-Cursor header of one page as `cursor` for the next;
+    pin start_time and end_time while paging so the window stays put.
+    """
+    end_time = end_time or datetime.now(timezone.utc)
+    start_time = start_time or end_time - timedelta(hours=24)
+    start_time, end_time = (
+        moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo else moment
+        for moment in (start_time, end_time)
+    )
+    if start_time > end_time:
+        raise HTTPException(status_code=400, detail="start_time must not be after end_time")
+    tolerance = timedelta(minutes=tolerance_minutes)
+
+    query = select(
+        Measurement.station_id,
+        Measurement.timestamp,
+        *(getattr(Measurement, field) for field in MEASUREMENT_FIELDS)
+    ).where(Measurement.timestamp.between(start_time, end_time))
+    if station_id:
+        query = query.where(Measurement.station_id.in_(station_id))
+    measurements, next_cursor = await keyset_paginate_rows_async(
+        db, query, (Measurement.station_id, Measurement.timestamp), cursor, limit, descending=False
+    )
+
+    weather = []
+    if measurements:
+        # Only the stations and time span the measurement page covers
+        weather = (await db.execute(
+            select(
+                WeatherCondition.station_id,
+                WeatherCondition.measurement_time,
+                *(getattr(WeatherCondition, field) for field in WEATHER_FIELDS),
+                WeatherCondition.weather_condition
+            ).where(
+                WeatherCondition.station_id.in_({row.station_id for row in measurements}),
+                WeatherCondition.measurement_time.between(
+                    min(row.timestamp for row in measurements) - tolerance,
+                    max(row.timestamp for row in measurements)
+                )
+            ).order_by(WeatherCondition.station_id, WeatherCondition.measurement_time)
+        )).all()
+
+    columns = align_weather(measurements, weather, tolerance)
+    # Built column-wise already; skip re-validating every element
+    response = JSONResponse({"count": len(measurements), "tolerance_minutes": tolerance_minutes, **columns})
+    set_next_cursor(response, next_cursor)
+    return response
+
+
+@router.get("/stream")
+async def stream_measurements_sse(
+        station_id: Optional[List[int]] = Query(None, description="Repeat to follow several stations"),
+        bbox: Optional[str] = Query(None, description="south,west,north,east")
+):
+    """
+    Server-Sent Events feed of new readings for the chosen stations.
+
+    Each `measurements` event carries a JSON list with the latest reading of
+    every station that reported since the previous event; a station that
+    reports several times within one second is only sent once.
+    """
+    station_ids = await resolve_stream_stations(station_id, bbox)
+    return StreamingResponse(
+        sse_events(measurement_hub.subscribe(station_ids)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/stream")
+async def stream_measurements_ws(
+        websocket: WebSocket,
+        station_id: Optional[List[int]] = Query(None),
+        bbox: Optional[str] = None
+):
+    """Same feed as GET /measurements/stream, one JSON list per message."""
+    try:
+        station_ids = await resolve_stream_stations(station_id, bbox)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+        return
+
+    await websocket.accept()
+    subscription = measurement_hub.subscribe(station_ids)
+    # The feed is one-way; the receive only completes when the client goes away
+    receiver = asyncio.ensure_future(websocket.receive())
+    batch = asyncio.ensure_future(subscription.next_batch())
+    try:
+        while True:
+            await asyncio.wait({receiver, batch}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                if receiver.result()["type"] == "websocket.disconnect":
+                    break
+                receiver = asyncio.ensure_future(websocket.receive())
+            if batch.done():
+                await websocket.send_json(batch.result())
+                batch = asyncio.ensure_future(subscription.next_batch())
+    finally:
+        receiver.cancel()
+        batch.cancel()
+        measurement_hub.unsubscribe(subscription)
 
 
 @router.get("/{measurement_id}", response_model=MeasurementResponse)
 async def get_measurement(
         measurement_id: int,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    measurement = db.query(Measurement).get(measurement_id)
+    measurement = await db.get(Measurement, measurement_id)
     if not measurement:
         raise HTTPException(status_code=404, detail="Measurement not found")
     return measurement
@@ -104,35 +441,40 @@ async def get_measurement(
 
 @router.get("/nearby/", response_model=List[MeasurementResponse])
 async def get_nearby_measurements(
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         lat: float = Query(..., description="Center latitude"),
         lon: float = Query(..., description="Center longitude"),
         radius_km: float = Query(10, description="Search radius in kilometers"),
         hours: int = Query(24, description="Hours of historical data to retrieve"),
         limit: int = 100
 ):
-    min_lat, max_lat, min_lon, max_lon = calculate_bounding_box(lat, lon, radius_km)
+    geo_index = await run_sync_db(station_geo_index.get)
+    station_ids = [station_id for station_id, _ in geo_index.within(lat, lon, radius_km)]
+    if not station_ids:
+        return []
 
     time_threshold = datetime.now(timezone.utc) - timedelta(hours=hours)
 
-    measurements = db.query(Measurement).join(Station).filter(
-        Station.latitude.between(min_lat, max_lat),
-        Station.longitude.between(min_lon, max_lon),
-        Measurement.timestamp >= time_threshold
-    ).order_by(Measurement.timestamp.desc()).limit(limit).all()
+    measurements = await db.scalars(
+        select(Measurement).where(
+            Measurement.station_id.in_(station_ids),
+            Measurement.timestamp >= time_threshold
+        ).order_by(Measurement.timestamp.desc()).limit(limit)
+    )
 
-    return measurements
+    return measurements.all()
 
 
 @router.delete("/{measurement_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_measurement(
         measurement_id: int,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         _: User = Depends(verify_admin)
 ):
-    measurement = db.query(Measurement).get(measurement_id)
+    measurement = await db.get(Measurement, measurement_id)
     if not measurement:
         raise HTTPException(status_code=404, detail="Measurement not found")
 
-    db.delete(measurement)
-    db.commit()
+    await db.delete(measurement)
+    await db.commit()
+    rollup_scheduler.schedule()
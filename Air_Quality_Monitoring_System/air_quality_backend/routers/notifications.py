@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
-from datetime import datetime, timezone
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Response
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from ..database import get_db
-from ..models import Notification, User, Station, UserRole
-from ..schemas import NotificationResponse, NotificationCreate
+from ..database import get_async_db
+from ..models import Notification, NotificationJob, User, Station, UserRole
+from ..schemas import (
+    NotificationCreate,
+    NotificationJobResponse,
+    NotificationReadResult,
+    NotificationReadUpdate,
+    NotificationResponse,
+    UnreadCountResponse
+)
 from ..utils.auth import get_current_active_user
+from ..utils.fanout import run_fanout_job
+from ..utils.pagination import keyset_paginate_async, set_next_cursor
+from ..utils.unread import unread_counter
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
@@ -25,41 +34,103 @@ async def verify_admin(current_user: User = Depends(get_current_active_user)):
     return current_user
 
 
+async def unread_count(db: AsyncSession, user_id: int) -> int:
+    count = unread_counter.cached(user_id)
+    if count is None:
+        # Counted from the partial index on unread notifications
+        count = await db.scalar(
+            select(func.count()).select_from(Notification).where(
+                Notification.user_id == user_id,
+                ~Notification.is_read
+            )
+        )
+        unread_counter.store(user_id, count)
+    return count
+
+
 # -------------------------
 # Endpoints
 # -------------------------
 
 @router.get("/", response_model=List[NotificationResponse])
 async def get_user_notifications(
-        db: Session = Depends(get_db),
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_active_user),
         is_read: Optional[bool] = None,
-        limit: int = Query(100, le=500),
-        offset: int = 0
+        limit: int = Query(100, ge=1, le=500),
+        offset: int = 0,
+        cursor: Optional[str] = None
 ):
     """Get notifications for current user"""
-    query = db.query(Notification).filter(
+    query = select(Notification).where(
         Notification.user_id == current_user.user_id  # type: ignore
     )
 
     if is_read is not None:
-        query = query.filter(Notification.is_read == is_read)
+        query = query.where(Notification.is_read == is_read)
 
-    return query.order_by(Notification.created_at.desc()).limit(limit).offset(offset).all()
+    notifications, next_cursor = await keyset_paginate_async(
+        db,
+        query,
+        (Notification.created_at, Notification.notification_id),
+        cursor, limit, offset=offset
+    )
+    set_next_cursor(response, next_cursor)
+    return notifications
+
+
+@router.get("/unread_count", response_model=UnreadCountResponse)
+async def get_unread_count(
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_active_user)
+):
+    """Number of unread notifications for the current user"""
+    return {"unread_count": await unread_count(db, current_user.user_id)}
+
+
+@router.patch("/read", response_model=NotificationReadResult)
+async def mark_many_as_read(
+        read_data: NotificationReadUpdate,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_active_user)
+):
+    """Mark the given notifications, or all up to a time, as read in one UPDATE"""
+    stmt = update(Notification).where(
+        Notification.user_id == current_user.user_id,
+        ~Notification.is_read
+    )
+
+    if read_data.notification_ids is not None:
+        stmt = stmt.where(Notification.notification_id.in_(read_data.notification_ids))
+
+    if read_data.before is not None:
+        stmt = stmt.where(Notification.created_at <= read_data.before)
+
+    result = await db.execute(stmt.values(is_read=True).execution_options(synchronize_session=False))
+    await db.commit()
+    unread_counter.add([current_user.user_id], -result.rowcount)
+
+    return {
+        "updated": result.rowcount,
+        "unread_count": await unread_count(db, current_user.user_id)
+    }
 
 
 @router.get("/{notification_id}", response_model=NotificationResponse)
 async def get_notification(
         notification_id: int,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_active_user)
 ):
     """Get specific notification"""
-    notification = db.query(Notification).filter(
-        and_(
-            Notification.notification_id == notification_id,
+    notification = await db.scalar(
+        select(Notification).where(
+            and_(
+                Notification.notification_id == notification_id,
+            )
         )
-    ).first()
+    )
 
     if not notification:
         raise HTTPException(
@@ -72,74 +143,95 @@ async def get_notification(
 @router.patch("/{notification_id}/read", response_model=NotificationResponse)
 async def mark_as_read(
         notification_id: int,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_active_user)
 ):
     """Mark notification as read"""
-    notification = db.query(Notification).filter(
-        and_(
-            Notification.notification_id == notification_id,
-            Notification.user_id == current_user.user_id
+    notification = await db.scalar(
+        select(Notification).where(
+            and_(
+                Notification.notification_id == notification_id,
+                Notification.user_id == current_user.user_id
+            )
         )
-    ).first()
+    )
 
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
 
-    notification.is_read = True
-    db.commit()
-    db.refresh(notification)
+    if not notification.is_read:
+        notification.is_read = True
+        await db.commit()
+        await db.refresh(notification)
+        unread_counter.add([current_user.user_id], -1)
     return notification
 
 
-@router.post("/send", status_code=status.HTTP_201_CREATED)
+@router.post("/send", response_model=NotificationJobResponse, status_code=status.HTTP_202_ACCEPTED)
 async def send_notification(
     notification_data: NotificationCreate,
-    db: Session = Depends(get_db),
-    _: User = Depends(verify_admin)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(verify_admin)
 ):
-    """Send notification to users (Admin only)"""
+    """
+    Send notification to users (Admin only).
+
+    Returns a job at once; the notifications are written in the background
+    and GET /notifications/jobs/{job_id} reports progress.
+    """
     # Validate station exists if provided
     if notification_data.station_id:
-        station = db.query(Station).get(notification_data.station_id)
+        station = await db.get(Station, notification_data.station_id)
         if not station:
             raise HTTPException(status_code=400, detail="Invalid station ID")
 
     # Send to all users if no specific IDs provided
-    if not notification_data.user_ids:
-        users = db.query(User).filter(User.is_active).all()
-        notification_data.user_ids = [user.user_id for user in users]
-
-    notifications = []
-    for user_id in notification_data.user_ids:
-        user = db.query(User).get(user_id)
-        if not user:
-            continue  # Skip invalid users
-
-        notification = Notification(
-            **notification_data.model_dump(exclude={"user_ids"}),
-            user_id=user_id,
-            created_at=datetime.now(timezone.utc)
-        )
-        notifications.append(notification)
+    if notification_data.user_ids:
+        total = len(set(notification_data.user_ids))
+    else:
+        total = await db.scalar(select(func.count()).select_from(User).where(User.is_active))
+
+    job = NotificationJob(created_by=current_user.user_id, total_recipients=total)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+
+    background_tasks.add_task(
+        run_fanout_job,
+        job.job_id,
+        notification_data.model_dump(exclude={"user_ids"}, mode="json"),
+        notification_data.user_ids or None
+    )
+    return job
 
-    db.bulk_save_objects(notifications)
-    db.commit()
 
-    return {"message": f"Notifications sent to {len(notifications)} users"}
+@router.get("/jobs/{job_id}", response_model=NotificationJobResponse)
+async def get_notification_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    _: User = Depends(verify_admin)
+):
+    """Progress of a send job (Admin only)"""
+    job = await db.get(NotificationJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @router.delete("/{notification_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_notification(
     notification_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _: User = Depends(verify_admin)
 ):
     """Delete notification (Admin only)"""
-    notification = db.query(Notification).get(notification_id)
+    notification = await db.get(Notification, notification_id)
 
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
 
-    db.delete(notification)
-    db.commit()
+    await db.delete(notification)
+    await db.commit()
+    if not notification.is_read:
+        unread_counter.add([notification.user_id], -1)
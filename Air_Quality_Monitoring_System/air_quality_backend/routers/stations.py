@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from collections import defaultdict
 from datetime import datetime, timezone
 from typing import List, Optional
-from ..database import get_db
-from ..models import Station, User, UserRole
+from ..database import get_async_db, run_sync_db
+from ..models import Measurement, Station, User, UserRole
+from ..config import settings
 from ..schemas import (
     StationCreate,
     StationResponse,
+    StationSearchResult,
     StationUpdate
 )
 from ..utils.auth import get_current_active_user
+from ..utils.geo import station_geo_index
+from ..utils.ingest import known_station_ids
+from ..utils.pagination import keyset_paginate_async, set_next_cursor
+from ..utils.search import search_stations_pg_trgm, station_search_index
 
 router = APIRouter(prefix="/stations", tags=["Stations"])
 
@@ -27,16 +37,49 @@ async def verify_admin(current_user: User = Depends(get_current_active_user)):
     return current_user
 
 
-def calculate_bounding_box(lat: float, lon: float, radius_km: float):
-    """Calculate approximate bounding box for geo queries"""
-    # 1 degree ≈ 111km
-    delta = radius_km / 111
-    return (
-        lat - delta,
-        lat + delta,
-        lon - delta,
-        lon + delta
-    )
+def recent_measurements_query(
+        station_ids: List[int],
+        since: Optional[datetime] = None,
+        limit: int = 1
+):
+    """
+    The `limit` newest measurements of each station, as one LATERAL query.
+
+    Each station walks (station_id, timestamp) backwards and stops after
+    `limit` rows, instead of loading every measurement ever taken.
+    """
+    ids = select(Station.station_id).where(Station.station_id.in_(station_ids)).subquery()
+
+    window = select(Measurement).where(Measurement.station_id == ids.c.station_id)
+    if since is not None:
+        window = window.where(Measurement.timestamp >= since)
+    window = window.order_by(
+        Measurement.timestamp.desc(),
+        Measurement.measurement_id.desc()
+    ).limit(limit).lateral()
+
+    recent = aliased(Measurement, window)
+    return select(recent).select_from(ids.join(window, true()))
+
+
+async def attach_recent_measurements(
+        db: AsyncSession,
+        stations: List[Station],
+        since: Optional[datetime] = None,
+        limit: int = 1
+) -> List[Station]:
+    """Populate station.measurements with at most `limit` newest readings each."""
+    recent_by_station = defaultdict(list)
+
+    if stations and limit > 0:
+        query = recent_measurements_query([s.station_id for s in stations], since, limit)
+        for measurement in (await db.scalars(query)):
+            recent_by_station[measurement.station_id].append(measurement)
+
+    # Set without lazy-loading or dirtying the full relationship
+    for station in stations:
+        set_committed_value(station, "measurements", recent_by_station[station.station_id])
+    return stations
 
 
 # -------------------------
@@ -50,7 +93,7 @@ def calculate_bounding_box(lat: float, lon: float, radius_km: float):
 )
 async def create_station(
         station_data: StationCreate,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         _: User = Depends(verify_admin)
 ):
 
@@ -62,77 +105,111 @@ async def create_station(
 
     new_station = Station(**station_data.model_dump())
     db.add(new_station)
-    db.commit()
-    db.refresh(new_station)
-    return new_station
+    await db.commit()
+    await db.refresh(new_station)
+    station_geo_index.invalidate()
+    station_search_index.upsert(new_station)
+    known_station_ids.invalidate()
+    return (await attach_recent_measurements(db, [new_station]))[0]
 
 
 @router.get("/", response_model=List[StationResponse])
 async def get_stations(
-        db: Session = Depends(get_db),
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
         active_only: bool = Query(True),
         source: Optional[str] = Query(None),
-        limit: int = Query(100, le=500),
-        offset: int = 0
+        limit: int = Query(100, ge=1, le=500),
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        measurements_since: Optional[datetime] = Query(None),
+        measurements_limit: int = Query(1, ge=0, le=1000)
 ):
-    query = db.query(Station).options(joinedload(Station.measurements))
+    """List stations with their latest reading (or a bounded recent window)"""
+    query = select(Station)
 
     if active_only:
-        query = query.filter(Station.is_active)
+        query = query.where(Station.is_active)
 
     if source:
-        query = query.filter(Station.source.ilike(f"%{source}%"))
+        query = query.where(Station.source.ilike(f"%{source}%"))
 
-    return query.order_by(Station.station_name).limit(limit).offset(offset).all()
+    stations, next_cursor = await keyset_paginate_async(
+        db,
+        query,
+        (Station.station_name, Station.station_id),
+        cursor, limit, descending=False, offset=offset
+    )
+    set_next_cursor(response, next_cursor)
+    return await attach_recent_measurements(db, stations, measurements_since, measurements_limit)
 
 
 @router.get("/{station_id}", response_model=StationResponse)
 async def get_station(
         station_id: int,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db),
+        measurements_since: Optional[datetime] = Query(None),
+        measurements_limit: int = Query(1, ge=0, le=1000)
 ):
     """Get detailed station information"""
-    station = db.query(Station).options(
-        joinedload(Station.location),
-        joinedload(Station.measurements)  # Now valid after model update
-    ).filter(Station.station_id == station_id).first()
+    station = await db.get(Station, station_id)
 
     if not station:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Station not found"
         )
+    await attach_recent_measurements(db, [station], measurements_since, measurements_limit)
     return station
 
 
 @router.get("/nearby/", response_model=List[StationResponse])
 async def get_nearby_stations(
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         lat: float = Query(...),
         lon: float = Query(...),
         radius_km: float = Query(10, ge=1, le=100),
-        limit: int = Query(50, le=200)
+        limit: int = Query(50, le=200),
+        measurements_since: Optional[datetime] = Query(None),
+        measurements_limit: int = Query(1, ge=0, le=1000)
 ):
-    min_lat, max_lat, min_lon, max_lon = calculate_bounding_box(lat, lon, radius_km)
+    geo_index = await run_sync_db(station_geo_index.get)
+    distances = dict(geo_index.within(lat, lon, radius_km))
+    if not distances:
+        return []
+
+    stations = (await db.scalars(
+        select(Station).where(
+            Station.station_id.in_(distances),
+            Station.is_active
+        )
+    )).all()
 
-    stations = db.query(Station).filter(
-        Station.latitude.between(min_lat, max_lat),
-        Station.longitude.between(min_lon, max_lon),
-        Station.is_active
-    ).options(joinedload(Station.measurements)).limit(limit).all()
+    # Closest first, using true great-circle distance from the index
+    stations = sorted(stations, key=lambda s: distances[s.station_id])
+    return await attach_recent_measurements(db, stations[:limit], measurements_since, measurements_limit)
 
-    return stations
+
+@router.get("/search/", response_model=List[StationSearchResult])
+async def search_stations(
+        q: str = Query(..., min_length=1),
+        limit: int = Query(10, ge=1, le=50)
+):
+    """Ranked fuzzy match on station and EPA names"""
+    if settings.STATION_SEARCH_BACKEND == "pg_trgm":
+        return await run_sync_db(search_stations_pg_trgm, q, limit)
+    return await run_sync_db(station_search_index.search, q, limit)
 
 
 @router.patch("/{station_id}", response_model=StationResponse)
 async def update_station(
         station_id: int,
         station_data: StationUpdate,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         _: User = Depends(verify_admin)
 ):
     """Update station details (Admin only)"""
-    station = db.query(Station).get(station_id)
+    station = await db.get(Station, station_id)
     if not station:
         raise HTTPException(status_code=404, detail="Station not found")
 
@@ -143,21 +220,26 @@ async def update_station(
         setattr(station, field, value)
 
     station.updated_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(station)
-    return station
+    await db.commit()
+    await db.refresh(station)
+    station_geo_index.invalidate()
+    station_search_index.upsert(station)
+    return (await attach_recent_measurements(db, [station]))[0]
 
 
 @router.delete("/{station_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_station(
         station_id: int,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         _: User = Depends(verify_admin)
 ):
     """Delete station (Admin only)"""
-    station = db.query(Station).get(station_id)
+    station = await db.get(Station, station_id)
     if not station:
         raise HTTPException(status_code=404, detail="Station not found")
 
-    db.delete(station)
-    db.commit()
+    await db.delete(station)
+    await db.commit()
+    station_geo_index.invalidate()
+    station_search_index.remove(station_id)
+    known_station_ids.invalidate()
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy import and_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timezone
 
 from ..database import get_db
 from ..models import User, UserRole
 from ..schemas import UserCreate, UserUpdate, UserResponse
+from ..utils.alerts import alert_subscriptions
 from ..utils.auth import get_current_active_user, get_password_hash
+from ..utils.pagination import keyset_paginate, set_next_cursor
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -43,11 +45,18 @@ async def verify_admin_or_self(
 
 @router.get("/", response_model=List[UserResponse])
 async def get_all_users(
+        response: Response,
         db: Session = Depends(get_db),
-        _: User = Depends(verify_admin)
+        _: User = Depends(verify_admin),
+        limit: int = Query(100, ge=1, le=500),
+        cursor: Optional[str] = None
 ):
     """Get all users (Admin only)"""
-    return db.query(User).order_by(User.created_at.desc()).all()
+    users, next_cursor = keyset_paginate(
+        db.query(User), (User.created_at, User.user_id), cursor, limit
+    )
+    set_next_cursor(response, next_cursor)
+    return users
 
 
 @router.get("/me", response_model=UserResponse)
@@ -103,6 +112,7 @@ async def create_user(
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    alert_subscriptions.invalidate()
     return new_user
 
 
@@ -164,6 +174,8 @@ async def update_user(
     user.updated_at = datetime.now(timezone.utc)
     db.commit()
     db.refresh(user)
+    if "preferences" in update_data or "is_active" in update_data:
+        alert_subscriptions.invalidate()
     return user
 
 
@@ -186,3 +198,4 @@ async def delete_user(
 
     db.delete(user)
     db.commit()
+    alert_subscriptions.invalidate()
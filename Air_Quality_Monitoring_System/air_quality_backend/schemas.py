@@ -25,6 +25,12 @@ class NotificationType(str, Enum):
     forecast_alert = "forecast_alert"
     system_update = "system_update"
 
+class JobStatus(str, Enum):
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
 class ContributionStatus(str, Enum):
     pending = "pending"
     approved = "approved"
@@ -102,7 +108,7 @@ class MeasurementResponse(BaseModel):
     aqi: Optional[int] = None
     source: str
     timestamp: datetime
-    created_at: datetime
+    created_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -116,6 +122,14 @@ class StationResponse(StationBase):
     class Config:
         from_attributes = True
 
+class StationSearchResult(BaseModel):
+    station_id: int
+    station_name: str
+    epa_name: Optional[str] = None
+    latitude: float
+    longitude: float
+    score: float
+
 class UserResponse(BaseModel):
     user_id: int
     username: str
@@ -147,6 +161,8 @@ class PostResponse(PostBase):
     updated_at: datetime | None
     upvotes: int
     downvotes: int
+    score: Optional[int] = None
+    hot_score: Optional[float] = None
 
     class Config:
         orm_mode = True
@@ -163,6 +179,7 @@ class CommentResponse(CommentBase):
     user_id: int
     username: str  # Added for frontend display
     upvotes: int
+    downvotes: int = 0
     created_at: datetime
     updated_at: Optional[datetime]
 
@@ -179,6 +196,26 @@ class UserReputationResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    username: Optional[str] = None
+    aura_points: int
+    credibility_points: int
+
+class LeaderboardResponse(BaseModel):
+    by: str
+    total: int
+    entries: List[LeaderboardEntry]
+
+class LeaderboardRank(BaseModel):
+    user_id: int
+    total: int
+    aura_points: int
+    credibility_points: int
+    aura_rank: int
+    credibility_rank: int
+
 class ReportStatus(str, Enum):
     pending = "pending"
     verified = "verified"
@@ -234,6 +271,30 @@ class NotificationResponse(NotificationBase):
     class Config:
         from_attributes = True
 
+class NotificationJobResponse(BaseModel):
+    job_id: int
+    status: JobStatus
+    total_recipients: int
+    sent: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class NotificationReadUpdate(BaseModel):
+    # Either or both; with neither, every unread notification is marked
+    notification_ids: Optional[List[int]] = Field(None, max_length=10000)
+    before: Optional[datetime] = None
+
+class NotificationReadResult(BaseModel):
+    updated: int
+    unread_count: int
+
+class UnreadCountResponse(BaseModel):
+    unread_count: int
+
 # -------------------------
 # Contribution Schemas
 # -------------------------
@@ -251,6 +312,7 @@ class PublicContributionBase(BaseModel):
 
 class PublicContributionCreate(PublicContributionBase):
     station_id: Optional[int] = None  # Made optional
+    timestamp: Optional[datetime] = None
 
 class PublicContributionResponse(PublicContributionBase):
     contribution_id: int
@@ -258,10 +320,31 @@ class PublicContributionResponse(PublicContributionBase):
     created_at: datetime
     user_id: int
     station_id: Optional[int] = None  # Made optional
+    timestamp: Optional[datetime] = None
+    suspicion_score: Optional[float] = None
 
     class Config:
         from_attributes = True
 
+class ContributionReview(BaseModel):
+    # Applies to the listed IDs, or to every contribution matching the
+    # filters when no IDs are given; only rows in current_status change.
+    # With neither, all must be true to target every row in current_status.
+    status: ContributionStatus
+    contribution_ids: Optional[List[int]] = Field(None, max_length=10000)
+    current_status: ContributionStatus = ContributionStatus.pending
+    station_id: Optional[int] = None
+    user_id: Optional[int] = None
+    source: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    min_suspicion: Optional[float] = None
+    max_suspicion: Optional[float] = None
+    all: bool = False
+
+class ContributionReviewResult(BaseModel):
+    updated: int
+
 # -------------------------
 # Measurement Schemas
 # -------------------------
@@ -278,6 +361,64 @@ class MeasurementCreate(BaseModel):
     source: str
     timestamp: Optional[datetime] = None
 
+class AQIAggregationResponse(BaseModel):
+    station_id: int
+    aggregation_type: str
+    start_time: datetime
+    end_time: datetime
+    avg_value: float
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    sample_count: int
+    aqi_category: Optional[AQICategory] = None
+
+    class Config:
+        from_attributes = True
+
+class NowCastResponse(BaseModel):
+    station_id: int
+    as_of: datetime
+    pm25_nowcast: Optional[float] = None
+    pm10_nowcast: Optional[float] = None
+    ozone_8h: Optional[float] = None
+    aqi: Optional[int] = None
+    dominant_pollutant: Optional[str] = None
+
+class MeasurementWeatherColumns(BaseModel):
+    # One entry per measurement in every list; weather lists hold None
+    # where no reading of the station falls within the tolerance
+    count: int
+    tolerance_minutes: int
+    station_id: List[int]
+    timestamp: List[str]
+    pm25: List[Optional[float]]
+    pm10: List[Optional[float]]
+    no2: List[Optional[float]]
+    co: List[Optional[float]]
+    so2: List[Optional[float]]
+    ozone: List[Optional[float]]
+    aqi: List[Optional[int]]
+    weather_time: List[Optional[str]]
+    temperature: List[Optional[float]]
+    humidity: List[Optional[float]]
+    wind_speed: List[Optional[float]]
+    pressure: List[Optional[float]]
+    precipitation: List[Optional[float]]
+    weather_condition: List[Optional[str]]
+
+class BulkRowError(BaseModel):
+    row: int
+    field: Optional[str] = None
+    error: str
+
+class BulkIngestResponse(BaseModel):
+    received: int
+    accepted: int
+    inserted: int
+    updated: int
+    rejected: int
+    errors: List[BulkRowError] = []
+
 # -------------------------
 # Station Update Schema
 # -------------------------
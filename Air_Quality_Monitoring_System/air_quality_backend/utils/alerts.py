@@ -0,0 +1,228 @@
+# air_quality_backend/utils/alerts.py
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from ..models import Notification, NotificationType, Station, User
+from .aqi import categorize
+from .ingest import POLLUTANT_FIELDS
+
+# Users opt in through their preferences:
+#     "alerts": {"stations": [12, 40], "aqi": 150, "pm25": 55.5}
+# Each metric present is a limit (alert at or above it); with no limits
+# given, AQI DEFAULT_AQI_THRESHOLD applies.
+ALERT_METRICS = ("aqi",) + POLLUTANT_FIELDS
+METRIC_LABELS = {
+    "aqi": "AQI", "pm25": "PM2.5", "pm10": "PM10", "no2": "NO2",
+    "co": "CO", "so2": "SO2", "ozone": "Ozone",
+}
+# First value of "unhealthy for sensitive groups"
+DEFAULT_AQI_THRESHOLD = 101
+# After an alert, the user/station pair re-arms only once every metric
+# is back under this fraction of its limit, so a value hovering around
+# the limit does not alert on every reading
+REARM_FRACTION = 0.9
+# And never alerts again sooner than this
+ALERT_COOLDOWN = timedelta(hours=3)
+# Older readings (backfills, late uploads) never alert
+MAX_READING_AGE = timedelta(hours=2)
+SUBSCRIPTIONS_TTL_SECONDS = 60
+
+Thresholds = Dict[str, float]
+
+
+def parse_alert_preferences(preferences) -> Optional[Tuple[List[int], Thresholds]]:
+    """(station_ids, limits) from a user's preferences, or None if they watch nothing."""
+    alerts = preferences.get("alerts") if isinstance(preferences, dict) else None
+    if not isinstance(alerts, dict):
+        return None
+    stations = [
+        station_id for station_id in alerts.get("stations") or ()
+        if isinstance(station_id, int) and not isinstance(station_id, bool)
+    ]
+    if not stations:
+        return None
+    thresholds = {
+        metric: float(alerts[metric]) for metric in ALERT_METRICS
+        if isinstance(alerts.get(metric), (int, float))
+        and not isinstance(alerts[metric], bool)
+        and alerts[metric] > 0
+    }
+    return stations, thresholds or {"aqi": float(DEFAULT_AQI_THRESHOLD)}
+
+
+class AlertSubscriptionIndex:
+    """
+    Process-wide station_id -> [(user_id, limits)] for active users with alerts.
+
+    Built from User.preferences once per TTL, so evaluating a batch only
+    looks at the subscribers of the stations it contains.
+    """
+
+    def __init__(self, ttl: float = SUBSCRIPTIONS_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[int, List[Tuple[int, Thresholds]]]] = None
+        self._loaded_at = 0.0
+
+    def invalidate(self):
+        self._index = None
+
+    def get(self, db: Session) -> Dict[int, List[Tuple[int, Thresholds]]]:
+        index = self._index
+        if index is None or time.monotonic() - self._loaded_at > self.ttl:
+            with self._lock:
+                if self._index is index:
+                    rows = db.query(User.user_id, User.preferences).filter(
+                        User.is_active.is_(True),
+                        text("(users.preferences::jsonb) ? 'alerts'")
+                    )
+                    built: Dict[int, List[Tuple[int, Thresholds]]] = {}
+                    for user_id, preferences in rows:
+                        parsed = parse_alert_preferences(preferences)
+                        if parsed is None:
+                            continue
+                        stations, thresholds = parsed
+                        for station_id in set(stations):
+                            built.setdefault(station_id, []).append((user_id, thresholds))
+                    self._index = built
+                    self._loaded_at = time.monotonic()
+                index = self._index
+        return index
+
+
+alert_subscriptions = AlertSubscriptionIndex()
+
+
+def _naive_utc(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _latest_readings(records: Iterable[dict], station_ids, since: datetime) -> Dict[int, dict]:
+    latest: Dict[int, Tuple[datetime, dict]] = {}
+    for record in records:
+        station_id, timestamp = record["station_id"], record.get("timestamp")
+        if station_id not in station_ids or timestamp is None:
+            continue
+        timestamp = _naive_utc(timestamp)
+        if timestamp < since:
+            continue
+        held = latest.get(station_id)
+        if held is None or timestamp >= held[0]:
+            latest[station_id] = (timestamp, record)
+    return {station_id: record for station_id, (_, record) in latest.items()}
+
+
+def _worst_breach(reading: dict, thresholds: Thresholds) -> Optional[Tuple[str, float, float]]:
+    worst, worst_ratio = None, 1.0
+    for metric, limit in thresholds.items():
+        value = reading.get(metric)
+        if value is not None and float(value) / limit >= worst_ratio:
+            worst, worst_ratio = (metric, float(value), limit), float(value) / limit
+    return worst
+
+
+def _rearmed(reading: dict, thresholds: Thresholds) -> bool:
+    return all(
+        reading.get(metric) is None or float(reading[metric]) < limit * REARM_FRACTION
+        for metric, limit in thresholds.items()
+    )
+
+
+_PAIRS = "unnest(CAST(:user_ids AS integer[]), CAST(:station_ids AS integer[])) AS v(user_id, station_id)"
+
+# Claims the pairs allowed to alert: new ones, and re-armed ones out of
+# cooldown. Done in one statement so concurrent workers never both alert.
+_FIRE = f"""
+    INSERT INTO alert_states (user_id, station_id, is_active, last_alert_at)
+    SELECT user_id, station_id, true, :now FROM {_PAIRS}
+    ON CONFLICT (user_id, station_id) DO UPDATE SET
+        is_active = true,
+        last_alert_at = excluded.last_alert_at
+    WHERE NOT alert_states.is_active
+      AND (alert_states.last_alert_at IS NULL OR alert_states.last_alert_at <= :cooldown_start)
+    RETURNING user_id, station_id
+"""
+
+_REARM = f"""
+    UPDATE alert_states a SET is_active = false
+    FROM {_PAIRS}
+    WHERE a.user_id = v.user_id AND a.station_id = v.station_id AND a.is_active
+"""
+
+
+def _pair_params(pairs: List[Tuple[int, int]]) -> dict:
+    return {
+        "user_ids": [user_id for user_id, _ in pairs],
+        "station_ids": [station_id for _, station_id in pairs],
+    }
+
+
+def evaluate_alerts(db: Session, records: Iterable[dict]) -> List[int]:
+    """
+    Check newly stored readings against every subscriber's limits and
+    write the resulting threshold_alert notifications in one bulk insert.
+
+    Only the latest fresh reading per station counts. The caller owns the
+    transaction. Returns the user_id of every notification created.
+    """
+    index = alert_subscriptions.get(db)
+    if not index:
+        return []
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    readings = _latest_readings(records, index, now - MAX_READING_AGE)
+
+    breaches: Dict[Tuple[int, int], Tuple[str, float, float]] = {}
+    rearm: List[Tuple[int, int]] = []
+    for station_id, reading in readings.items():
+        for user_id, thresholds in index[station_id]:
+            breach = _worst_breach(reading, thresholds)
+            if breach is not None:
+                breaches[(user_id, station_id)] = breach
+            elif _rearmed(reading, thresholds):
+                rearm.append((user_id, station_id))
+
+    if rearm:
+        db.execute(text(_REARM), _pair_params(rearm))
+    if not breaches:
+        return []
+
+    fired = db.execute(text(_FIRE), {
+        **_pair_params(sorted(breaches)),
+        "now": now,
+        "cooldown_start": now - ALERT_COOLDOWN,
+    }).all()
+    if not fired:
+        return []
+
+    station_names = dict(db.query(Station.station_id, Station.station_name).filter(
+        Station.station_id.in_({station_id for _, station_id in fired})
+    ))
+    aqi_values = [readings[station_id].get("aqi") for _, station_id in fired]
+    categories = categorize(aqi_values)
+
+    notifications = []
+    for (user_id, station_id), aqi, category in zip(fired, aqi_values, categories):
+        metric, value, limit = breaches[(user_id, station_id)]
+        name = station_names.get(station_id, f"station {station_id}")
+        notifications.append({
+            "user_id": user_id,
+            "notification_type": NotificationType.threshold_alert,
+            "title": f"Air quality alert: {name}"[:100],
+            "message": (
+                f"{METRIC_LABELS[metric]} at {name} is {value:g}, "
+                f"at or above your alert level of {limit:g}."
+            ),
+            "station_id": station_id,
+            "aqi_value": aqi,
+            "aqi_category": category,
+            "is_read": False,
+        })
+    db.execute(insert(Notification), notifications)
+    return [user_id for user_id, _ in fired]
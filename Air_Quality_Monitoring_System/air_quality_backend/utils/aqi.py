@@ -0,0 +1,257 @@
+# air_quality_backend/utils/aqi.py
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# EPA breakpoint tables (May 2024 revision), in the units the app collects:
+# PM in µg/m³, CO in ppm, NO2/SO2/ozone in ppb. Each pollutant has the number
+# of decimals concentrations are truncated to, and rows of
+# (C_lo, C_hi, I_lo, I_hi). Ozone readings are scored as 8-hour values.
+BREAKPOINTS: Dict[str, Tuple[int, Tuple[Tuple[float, float, int, int], ...]]] = {
+    "pm25": (1, (
+        (0.0, 9.0, 0, 50),
+        (9.1, 35.4, 51, 100),
+        (35.5, 55.4, 101, 150),
+        (55.5, 125.4, 151, 200),
+        (125.5, 225.4, 201, 300),
+        (225.5, 325.4, 301, 500),
+    )),
+    "pm10": (0, (
+        (0, 54, 0, 50),
+        (55, 154, 51, 100),
+        (155, 254, 101, 150),
+        (255, 354, 151, 200),
+        (355, 424, 201, 300),
+        (425, 604, 301, 500),
+    )),
+    "ozone": (0, (
+        (0, 54, 0, 50),
+        (55, 70, 51, 100),
+        (71, 85, 101, 150),
+        (86, 105, 151, 200),
+        (106, 200, 201, 300),
+    )),
+    "co": (1, (
+        (0.0, 4.4, 0, 50),
+        (4.5, 9.4, 51, 100),
+        (9.5, 12.4, 101, 150),
+        (12.5, 15.4, 151, 200),
+        (15.5, 30.4, 201, 300),
+        (30.5, 50.4, 301, 500),
+    )),
+    "so2": (0, (
+        (0, 35, 0, 50),
+        (36, 75, 51, 100),
+        (76, 185, 101, 150),
+        (186, 304, 151, 200),
+        (305, 604, 201, 300),
+        (605, 1004, 301, 500),
+    )),
+    "no2": (0, (
+        (0, 53, 0, 50),
+        (54, 100, 51, 100),
+        (101, 360, 101, 150),
+        (361, 649, 151, 200),
+        (650, 1249, 201, 300),
+        (1250, 2049, 301, 500),
+    )),
+}
+AQI_POLLUTANTS = tuple(BREAKPOINTS)
+MAX_AQI = 500
+
+# EPA has no 8-hour ozone rows above 200 ppb and scores such values with the
+# 1-hour table instead, so 201-204 ppb falls back to 151-200 there
+OZONE_8H_MAX = 200
+OZONE_1H_BREAKPOINTS = (0, (
+    (125, 164, 101, 150),
+    (165, 204, 151, 200),
+    (205, 404, 201, 300),
+    (405, 604, 301, 500),
+))
+
+# Upper bound of each EPA AQI category
+AQI_CATEGORY_BREAKPOINTS = (
+    (50, "good"),
+    (100, "moderate"),
+    (150, "unhealthy_sensitive"),
+    (200, "unhealthy"),
+    (300, "very_unhealthy"),
+)
+AQI_CATEGORIES = tuple(category for _, category in AQI_CATEGORY_BREAKPOINTS) + ("hazardous",)
+
+BACKFILL_BATCH_SIZE = 50000
+
+
+def _table(decimals: int, rows):
+    """
+    (decimals, lower bounds, slopes, intercepts) with every row turned into
+    index = slope * C + intercept. A leading row catches negative values
+    (NaN) and a trailing one everything past the table (500), so scoring
+    needs no special cases.
+    """
+    c_lo, c_hi, i_lo, i_hi = np.array(rows, dtype=np.float64).T
+    slopes = (i_hi - i_lo) / (c_hi - c_lo)
+    intercepts = i_lo - slopes * c_lo
+    step = 10.0 ** -decimals
+    lower = np.concatenate(([-np.inf], c_lo, [c_hi[-1] + step / 2]))
+    slopes = np.concatenate(([0.0], slopes, [0.0]))
+    intercepts = np.concatenate(([np.nan], intercepts, [MAX_AQI]))
+    return decimals, lower, slopes, intercepts
+
+
+# Precomputed once per pollutant
+_TABLES = {pollutant: _table(*BREAKPOINTS[pollutant]) for pollutant in BREAKPOINTS}
+_OZONE_1H_TABLE = _table(*OZONE_1H_BREAKPOINTS)
+
+
+def _as_array(values) -> np.ndarray:
+    """Float array with NaN for missing values; accepts lists holding None/Decimal."""
+    if isinstance(values, np.ndarray) and values.dtype.kind == "f":
+        return values.astype(np.float64, copy=False)
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def _score(table, concentrations) -> np.ndarray:
+    decimals, lower, slopes, intercepts = table
+    scale = 10.0 ** decimals
+    # The epsilon keeps e.g. 35.4 (stored as 35.39999...) from truncating to 35.3
+    c = np.floor(_as_array(concentrations) * scale + 1e-9) / scale
+
+    # After truncation every value falls inside a row, so its row is the
+    # number of lower bounds it reaches. With seven rows, counting with
+    # comparisons beats searchsorted; NaN reaches none and lands on row 0.
+    row = np.zeros(c.shape, dtype=np.int8)
+    for bound in lower[1:]:
+        row += c >= bound
+    return np.floor(slopes[row] * c + intercepts[row] + 0.5)
+
+
+def sub_index(pollutant: str, concentrations) -> np.ndarray:
+    """
+    EPA sub-index of one pollutant for a whole column of concentrations.
+
+    Concentrations are truncated to the table's precision, matched to their
+    breakpoint row and linearly interpolated.
+    Missing or negative values give NaN; values past the table give 500.
+    Ozone above OZONE_8H_MAX is scored with the 1-hour table.
+    """
+    concentrations = _as_array(concentrations)
+    index = _score(_TABLES[pollutant], concentrations)
+    if pollutant == "ozone":
+        above = concentrations >= OZONE_8H_MAX + 1
+        if above.any():
+            index[above] = _score(_OZONE_1H_TABLE, concentrations[above])
+    return index
+
+
+def compute_aqi(columns: Mapping[str, Sequence]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Overall AQI and dominant pollutant for a batch of readings.
+
+    `columns` maps pollutant names to equal-length columns (any subset of
+    AQI_POLLUTANTS). Returns (aqi, dominant): a float array with NaN where no
+    pollutant was given, and an object array of pollutant names (None where
+    aqi is NaN).
+    """
+    pollutants = [p for p in AQI_POLLUTANTS if p in columns]
+    if not pollutants:
+        raise ValueError("No pollutant columns to compute AQI from")
+
+    # Running maximum over the sub-indices; NaN never compares greater, so
+    # rows with no pollutant at all keep the NaN start value
+    aqi = np.full(len(columns[pollutants[0]]), np.nan)
+    dominant_row = np.zeros(aqi.shape, dtype=np.intp)
+    for i, pollutant in enumerate(pollutants):
+        index = sub_index(pollutant, columns[pollutant])
+        higher = (index > aqi) | (np.isnan(aqi) & ~np.isnan(index))
+        aqi[higher] = index[higher]
+        dominant_row[higher] = i
+
+    dominant = np.array(pollutants, dtype=object)[dominant_row]
+    dominant[np.isnan(aqi)] = None
+    return aqi, dominant
+
+
+def categorize(aqi) -> np.ndarray:
+    """EPA category names for an array of AQI values (None for NaN)."""
+    aqi = _as_array(aqi)
+    uppers = np.array([upper for upper, _ in AQI_CATEGORY_BREAKPOINTS], dtype=np.float64)
+    categories = np.array(AQI_CATEGORIES, dtype=object)[
+        np.searchsorted(uppers, np.floor(aqi + 0.5), side="left")
+    ]
+    categories[np.isnan(aqi)] = None
+    return categories
+
+
+def fill_missing_aqi(records: List[dict], aqi_field: str = "aqi"):
+    """Set records[i][aqi_field] from the pollutants wherever it is None, in place."""
+    pending = [record for record in records if record.get(aqi_field) is None]
+    if not pending:
+        return
+    aqi, _ = compute_aqi({p: [record.get(p) for record in pending] for p in AQI_POLLUTANTS})
+    for record, value in zip(pending, aqi.tolist()):
+        if value == value:  # not NaN
+            record[aqi_field] = int(value)
+
+
+# -------------------------
+# Backfill
+# -------------------------
+
+def backfill_measurement_aqi(
+        db: Session,
+        only_missing: bool = True,
+        batch_size: int = BACKFILL_BATCH_SIZE
+) -> int:
+    """
+    Recompute measurements.aqi from the stored pollutants.
+
+    Walks the table in primary-key order, scores each batch in one vectorized
+    call and writes it back with a single UPDATE ... FROM unnest. Commits per
+    batch so a long backfill holds no locks for long. Returns rows updated.
+    """
+    pollutant_list = ", ".join(AQI_POLLUTANTS)
+    where = "AND aqi IS NULL" if only_missing else ""
+    last_id, updated = 0, 0
+    while True:
+        rows = db.execute(text(f"""
+            SELECT measurement_id, {pollutant_list}
+            FROM measurements
+            WHERE measurement_id > :last_id {where}
+            ORDER BY measurement_id
+            LIMIT :batch_size
+        """), {"last_id": last_id, "batch_size": batch_size}).all()
+        if not rows:
+            return updated
+        last_id = rows[-1][0]
+
+        ids = np.array([row[0] for row in rows])
+        aqi, _ = compute_aqi({
+            pollutant: [row[i] for row in rows]
+            for i, pollutant in enumerate(AQI_POLLUTANTS, start=1)
+        })
+        scored = ~np.isnan(aqi)
+        if scored.any():
+            result = db.execute(text("""
+                UPDATE measurements AS m SET aqi = v.aqi
+                FROM unnest(CAST(:ids AS integer[]), CAST(:aqi AS integer[])) AS v(id, aqi)
+                WHERE m.measurement_id = v.id AND m.aqi IS DISTINCT FROM v.aqi
+            """), {"ids": ids[scored].tolist(), "aqi": aqi[scored].astype(np.int64).tolist()})
+            updated += result.rowcount
+        db.commit()
+
+
+if __name__ == "__main__":
+    # python -m air_quality_backend.utils.aqi [--all]
+    import sys
+
+    from ..database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        count = backfill_measurement_aqi(session, only_missing="--all" not in sys.argv)
+        print(f"Updated AQI on {count} measurements")
+    finally:
+        session.close()
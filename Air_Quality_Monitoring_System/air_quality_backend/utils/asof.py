@@ -0,0 +1,110 @@
+# air_quality_backend/utils/asof.py
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+MEASUREMENT_FIELDS = ("pm25", "pm10", "no2", "co", "so2", "ozone", "aqi")
+WEATHER_FIELDS = ("temperature", "humidity", "wind_speed", "pressure", "precipitation")
+
+
+def epoch_us(moments: Sequence[Optional[datetime]]) -> np.ndarray:
+    """Naive UTC datetimes as int64 microseconds since the epoch."""
+    return np.array(moments, dtype="datetime64[us]").astype(np.int64)
+
+
+def asof_indices(
+        left_keys: np.ndarray,
+        left_times: np.ndarray,
+        right_keys: np.ndarray,
+        right_times: np.ndarray,
+        tolerance: int
+) -> np.ndarray:
+    """
+    As-of join: for every left row, the index of the latest right row with
+    the same key at or before its time and at most `tolerance` earlier,
+    or -1 where there is none.
+
+    Keys are integers and times int64 in one unit (tolerance too). Both
+    sides are folded into a single sorted (key, time) axis, so the whole
+    join is one argsort and one searchsorted however many keys there are.
+    """
+    matches = np.full(len(left_keys), -1, dtype=np.intp)
+    if not len(left_keys) or not len(right_keys):
+        return matches
+
+    _, codes = np.unique(np.concatenate((left_keys, right_keys)), return_inverse=True)
+    codes = codes.astype(np.int64)
+    left_codes, right_codes = codes[:len(left_keys)], codes[len(left_keys):]
+
+    start = min(left_times.min(), right_times.min())
+    span = int(max(left_times.max(), right_times.max()) - start) + 1
+    if (int(codes.max()) + 1) * span >= 2 ** 63:
+        raise ValueError("Time range too wide to join this many keys at once")
+
+    right_axis = right_codes * span + (right_times - start)
+    order = np.argsort(right_axis, kind="stable")
+    position = np.searchsorted(right_axis[order], left_codes * span + (left_times - start), side="right") - 1
+
+    found = position >= 0
+    candidates = order[np.where(found, position, 0)]
+    found &= right_codes[candidates] == left_codes
+    found &= left_times - right_times[candidates] <= tolerance
+    matches[found] = candidates[found]
+    return matches
+
+
+def take(values: np.ndarray, indices: np.ndarray) -> list:
+    """values[indices] as a list, with None where the index is -1 or the value NaN."""
+    if not len(values):
+        return [None] * len(indices)
+    picked = values[np.where(indices >= 0, indices, 0)]
+    return [
+        None if index < 0 or value != value else value
+        for index, value in zip(indices.tolist(), picked.tolist())
+    ]
+
+
+def float_column(rows, position: int) -> np.ndarray:
+    """Column `position` of rows as floats, NaN for NULL."""
+    return np.array([np.nan if row[position] is None else float(row[position]) for row in rows], dtype=float)
+
+
+def _timestamps(values: np.ndarray) -> list:
+    return np.datetime_as_string(values.astype("datetime64[us]"), unit="s").tolist()
+
+
+def align_weather(measurements: Sequence, weather: Sequence, tolerance: timedelta) -> Dict[str, List]:
+    """
+    Columns of measurements with the weather in effect at each reading.
+
+    `measurements` rows are (station_id, timestamp, *MEASUREMENT_FIELDS) and
+    `weather` rows (station_id, measurement_time, *WEATHER_FIELDS,
+    weather_condition). Every measurement keeps its row; the weather
+    columns hold the latest reading of the same station no more than
+    `tolerance` earlier, or None where there is none.
+    """
+    station_ids = np.array([row[0] for row in measurements], dtype=np.int64)
+    times = epoch_us([row[1] for row in measurements])
+    weather_station_ids = np.array([row[0] for row in weather], dtype=np.int64)
+    weather_times = epoch_us([row[1] for row in weather])
+
+    matches = asof_indices(
+        station_ids, times, weather_station_ids, weather_times,
+        tolerance // timedelta(microseconds=1)
+    )
+
+    columns: Dict[str, List] = {
+        "station_id": station_ids.tolist(),
+        "timestamp": _timestamps(times),
+    }
+    for position, field in enumerate(MEASUREMENT_FIELDS, start=2):
+        values = [row[position] for row in measurements]
+        columns[field] = [None if value is None else (int if field == "aqi" else float)(value) for value in values]
+
+    columns["weather_time"] = take(np.array(_timestamps(weather_times), dtype=object), matches)
+    for position, field in enumerate(WEATHER_FIELDS, start=2):
+        columns[field] = take(float_column(weather, position), matches)
+    conditions = np.array([row[-1] for row in weather], dtype=object)
+    columns["weather_condition"] = take(conditions, matches)
+    return columns
@@ -0,0 +1,99 @@
+# air_quality_backend/utils/export.py
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterator, List, Optional, Sequence
+
+from sqlalchemy import or_, select
+
+from ..database import SessionLocal
+from ..models import Measurement
+from .ingest import POLLUTANT_FIELDS
+
+EXPORT_POLLUTANTS = (*POLLUTANT_FIELDS, "aqi")
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+# Rows fetched per round trip from the server-side cursor, and encoded per chunk
+EXPORT_BATCH_SIZE = 5000
+
+
+def export_statement(
+        station_ids: Optional[Sequence[int]] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        pollutants: Sequence[str] = EXPORT_POLLUTANTS
+):
+    """
+    Oldest-first select of the requested columns.
+
+    With a pollutant subset, rows where every requested pollutant is NULL
+    are left out, since they would export as empty lines.
+    """
+    pollutant_columns = [getattr(Measurement, field) for field in pollutants]
+    stmt = select(
+        Measurement.measurement_id,
+        Measurement.station_id,
+        Measurement.timestamp,
+        *pollutant_columns,
+        Measurement.source
+    )
+
+    if station_ids:
+        stmt = stmt.where(Measurement.station_id.in_(station_ids))
+    if start_time:
+        stmt = stmt.where(Measurement.timestamp >= start_time)
+    if end_time:
+        stmt = stmt.where(Measurement.timestamp <= end_time)
+    if len(pollutants) < len(EXPORT_POLLUTANTS):
+        stmt = stmt.where(or_(*(column.isnot(None) for column in pollutant_columns)))
+
+    return stmt.order_by(Measurement.timestamp, Measurement.measurement_id)
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _encode_ndjson(columns: List[str], rows) -> str:
+    dumps = json.JSONEncoder(separators=(",", ":")).encode
+    return "".join(
+        dumps(dict(zip(columns, map(_plain, row)))) + "\n"
+        for row in rows
+    )
+
+
+def _encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def stream_measurements(stmt, fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """
+    Yield the export one encoded chunk per batch.
+
+    Rows come from a server-side cursor (yield_per), so at most one batch is
+    held in memory however large the export is. The generator owns its own
+    session: the response body is produced after the request's dependencies
+    may already have been torn down.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=batch_size))
+        columns = list(result.keys())
+        if fmt == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(columns)
+            yield buffer.getvalue()
+        for rows in result.partitions():
+            yield _encode_csv(rows) if fmt == "csv" else _encode_ndjson(columns, rows)
+    finally:
+        db.close()
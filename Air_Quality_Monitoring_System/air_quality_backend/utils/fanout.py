@@ -0,0 +1,116 @@
+# air_quality_backend/utils/fanout.py
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from ..database import SessionLocal
+from ..models import JobStatus, NotificationJob
+from .unread import unread_counter
+
+# Recipients per INSERT ... SELECT and per commit
+FANOUT_CHUNK_SIZE = 10000
+
+_ACTIVE_USERS = """
+    SELECT user_id FROM users
+    WHERE is_active AND user_id > :after
+    ORDER BY user_id
+    LIMIT :chunk_size
+"""
+
+# Explicit recipient lists are sent a sorted slice at a time; ids that no
+# longer exist are skipped by the lookup
+_LISTED_USERS = """
+    SELECT user_id FROM users
+    WHERE user_id = ANY(CAST(:user_ids AS integer[])) AND user_id > :after
+"""
+
+# One chunk: insert the notifications and advance the job's progress in a
+# single statement, so a committed chunk and its progress never disagree
+_CHUNK = """
+    WITH recipients AS ({source}),
+    inserted AS (
+        INSERT INTO notifications (
+            user_id, notification_type, title, message,
+            station_id, aqi_value, aqi_category, is_read, created_at
+        )
+        SELECT user_id, CAST(:notification_type AS notification_type), :title, :message,
+               :station_id, :aqi_value, CAST(:aqi_category AS aqi_category), false, :created_at
+        FROM recipients
+    )
+    UPDATE notification_jobs SET
+        sent = sent + (SELECT count(*) FROM recipients),
+        last_user_id = coalesce((SELECT max(user_id) FROM recipients), last_user_id)
+    WHERE job_id = :job_id
+    RETURNING (SELECT count(*) FROM recipients), last_user_id,
+              (SELECT array_agg(user_id) FROM recipients)
+"""
+
+
+def run_fanout_job(
+        job_id: int,
+        notification: dict,
+        user_ids: Optional[List[int]] = None,
+        chunk_size: int = FANOUT_CHUNK_SIZE
+):
+    """
+    Write one notification per recipient, chunk by chunk, with set-based
+    INSERT ... SELECT statements instead of a row per user.
+
+    Sends to `user_ids` if given, else to every active user. Runs outside
+    the request with its own session; progress is committed with each
+    chunk, so GET /notifications/jobs/{job_id} can follow it.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(NotificationJob, job_id)
+        job.status = JobStatus.running
+        db.commit()
+
+        params = {
+            "job_id": job_id,
+            "notification_type": notification["notification_type"],
+            "title": notification["title"],
+            "message": notification["message"],
+            "station_id": notification.get("station_id"),
+            "aqi_value": notification.get("aqi_value"),
+            "aqi_category": notification.get("aqi_category"),
+            "created_at": datetime.now(timezone.utc).replace(tzinfo=None),
+        }
+        after = job.last_user_id
+
+        if user_ids is None:
+            chunk = text(_CHUNK.format(source=_ACTIVE_USERS))
+            while True:
+                sent, after, recipients = db.execute(
+                    chunk, {**params, "after": after, "chunk_size": chunk_size}
+                ).one()
+                db.commit()
+                unread_counter.add(recipients or ())
+                if sent < chunk_size:
+                    break
+        else:
+            chunk = text(_CHUNK.format(source=_LISTED_USERS))
+            pending = sorted({user_id for user_id in user_ids if user_id > after})
+            for start in range(0, len(pending), chunk_size):
+                _, _, recipients = db.execute(
+                    chunk, {**params, "after": after, "user_ids": pending[start:start + chunk_size]}
+                ).one()
+                db.commit()
+                unread_counter.add(recipients or ())
+
+        job.status = JobStatus.completed
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Notification job {job_id} failed: {str(e)}")
+        job = db.get(NotificationJob, job_id)
+        if job is not None:
+            job.status = JobStatus.failed
+            job.error = str(e)
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,41 @@
+# air_quality_backend/utils/geo.py
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from ..models import Station
+from .kdtree import GeoIndex
+
+# Other workers can change stations too, so never trust the index forever
+INDEX_TTL_SECONDS = 300
+
+
+class StationGeoCache:
+    """Process-wide GeoIndex of all stations, keyed by station_id."""
+
+    def __init__(self, ttl: float = INDEX_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index: Optional[GeoIndex] = None
+        self._loaded_at = 0.0
+
+    def invalidate(self):
+        self._index = None
+
+    def get(self, db: Session) -> GeoIndex:
+        index = self._index
+        if index is None or time.monotonic() - self._loaded_at > self.ttl:
+            with self._lock:
+                if self._index is index:
+                    rows = db.query(
+                        Station.station_id, Station.latitude, Station.longitude
+                    ).all()
+                    self._index = GeoIndex(rows)
+                    self._loaded_at = time.monotonic()
+                index = self._index
+        return index
+
+
+station_geo_index = StationGeoCache()
@@ -0,0 +1,499 @@
+# air_quality_backend/utils/ingest.py
+import csv
+import io
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import repeat
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import insert as bulk_insert, text
+from sqlalchemy.orm import Session
+
+from ..models import ContributionStatus, PublicContribution, Station
+from .aqi import AQI_POLLUTANTS, compute_aqi
+
+POLLUTANT_FIELDS = ("pm25", "pm10", "no2", "co", "so2", "ozone")
+# DECIMAL(5, 2) columns
+MAX_POLLUTANT_VALUE = 999.99
+MAX_BULK_ROWS = 50000
+UPSERT_BATCH_SIZE = 1000
+STATION_IDS_TTL_SECONDS = 60
+
+
+# -------------------------
+# Known station IDs
+# -------------------------
+
+class StationIdCache:
+    """Set of existing station IDs, so bulk validation needs no per-row lookups."""
+
+    def __init__(self, ttl: float = STATION_IDS_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._ids: Optional[Set[int]] = None
+        self._loaded_at = 0.0
+
+    def invalidate(self):
+        self._ids = None
+
+    def _load(self, db: Session) -> Set[int]:
+        with self._lock:
+            ids = {station_id for (station_id,) in db.query(Station.station_id)}
+            self._ids = ids
+            self._loaded_at = time.monotonic()
+        return ids
+
+    def resolve(self, db: Session, station_ids: Set[int]) -> Set[int]:
+        """The subset of station_ids that exist."""
+        ids = self._ids
+        if ids is None or time.monotonic() - self._loaded_at > self.ttl:
+            ids = self._load(db)
+        missing = station_ids - ids
+        if missing:
+            # Possibly created by another worker since the last load
+            ids = self._load(db)
+        return station_ids & ids
+
+
+known_station_ids = StationIdCache()
+
+
+# -------------------------
+# Parsing
+# -------------------------
+
+def parse_rows(body: bytes, content_type: str) -> List[dict]:
+    """Decode a JSON array, NDJSON or CSV payload into a list of raw row dicts."""
+    text = body.decode("utf-8-sig")
+    content_type = content_type.split(";")[0].strip().lower()
+
+    if content_type in ("text/csv", "application/csv"):
+        return [
+            {key: (value if value != "" else None) for key, value in row.items()}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        rows = []
+        for line_no, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_no}: {e.msg}")
+        return rows
+
+    try:
+        rows = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e.msg}")
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of readings")
+    return rows
+
+
+# -------------------------
+# Column-wise validation
+# -------------------------
+
+# Longest ISO 8601 timestamp the vectorized parser is handed
+_MAX_TIMESTAMP_LENGTH = 32
+
+
+def _to_float(value):
+    if isinstance(value, bool):
+        raise ValueError("must be a number")
+    return float(value)
+
+
+def _to_timestamp(value):
+    """Naive UTC, the way the timestamp columns store it."""
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _objects(rows: list, errors: Dict[int, Tuple[str, str]]) -> list:
+    """Rows with every non-object replaced by {} (and reported)."""
+    objects = []
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors[i] = ("", "row must be an object")
+            row = {}
+        objects.append(row)
+    return objects
+
+
+def _column(rows: List[dict], field: str) -> np.ndarray:
+    return np.fromiter(map(dict.get, rows, repeat(field)), dtype=object, count=len(rows))
+
+
+def _types(values: np.ndarray) -> np.ndarray:
+    return np.fromiter(map(type, values), dtype=object, count=len(values))
+
+
+def _flag(errors: Dict[int, Tuple[str, str]], mask: np.ndarray, field: str, message):
+    """Record the first error of every row in mask; message may be a callable of the row."""
+    for i in np.flatnonzero(mask).tolist():
+        if i not in errors:
+            errors[i] = (field, message(i) if callable(message) else message)
+
+
+def _valid(errors: Dict[int, Tuple[str, str]], count: int) -> np.ndarray:
+    valid = np.ones(count, dtype=bool)
+    valid[list(errors)] = False
+    return valid
+
+
+def _numeric_column(
+        values: np.ndarray,
+        errors: Dict[int, Tuple[str, str]],
+        field: str,
+        integer: bool = False,
+        required: bool = False,
+        check: Optional[Callable] = None,
+        check_message: str = ""
+) -> np.ndarray:
+    """
+    Parse one column of numbers with a single float64 conversion and
+    vectorized checks, recording the first error per row.
+
+    Returns an object array of Python ints/floats, None where the value is
+    missing or invalid. Values are only looked at one by one when the
+    whole-column conversion fails, to find the ones that are not numbers.
+    """
+    types = _types(values)
+    missing = types == type(None)
+    if required:
+        _flag(errors, missing, field, "field required")
+    # float() would take True as 1 and a one-item list as its item
+    invalid = (types == bool) | (types == list) | (types == dict)
+    candidates = np.where(invalid, None, values)
+    try:
+        numbers = candidates.astype(np.float64)
+    except (TypeError, ValueError, OverflowError):
+        numbers = np.empty(len(values))
+        for i, value in enumerate(candidates.tolist()):
+            try:
+                numbers[i] = np.nan if value is None else _to_float(value)
+            except (TypeError, ValueError, OverflowError):
+                numbers[i] = np.nan
+                invalid[i] = True
+
+    with np.errstate(invalid="ignore"):
+        if integer:
+            invalid |= ~missing & ~(np.isfinite(numbers) & (numbers == np.floor(numbers)))
+        _flag(errors, invalid & ~missing, field, lambda i: f"invalid value {values[i]!r}")
+        present = ~missing & ~invalid
+        if check is not None:
+            failed = present & ~check(numbers)
+            _flag(errors, failed, field, check_message)
+            present &= ~failed
+
+        parsed = (np.where(present, numbers, 0).astype(np.int64) if integer else numbers).astype(object)
+    parsed[~present] = None
+    return parsed
+
+
+def _text_column(
+        values: np.ndarray,
+        errors: Dict[int, Tuple[str, str]],
+        field: str,
+        required: bool = False,
+        max_length: Optional[int] = None
+) -> np.ndarray:
+    """Text column as an object array of str (None where missing or invalid)."""
+    types = _types(values)
+    missing = types == type(None)
+    if required:
+        _flag(errors, missing, field, "field required")
+    invalid = (types == list) | (types == dict)
+    _flag(errors, invalid, field, lambda i: f"invalid value {values[i]!r}")
+    present = ~missing & ~invalid
+
+    parsed = np.full(len(values), None, dtype=object)
+    parsed[present] = np.fromiter(map(str, values[present]), dtype=object, count=int(present.sum()))
+    if max_length is not None:
+        lengths = np.zeros(len(values), dtype=np.int64)
+        lengths[present] = np.fromiter(map(len, parsed[present]), dtype=np.int64, count=int(present.sum()))
+        failed = present & ((lengths == 0) | (lengths > max_length))
+        _flag(errors, failed, field, f"must be 1-{max_length} characters")
+        parsed[failed] = None
+    return parsed
+
+
+def _timestamp_column(values: np.ndarray, errors: Dict[int, Tuple[str, str]], field: str) -> np.ndarray:
+    """
+    ISO 8601 timestamps as an object array of naive UTC datetimes (None
+    where missing or invalid).
+
+    Plain "YYYY-MM-DD[T ]HH:MM[:SS[.ffffff]]" strings, optionally ending
+    in Z, are parsed in one numpy datetime64 conversion. Explicit UTC
+    offsets, datetime objects and anything numpy rejects go through
+    datetime.fromisoformat one by one.
+    """
+    types = _types(values)
+    missing = types == type(None)
+    parsed = np.full(len(values), None, dtype=object)
+    slow = ~missing
+
+    strings = np.flatnonzero(types == str)
+    lengths = np.fromiter(map(len, values[strings]), dtype=np.int64, count=len(strings))
+    strings = strings[(lengths >= 10) & (lengths <= _MAX_TIMESTAMP_LENGTH)]
+    iso = values[strings].astype(f"U{_MAX_TIMESTAMP_LENGTH}")
+    iso = np.where(np.char.endswith(iso, "Z"), np.char.rstrip(iso, "Z"), iso)
+    # A +hh:mm or -hh:mm offset comes after the 10-character date
+    offset = (np.char.rfind(iso, "+") >= 10) | (np.char.rfind(iso, "-") >= 10)
+    strings, iso = strings[~offset], iso[~offset]
+    try:
+        stamps = iso.astype("datetime64[us]")
+    except ValueError:
+        pass
+    else:
+        # numpy also reads "NaT"; leave those to fromisoformat, which rejects them
+        read = ~np.isnat(stamps)
+        parsed[strings[read]] = stamps[read].astype(object)
+        slow[strings[read]] = False
+
+    for i in np.flatnonzero(slow).tolist():
+        try:
+            parsed[i] = _to_timestamp(values[i])
+        except (TypeError, ValueError, OverflowError):
+            if i not in errors:
+                errors[i] = (field, f"invalid value {values[i]!r}")
+    return parsed
+
+
+def _check_stations(db: Session, station_ids: np.ndarray, errors: Dict[int, Tuple[str, str]]):
+    """Flag still-valid rows whose station_id does not exist; rows without one are left alone."""
+    pending = _valid(errors, len(station_ids)) & (station_ids != None)  # noqa: E711
+    existing = known_station_ids.resolve(db, set(station_ids[pending].tolist()))
+    known = np.fromiter(map(existing.__contains__, station_ids), dtype=bool, count=len(station_ids))
+    _flag(errors, pending & ~known, "station_id", lambda i: f"station {station_ids[i]} not found")
+
+
+def _pollutant_range(values: np.ndarray) -> np.ndarray:
+    return (values >= 0) & (values <= MAX_POLLUTANT_VALUE)
+
+
+def _fill_aqi(columns: Dict[str, np.ndarray], aqi_field: str):
+    """Set columns[aqi_field] from the pollutant columns wherever it is None, in place."""
+    aqi = columns[aqi_field]
+    pending = aqi == None  # noqa: E711
+    if not pending.any():
+        return
+    computed, _ = compute_aqi({p: columns[p][pending].astype(np.float64) for p in AQI_POLLUTANTS})
+    scored = ~np.isnan(computed)
+    filled = aqi[pending]
+    filled[scored] = computed[scored].astype(np.int64).astype(object)
+    aqi[pending] = filled
+
+
+def _error_report(errors: Dict[int, Tuple[str, str]]) -> List[dict]:
+    return [
+        {"row": i, "field": field or None, "error": message}
+        for i, (field, message) in sorted(errors.items())
+    ]
+
+
+def validate_measurement_rows(db: Session, rows: List[dict]) -> Tuple[List[dict], List[dict]]:
+    """
+    Validate raw rows column by column.
+
+    Returns (valid measurement dicts ready for insert, per-row error dicts).
+    Timestamps are normalized to naive UTC first, so the same instant sent
+    with and without an offset counts as one reading. Rows repeating a
+    (station_id, timestamp) pair keep only the last copy, matching what a
+    sequence of single-row upserts would have stored; the earlier copies are
+    reported, so every row is either accepted or has an error. Rows without a
+    timestamp are all stamped with the same "now", so of several for one
+    station only the last is kept as well.
+    """
+    errors: Dict[int, Tuple[str, str]] = {}
+    rows = _objects(rows, errors)
+
+    columns = {
+        "station_id": _numeric_column(
+            _column(rows, "station_id"), errors, "station_id", integer=True, required=True
+        ),
+        "timestamp": _timestamp_column(_column(rows, "timestamp"), errors, "timestamp"),
+        "source": _text_column(_column(rows, "source"), errors, "source", required=True, max_length=50),
+    }
+    for field in POLLUTANT_FIELDS:
+        columns[field] = _numeric_column(
+            _column(rows, field), errors, field,
+            check=_pollutant_range, check_message=f"must be between 0 and {MAX_POLLUTANT_VALUE}"
+        )
+    columns["aqi"] = _numeric_column(
+        _column(rows, "aqi"), errors, "aqi", integer=True,
+        check=lambda v: v >= 0, check_message="must not be negative"
+    )
+    _check_stations(db, columns["station_id"], errors)
+
+    # Readings sent without an AQI get one computed from their pollutants
+    _fill_aqi(columns, "aqi")
+
+    accepted = _valid(errors, len(rows))
+    station_ids = columns["station_id"][accepted].tolist()
+    timestamps = columns["timestamp"][accepted].tolist()
+    positions = np.flatnonzero(accepted).tolist()
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    latest: Dict[Tuple[int, datetime], int] = {}
+    stamped_now: Dict[int, int] = {}
+    for n, (i, station_id, timestamp) in enumerate(zip(positions, station_ids, timestamps)):
+        if timestamp is None:
+            timestamps[n] = timestamp = now
+            superseded = stamped_now.get(station_id)
+            if superseded is not None:
+                errors[positions[superseded]] = ("timestamp", f"no timestamp; replaced by row {i} of the same station")
+            stamped_now[station_id] = n
+        superseded = latest.get((station_id, timestamp))
+        if superseded is not None and positions[superseded] not in errors:
+            errors[positions[superseded]] = ("timestamp", f"duplicate reading; superseded by row {i}")
+        latest[(station_id, timestamp)] = n
+
+    kept = sorted(latest.values())
+    columns["timestamp"][accepted] = timestamps
+    fields = list(columns)
+    records = [
+        dict(zip(fields, values))
+        for values in zip(*(columns[field][accepted][kept].tolist() for field in fields))
+    ]
+    return records, _error_report(errors)
+
+
+# -------------------------
+# Writing
+# -------------------------
+
+_UPSERT = f"""
+    INSERT INTO measurements (station_id, "timestamp", {", ".join(POLLUTANT_FIELDS)}, aqi, source)
+    SELECT * FROM unnest(
+        CAST(:station_id AS integer[]), CAST(:timestamp AS timestamp[]),
+        {", ".join(f"CAST(:{field} AS numeric[])" for field in POLLUTANT_FIELDS)},
+        CAST(:aqi AS integer[]), CAST(:source AS text[])
+    )
+    ON CONFLICT (station_id, "timestamp") DO UPDATE SET
+        {", ".join(f"{field} = excluded.{field}" for field in (*POLLUTANT_FIELDS, "aqi", "source"))}
+    RETURNING xmax = 0
+"""
+
+
+def upsert_measurements(db: Session, records: List[dict], batch_size: int = UPSERT_BATCH_SIZE) -> Tuple[int, int]:
+    """
+    Write records with INSERT ... ON CONFLICT (station_id, timestamp), one
+    statement per batch with each column bound as a single array.
+
+    Records must not repeat a (station_id, timestamp) pair. Returns
+    (inserted, updated). The caller owns the transaction.
+    """
+    inserted = updated = 0
+    for start in range(0, len(records), batch_size):
+        batch = records[start:start + batch_size]
+        # xmax is 0 only for freshly inserted tuples
+        for (was_inserted,) in db.execute(text(_UPSERT), {
+            field: [record.get(field) for record in batch]
+            for field in ("station_id", "timestamp", *POLLUTANT_FIELDS, "aqi", "source")
+        }):
+            if was_inserted:
+                inserted += 1
+            else:
+                updated += 1
+    return inserted, updated
+
+
+def ingest_measurement_rows(db: Session, rows: List[dict]) -> Tuple[List[dict], List[dict], int, int]:
+    """
+    Validate and upsert parsed rows in one transaction.
+
+    Returns (accepted records, error report, inserted, updated).
+    """
+    records, errors = validate_measurement_rows(db, rows)
+    try:
+        inserted, updated = upsert_measurements(db, records)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return records, errors, inserted, updated
+
+
+# -------------------------
+# Public contributions
+# -------------------------
+
+def validate_contribution_rows(db: Session, rows: List[dict]) -> Tuple[List[dict], List[dict]]:
+    """
+    Validate raw contribution rows column by column.
+
+    Same rules as POST /contributions: readings need a station_id that
+    exists, pollutants and overall_aqi must fit their DECIMAL(5, 2)
+    columns. Returns (valid contribution dicts, per-row error dicts);
+    unlike measurements, repeated rows are all kept.
+    """
+    errors: Dict[int, Tuple[str, str]] = {}
+    rows = _objects(rows, errors)
+
+    columns = {
+        "station_id": _numeric_column(_column(rows, "station_id"), errors, "station_id", integer=True),
+        "timestamp": _timestamp_column(_column(rows, "timestamp"), errors, "timestamp"),
+        "source": _text_column(_column(rows, "source"), errors, "source", required=True, max_length=50),
+        "additional_info": _text_column(_column(rows, "additional_info"), errors, "additional_info"),
+    }
+    for field in (*POLLUTANT_FIELDS, "overall_aqi"):
+        columns[field] = _numeric_column(
+            _column(rows, field), errors, field,
+            check=_pollutant_range, check_message=f"must be between 0 and {MAX_POLLUTANT_VALUE}"
+        )
+
+    readings = np.logical_or.reduce([
+        columns[field] != None for field in (*POLLUTANT_FIELDS, "overall_aqi")  # noqa: E711
+    ])
+    _flag(
+        errors, readings & (columns["station_id"] == None),  # noqa: E711
+        "station_id", "Station ID is required for AQI contributions"
+    )
+    _check_stations(db, columns["station_id"], errors)
+
+    _fill_aqi(columns, "overall_aqi")
+
+    accepted = _valid(errors, len(rows))
+    fields = list(columns)
+    records = [
+        dict(zip(fields, values))
+        for values in zip(*(columns[field][accepted].tolist() for field in fields))
+    ]
+    return records, _error_report(errors)
+
+
+def ingest_contribution_rows(
+        db: Session,
+        rows: List[dict],
+        user_id: int,
+        batch_size: int = UPSERT_BATCH_SIZE
+) -> Tuple[int, List[dict]]:
+    """
+    Validate parsed rows and insert the valid ones as pending contributions
+    of user_id, in batches within one transaction.
+
+    Returns (rows inserted, error report).
+    """
+    records, errors = validate_contribution_rows(db, rows)
+    try:
+        for start in range(0, len(records), batch_size):
+            db.execute(bulk_insert(PublicContribution), [
+                {**record, "user_id": user_id, "status": ContributionStatus.pending}
+                for record in records[start:start + batch_size]
+            ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(records), errors
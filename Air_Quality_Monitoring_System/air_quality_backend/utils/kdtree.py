@@ -0,0 +1,139 @@
+# air_quality_backend/utils/kdtree.py
+# Plain data structure with no app imports, so the legacy API in backend/
+# can use it too
+import heapq
+import math
+from typing import Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+LEAF_SIZE = 8
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def to_unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    lat, lon = math.radians(lat), math.radians(lon)
+    cos_lat = math.cos(lat)
+    return cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat)
+
+
+class GeoIndex:
+    """
+    KD-tree over points projected onto the unit sphere.
+
+    Straight-line (chord) distance between unit vectors grows monotonically
+    with great-circle distance, so the tree can prune in 3D without any
+    longitude distortion and the ranking matches true haversine order.
+    Build with an iterable of (key, latitude, longitude) tuples.
+    """
+
+    def __init__(self, points: Iterable[Tuple[object, float, float]] = ()):
+        self._keys = []
+        self._coords = []
+        self._xyz = []
+        for key, lat, lon in points:
+            lat, lon = float(lat), float(lon)
+            self._keys.append(key)
+            self._coords.append((lat, lon))
+            self._xyz.append(to_unit_vector(lat, lon))
+        self._root = self._build(list(range(len(self._keys))))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _build(self, idxs: list):
+        # Leaves are plain index lists; inner nodes are (axis, split, left, right)
+        if len(idxs) <= LEAF_SIZE:
+            return idxs
+        xyz = self._xyz
+        axis = max(
+            range(3),
+            key=lambda a: max(xyz[i][a] for i in idxs) - min(xyz[i][a] for i in idxs)
+        )
+        idxs.sort(key=lambda i: xyz[i][axis])
+        mid = len(idxs) // 2
+        return axis, xyz[idxs[mid]][axis], self._build(idxs[:mid]), self._build(idxs[mid:])
+
+    def _sq_dist(self, i: int, q: Tuple[float, float, float]) -> float:
+        p = self._xyz[i]
+        return (p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2 + (p[2] - q[2]) ** 2
+
+    def _result(self, i: int, lat: float, lon: float) -> Tuple[object, float]:
+        p_lat, p_lon = self._coords[i]
+        return self._keys[i], haversine_km(lat, lon, p_lat, p_lon)
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[object, float]]:
+        """The k closest points as (key, distance_km), nearest first."""
+        if k <= 0 or not self._keys:
+            return []
+        q = to_unit_vector(lat, lon)
+        heap = []  # max-heap of (-sq_dist, idx) holding the best k so far
+
+        def visit(node):
+            if isinstance(node, list):
+                for i in node:
+                    d2 = self._sq_dist(i, q)
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d2, i))
+                    elif d2 < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d2, i))
+                return
+            axis, split, left, right = node
+            diff = q[axis] - split
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        visit(self._root)
+        return [self._result(i, lat, lon) for _, i in sorted(heap, reverse=True)]
+
+    def within(
+            self,
+            lat: float,
+            lon: float,
+            radius_km: float,
+            limit: Optional[int] = None
+    ) -> List[Tuple[object, float]]:
+        """All points within radius_km as (key, distance_km), nearest first."""
+        if radius_km < 0 or not self._keys:
+            return []
+        q = to_unit_vector(lat, lon)
+        chord = 2 * math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2)
+        # Small slack so float error never drops a point sitting on the boundary
+        r2 = chord * chord + 1e-12
+        found = []
+
+        def visit(node):
+            if isinstance(node, list):
+                found.extend(i for i in node if self._sq_dist(i, q) <= r2)
+                return
+            axis, split, left, right = node
+            diff = q[axis] - split
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if diff * diff <= r2:
+                visit(far)
+
+        visit(self._root)
+        results = [self._result(i, lat, lon) for i in found]
+        results = sorted((r for r in results if r[1] <= radius_km), key=lambda r: r[1])
+        return results[:limit] if limit is not None else results
+
+    def in_box(self, south: float, west: float, north: float, east: float) -> List[object]:
+        """Keys of all points inside a lat/lon box; west > east wraps across the antimeridian."""
+        wraps = west > east
+        return [
+            key for key, (lat, lon) in zip(self._keys, self._coords)
+            if south <= lat <= north and (
+                (lon >= west or lon <= east) if wraps else west <= lon <= east
+            )
+        ]
@@ -0,0 +1,300 @@
+# air_quality_backend/utils/leaderboard.py
+import gc
+import logging
+import random
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Other workers fold reputation too, so the whole board is reloaded from
+# the database once it is this old
+LEADERBOARD_TTL_SECONDS = 300
+# Generation 0 collection threshold while a load builds the board; see load()
+LOAD_GC_THRESHOLD = 50_000
+
+# Leaderboard orders and their position in a user's (aura, credibility)
+LEADERBOARD_METRICS = {"aura": 0, "credibility": 1}
+
+_MAX_LEVEL = 16
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level: int, nil=None):
+        self.key = key
+        self.next = [nil] * level
+        # Number of level-0 steps each link skips, so positions add up on the way down
+        self.width = [1] * level
+
+
+class SkipList:
+    """
+    Sorted set of comparable keys with O(log n) insert,
+    remove, rank and seek by position (an indexable skip list).
+    """
+
+    def __init__(self, keys: Iterable = (), rng: Optional[random.Random] = None):
+        """`keys` must already be sorted ascending; they are linked in one O(n) pass."""
+        self._random = rng or random.Random()
+        self._nil = _Node(None, 0)
+        self._head = _Node(None, _MAX_LEVEL, self._nil)
+        self._size = 0
+
+        tails = [self._head] * _MAX_LEVEL
+        tail_positions = [0] * _MAX_LEVEL
+        for position, key in enumerate(keys, start=1):
+            node = _Node(key, self._level(), self._nil)
+            for level in range(len(node.next)):
+                tails[level].next[level] = node
+                tails[level].width[level] = position - tail_positions[level]
+                tails[level], tail_positions[level] = node, position
+            self._size = position
+        for level in range(_MAX_LEVEL):
+            tails[level].width[level] = self._size + 1 - tail_positions[level]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _level(self) -> int:
+        # Each trailing pair of zero bits is a 1 in 4 (_P) chance of one more level
+        bits = self._random.getrandbits(2 * _MAX_LEVEL) | 1 << (2 * _MAX_LEVEL - 2)
+        return 1 + ((bits & -bits).bit_length() - 1) // 2
+
+    def _path(self, key) -> Tuple[List[_Node], List[int]]:
+        """Last node before `key` on every level, and that node's position."""
+        chain = [self._head] * _MAX_LEVEL
+        positions = [0] * _MAX_LEVEL
+        node, position = self._head, 0
+        for level in reversed(range(_MAX_LEVEL)):
+            following = node.next[level]
+            while following is not self._nil and following.key < key:
+                position += node.width[level]
+                node = following
+                following = node.next[level]
+            chain[level], positions[level] = node, position
+        return chain, positions
+
+    def insert(self, key):
+        chain, positions = self._path(key)
+        node = _Node(key, self._level(), self._nil)
+        position = positions[0] + 1
+        for level in range(len(node.next)):
+            previous = chain[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            skipped = position - positions[level]
+            node.width[level] = previous.width[level] - skipped + 1
+            previous.width[level] = skipped
+        for level in range(len(node.next), _MAX_LEVEL):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, key):
+        chain, _ = self._path(key)
+        node = chain[0].next[0]
+        if node is self._nil or node.key != key:
+            raise KeyError(key)
+        for level in range(len(node.next)):
+            previous = chain[level]
+            previous.width[level] += node.width[level] - 1
+            previous.next[level] = node.next[level]
+        for level in range(len(node.next), _MAX_LEVEL):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+    def index(self, key) -> int:
+        """0-based position of `key`; KeyError if absent."""
+        chain, positions = self._path(key)
+        node = chain[0].next[0]
+        if node is self._nil or node.key != key:
+            raise KeyError(key)
+        return positions[0]
+
+    def islice(self, start: int, stop: int) -> Iterator:
+        """Keys at positions start..stop-1, seeking to `start` in O(log n)."""
+        if start >= self._size or stop <= start:
+            return
+        node, remaining = self._head, start + 1
+        for level in reversed(range(_MAX_LEVEL)):
+            while node.next[level] is not self._nil and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        for _ in range(stop - start):
+            if node is self._nil:
+                return
+            yield node.key
+            node = node.next[0]
+
+
+class ReputationLeaderboard:
+    """
+    Process-wide ranking of users by aura and by credibility.
+
+    Each order is a SkipList of (-points, user_id), so the top of the board
+    comes first and ties go to the older account. Folds of the reputation
+    ledger in this process move the users they touched; folds in other
+    workers show up when the board is reloaded after LEADERBOARD_TTL_SECONDS
+    or invalidate(). Only the very first load blocks a request; later ones
+    run in the background while the current board keeps being served.
+    """
+
+    def __init__(self, ttl: float = LEADERBOARD_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._points: Dict[int, Tuple[int, int]] = {}
+        self._boards: Dict[str, SkipList] = {metric: SkipList() for metric in LEADERBOARD_METRICS}
+        self._loaded_at: Optional[float] = None
+        # Bumped by invalidate(); a board read before the latest bump is stale
+        self._generation = 0
+        self._loaded_generation = 0
+        # Totals received while a reload is reading, replayed onto its result
+        self._replay: Optional[Dict[int, Tuple[int, ...]]] = None
+        # Set once a background reload is started, cleared when its load ends
+        self._reloading = False
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def invalidate(self):
+        """Reload from user_reputation in the background, e.g. after a recompute."""
+        with self._lock:
+            self._generation += 1
+        if self._loaded_at is not None:
+            self._reload_in_background()
+
+    def _stale(self) -> bool:
+        return (
+            self._loaded_at is None
+            or self._loaded_generation != self._generation
+            or time.monotonic() - self._loaded_at > self.ttl
+        )
+
+    def load(self, db: Session):
+        """
+        Rebuild both orders from user_reputation.
+
+        The new board is built off the lock, so readers keep using the old
+        one meanwhile; a second load while one is running returns at once.
+        """
+        with self._lock:
+            if self._replay is not None:
+                self._reloading = False
+                return
+            self._replay = {}
+            generation = self._generation
+        # Reading and linking the board allocates millions of objects at
+        # once, which at the default threshold means a collection every 700
+        # of them that finds nothing to free. Collect less often meanwhile,
+        # rather than not at all, since other threads keep allocating too.
+        thresholds = gc.get_threshold()
+        gc.set_threshold(max(LOAD_GC_THRESHOLD, thresholds[0]), *thresholds[1:])
+        try:
+            rows = db.execute(text("""
+                SELECT user_id, COALESCE(aura_points, 0), COALESCE(credibility_points, 100)
+                FROM user_reputation
+            """)).all()
+            points = {user_id: (aura, credibility) for user_id, aura, credibility in rows}
+            boards = {
+                metric: SkipList(sorted((-totals[position], user_id) for user_id, totals in points.items()))
+                for metric, position in LEADERBOARD_METRICS.items()
+            }
+        except Exception:
+            with self._lock:
+                self._replay = None
+                self._reloading = False
+            raise
+        finally:
+            gc.set_threshold(*thresholds)
+        with self._lock:
+            replay, self._replay = self._replay, None
+            self._reloading = False
+            self._points, self._boards = points, boards
+            self._loaded_at = time.monotonic()
+            self._loaded_generation = generation
+            # Folds that committed after the read above would otherwise be lost
+            self._apply(replay)
+            overtaken = generation != self._generation
+        # An invalidate() during the read may not be reflected in it
+        if overtaken:
+            self._reload_in_background()
+
+    def _reload(self):
+        from ..database import SessionLocal
+
+        try:
+            with SessionLocal() as db:
+                self.load(db)
+        except Exception as e:
+            with self._lock:
+                self._reloading = False
+            logging.error(f"Leaderboard reload error: {str(e)}")
+
+    def _reload_in_background(self):
+        # Checked and set under the lock, so concurrent callers start one thread
+        with self._lock:
+            if self._reloading or self._replay is not None:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, daemon=True).start()
+
+    def _ensure(self, db: Session):
+        if self._loaded_at is None:
+            self.load(db)
+        elif self._stale():
+            # Serve the current board while a fresh one is built
+            self._reload_in_background()
+
+    def _apply(self, totals: Dict[int, Tuple[int, ...]]):
+        # Called with the lock held
+        for user_id, (aura, credibility, *_) in totals.items():
+            previous = self._points.get(user_id)
+            current = (aura, credibility)
+            if previous == current:
+                continue
+            for metric, position in LEADERBOARD_METRICS.items():
+                board = self._boards[metric]
+                if previous is not None:
+                    board.remove((-previous[position], user_id))
+                board.insert((-current[position], user_id))
+            self._points[user_id] = current
+
+    def update(self, totals: Dict[int, Tuple[int, ...]]):
+        """Move users to their new (aura, credibility, ...) totals; a no-op until loaded."""
+        with self._lock:
+            if self._replay is not None:
+                self._replay.update(totals)
+            if self._loaded_at is not None:
+                self._apply(totals)
+
+    def top(self, db: Session, metric: str, offset: int, limit: int) -> Tuple[int, List[Tuple[int, int, int, int]]]:
+        """Users ranked offset+1.. in `metric`: (total, [(rank, user_id, aura, credibility)])."""
+        self._ensure(db)
+        with self._lock:
+            board = self._boards[metric]
+            return len(board), [
+                (rank, user_id, *self._points[user_id])
+                for rank, (_, user_id) in enumerate(board.islice(offset, offset + limit), start=offset + 1)
+            ]
+
+    def rank(self, db: Session, user_id: int) -> Optional[Tuple[int, int, int, Dict[str, int]]]:
+        """
+        (total, aura, credibility, {metric: 1-based rank}) of the user, or
+        None if they have no reputation yet.
+        """
+        self._ensure(db)
+        with self._lock:
+            points = self._points.get(user_id)
+            if points is None:
+                return None
+            ranks = {
+                metric: self._boards[metric].index((-points[position], user_id)) + 1
+                for metric, position in LEADERBOARD_METRICS.items()
+            }
+            return len(self._points), points[0], points[1], ranks
+
+
+reputation_leaderboard = ReputationLeaderboard()
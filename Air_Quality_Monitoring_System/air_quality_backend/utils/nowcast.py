@@ -0,0 +1,213 @@
+# air_quality_backend/utils/nowcast.py
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+NOWCAST_FIELDS = ("pm25", "pm10", "ozone")
+NOWCAST_VALUES = ("pm25_nowcast", "pm10_nowcast", "ozone_8h")
+PM_HOURS = 12
+OZONE_HOURS = 8
+# EPA minimum data: 2 of the 3 latest hours for NowCast, 6 of 8 for ozone
+PM_RECENT_HOURS, PM_MIN_RECENT = 3, 2
+OZONE_MIN_HOURS = 6
+PM_MIN_WEIGHT = 0.5
+SYNC_INTERVAL_SECONDS = 5
+# A worker idle this long reloads the window instead of reading the change
+# log, which keeps changes for a day (CHANGE_RETENTION in utils/rollup.py)
+RELOAD_AFTER_SECONDS = PM_HOURS * 3600
+
+# Every transaction below the snapshot's xmin has finished, so no change
+# with a lower txid can still appear
+_HORIZON = "SELECT CAST(CAST(pg_snapshot_xmin(pg_current_snapshot()) AS text) AS bigint)"
+
+
+def epoch_hour(moment: datetime) -> int:
+    # Timestamps are stored without a zone and written in UTC
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() // 3600)
+
+
+def nowcast(hourly: List[Optional[float]]) -> Optional[float]:
+    """
+    EPA NowCast over hourly averages, newest first (hourly[0] is the current hour).
+
+    The weight factor is min/max of the available hours, floored at 0.5, so
+    a steady series behaves like a 12-hour mean and a sharp change shifts
+    the value towards the latest hours.
+    """
+    if sum(value is not None for value in hourly[:PM_RECENT_HOURS]) < PM_MIN_RECENT:
+        return None
+    present = [value for value in hourly if value is not None]
+    highest = max(present)
+    weight = max(min(present) / highest, PM_MIN_WEIGHT) if highest > 0 else 1.0
+
+    numerator = denominator = 0.0
+    factor = 1.0
+    for value in hourly:
+        if value is not None:
+            numerator += factor * value
+            denominator += factor
+        factor *= weight
+    return numerator / denominator
+
+
+def rolling_mean(hourly: List[Optional[float]], min_hours: int) -> Optional[float]:
+    present = [value for value in hourly if value is not None]
+    if len(present) < min_hours:
+        return None
+    return sum(present) / len(present)
+
+
+class HourlyRing:
+    """
+    The last PM_HOURS hourly sums and counts of one station's readings.
+
+    Slot `hour % PM_HOURS` holds that hour; totals for a newer hour recycle
+    the slot, and totals older than the slot's hour are outside the window
+    and dropped. Ozone uses the newest OZONE_HOURS of the same ring.
+    """
+
+    __slots__ = ("hours", "sums", "counts")
+
+    def __init__(self):
+        self.hours: List[Optional[int]] = [None] * PM_HOURS
+        self.sums = [[0.0] * len(NOWCAST_FIELDS) for _ in range(PM_HOURS)]
+        self.counts = [[0] * len(NOWCAST_FIELDS) for _ in range(PM_HOURS)]
+
+    def put(self, hour: int, sums, counts) -> bool:
+        """Replace the hour's totals with the given per-field sums and counts."""
+        slot = hour % PM_HOURS
+        held = self.hours[slot]
+        if held is not None and held > hour:
+            return False
+        self.hours[slot] = hour
+        self.sums[slot] = [float(value or 0) for value in sums]
+        self.counts[slot] = [int(value or 0) for value in counts]
+        return True
+
+    def hourly(self, field: str, current_hour: int, span: int) -> List[Optional[float]]:
+        """Hourly averages for current_hour, current_hour - 1, ... (None when missing)."""
+        field_no = NOWCAST_FIELDS.index(field)
+        averages = []
+        for hour in range(current_hour, current_hour - span, -1):
+            slot = hour % PM_HOURS
+            count = self.counts[slot][field_no]
+            held = self.hours[slot] == hour
+            averages.append(self.sums[slot][field_no] / count if held and count else None)
+        return averages
+
+    def values(self, current_hour: int) -> Dict[str, Optional[float]]:
+        return {
+            "pm25_nowcast": nowcast(self.hourly("pm25", current_hour, PM_HOURS)),
+            "pm10_nowcast": nowcast(self.hourly("pm10", current_hour, PM_HOURS)),
+            "ozone_8h": rolling_mean(self.hourly("ozone", current_hour, OZONE_HOURS), OZONE_MIN_HOURS),
+        }
+
+
+class NowCastBuffers:
+    """
+    Process-wide ring buffers of every station's recent PM and ozone readings.
+
+    The first use loads the last PM_HOURS hours once; after that each sync
+    reads measurement_changes, which the triggers on measurements fill in
+    the writing transaction, and recomputes just the station hours inserted,
+    updated or deleted since, whichever worker or process wrote them. Like
+    the rollup it only goes up to the snapshot's xmin, so a transaction that
+    commits late is picked up by a later sync rather than skipped. Values
+    are cached per station until one of its hours changes or the clock
+    moves to the next hour.
+    """
+
+    def __init__(self, sync_interval: float = SYNC_INTERVAL_SECONDS):
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._rings: Dict[int, HourlyRing] = {}
+        self._cache: Dict[int, tuple] = {}
+        # Changes with a txid below this are already in the rings
+        self._txid: Optional[int] = None
+        self._synced_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._rings = {}
+            self._cache = {}
+            self._txid = None
+
+    def put(self, station_id: int, bucket: datetime, sums, counts):
+        ring = self._rings.get(station_id)
+        if ring is None:
+            ring = self._rings[station_id] = HourlyRing()
+        if ring.put(epoch_hour(bucket), sums, counts):
+            self._cache.pop(station_id, None)
+
+    def _fold(self, rows):
+        width = len(NOWCAST_FIELDS)
+        for station_id, bucket, *totals in rows:
+            self.put(station_id, bucket, totals[:width], totals[width:])
+
+    def _is_fresh(self) -> bool:
+        return self._txid is not None and time.monotonic() - self._synced_at < self.sync_interval
+
+    def sync(self, db: Session):
+        if self._is_fresh():
+            return
+        totals = ", ".join(
+            [f"sum(m.{field})" for field in NOWCAST_FIELDS] + [f"count(m.{field})" for field in NOWCAST_FIELDS]
+        )
+        with self._lock:
+            # Another request may have synced while this one waited
+            if self._is_fresh():
+                return
+            since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=PM_HOURS)
+            high = db.execute(text(_HORIZON)).scalar()
+            if self._txid is None or time.monotonic() - self._synced_at > RELOAD_AFTER_SECONDS:
+                self._rings = {}
+                self._cache = {}
+                self._fold(db.execute(text(f"""
+                    SELECT m.station_id, date_trunc('hour', m.timestamp), {totals}
+                    FROM measurements m
+                    WHERE m.timestamp >= date_trunc('hour', CAST(:since AS timestamp))
+                    GROUP BY 1, 2
+                """), {"since": since}))
+            elif high > self._txid:
+                # Hours whose readings are all gone come back with zero counts
+                self._fold(db.execute(text(f"""
+                    WITH dirty AS (
+                        SELECT DISTINCT station_id, bucket FROM measurement_changes
+                        WHERE txid >= :low AND txid < :high
+                          AND bucket >= date_trunc('hour', CAST(:since AS timestamp))
+                    )
+                    SELECT d.station_id, d.bucket, {totals}
+                    FROM dirty d
+                    LEFT JOIN measurements m
+                      ON m.station_id = d.station_id
+                     AND m.timestamp >= d.bucket
+                     AND m.timestamp < d.bucket + interval '1 hour'
+                    GROUP BY 1, 2
+                """), {"low": self._txid, "high": high, "since": since}))
+            self._txid = high
+            self._synced_at = time.monotonic()
+
+    def values(self, station_id: int, current_hour: Optional[int] = None) -> Dict[str, Optional[float]]:
+        if current_hour is None:
+            current_hour = epoch_hour(datetime.now(timezone.utc))
+        with self._lock:
+            cached = self._cache.get(station_id)
+            if cached is not None and cached[0] == current_hour:
+                return cached[1]
+            ring = self._rings.get(station_id)
+            result = ring.values(current_hour) if ring else dict.fromkeys(NOWCAST_VALUES)
+            self._cache[station_id] = (current_hour, result)
+        return result
+
+    def get(self, db: Session, station_id: int) -> Dict[str, Optional[float]]:
+        self.sync(db)
+        return self.values(station_id)
+
+
+nowcast_buffers = NowCastBuffers()
@@ -0,0 +1,176 @@
+# air_quality_backend/utils/pagination.py
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, and_, false, or_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Opaque, URL-safe token for the sort key of the last row on a page."""
+    tagged = []
+    for value in values:
+        if isinstance(value, datetime):
+            tagged.append(["dt", value.isoformat()])
+        elif isinstance(value, Decimal):
+            tagged.append(["dec", str(value)])
+        else:
+            tagged.append(["v", value])
+    raw = json.dumps(tagged, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _python_type(key):
+    try:
+        return key.type.python_type
+    except (AttributeError, NotImplementedError):
+        return None
+
+
+def _nullable(key) -> bool:
+    return getattr(getattr(key, "expression", key), "nullable", True)
+
+
+def _fits(key, value) -> bool:
+    """Whether a decoded cursor value can be compared with the key column."""
+    if value is None:
+        return _nullable(key)
+    expected = _python_type(key)
+    if expected is None:
+        return isinstance(value, (str, int, float, Decimal, datetime)) and not isinstance(value, bool)
+    if isinstance(value, bool):
+        return expected is bool
+    if expected is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+
+def decode_cursor(cursor: str, keys: Sequence) -> list:
+    """The sort key a cursor encodes; 400 unless it has one value of the right type per key."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        tagged = json.loads(raw)
+        values = []
+        for tag, value in tagged:
+            if tag == "dt":
+                value = datetime.fromisoformat(value)
+            elif tag == "dec":
+                value = Decimal(value)
+            elif tag != "v":
+                raise ValueError(tag)
+            values.append(value)
+    except (ArithmeticError, RecursionError, TypeError, ValueError):
+        values = None
+
+    if values is None or len(values) != len(keys) or not all(map(_fits, keys, values)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
+
+
+def _after(keys: Sequence, values: Sequence, descending: bool):
+    """
+    Rows that sort after `values` in ORDER BY keys DESC NULLS FIRST (or
+    ASC NULLS LAST), the order a plain b-tree index returns either way.
+    """
+    if None not in values and (descending or not any(map(_nullable, keys))):
+        # One row-value comparison, which the index can seek to. NULL keys
+        # compare as unknown and are left out, as they all sort first.
+        return tuple_(*keys) < tuple_(*values) if descending else tuple_(*keys) > tuple_(*values)
+
+    key, value = keys[0], values[0]
+    if value is None:
+        beyond, tie = (key.isnot(None) if descending else false()), key.is_(None)
+    else:
+        beyond = key < value if descending else or_(key > value, key.is_(None))
+        tie = key == value
+    if len(keys) == 1:
+        return beyond
+    return or_(beyond, and_(tie, _after(keys[1:], values[1:], descending)))
+
+
+def _keyset_page(query, keys: Sequence, cursor: Optional[str], limit: int, descending: bool, offset: int):
+    # Works on both a legacy Query and a 2.0 select()
+    if cursor:
+        query = query.filter(_after(keys, decode_cursor(cursor, keys), descending))
+        offset = 0
+
+    # NULL keys sort explicitly, first when descending and last when
+    # ascending, so the cursor predicate can step past them
+    query = query.order_by(*(key.desc().nulls_first() if descending else key.asc().nulls_last() for key in keys))
+    return query.offset(offset).limit(limit + 1)
+
+
+def _split_page(rows: List, keys: Sequence, limit: int) -> Tuple[List, Optional[str]]:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], key.key) for key in keys])
+    return rows, next_cursor
+
+
+def keyset_paginate(
+        query: Query,
+        keys: Sequence,
+        cursor: Optional[str],
+        limit: int,
+        descending: bool = True,
+        offset: int = 0
+) -> Tuple[List, Optional[str]]:
+    """
+    Fetch one page ordered by `keys` (e.g. created_at, id), resuming after `cursor`.
+
+    The cursor becomes a row-value comparison on the key columns, so with a
+    matching index every page costs the same however deep it is. The last
+    key should be unique to break ties. Rows with NULL keys are ordered
+    explicitly (first when descending, last when ascending) and paged
+    through like any other. `offset` is only honoured on the
+    first page, for clients that still page by offset.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    rows = _keyset_page(query, keys, cursor, limit, descending, offset).all()
+    return _split_page(rows, keys, limit)
+
+
+async def keyset_paginate_async(
+        db: AsyncSession,
+        stmt: Select,
+        keys: Sequence,
+        cursor: Optional[str],
+        limit: int,
+        descending: bool = True,
+        offset: int = 0
+) -> Tuple[List, Optional[str]]:
+    """keyset_paginate for a select() of one entity on an AsyncSession."""
+    result = await db.scalars(_keyset_page(stmt, keys, cursor, limit, descending, offset))
+    return _split_page(result.all(), keys, limit)
+
+
+async def keyset_paginate_rows_async(
+        db: AsyncSession,
+        stmt: Select,
+        keys: Sequence,
+        cursor: Optional[str],
+        limit: int,
+        descending: bool = True,
+        offset: int = 0
+) -> Tuple[List, Optional[str]]:
+    """keyset_paginate for a select() of columns, which must include the keys."""
+    result = await db.execute(_keyset_page(stmt, keys, cursor, limit, descending, offset))
+    return _split_page(result.all(), keys, limit)
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """List bodies stay plain arrays; the cursor for the next page rides in a header."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,91 @@
+# air_quality_backend/utils/promotion.py
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .ingest import POLLUTANT_FIELDS
+
+# measurements.source of readings copied from public contributions
+PROMOTION_SOURCE = "public_contribution"
+PROMOTION_BATCH_SIZE = 5000
+
+_POLLUTANTS = ", ".join(POLLUTANT_FIELDS)
+
+# One statement per batch: lock the next approved, unpromoted rows, copy
+# them into measurements and mark them. A reading never overwrites one
+# already stored for its station and time, and of several contributions
+# for the same station and time only the latest is copied.
+_PROMOTE_BATCH = f"""
+    WITH batch AS (
+        SELECT contribution_id, station_id, COALESCE("timestamp", created_at) AS reading_time,
+               {_POLLUTANTS}, overall_aqi
+        FROM public_contributions
+        WHERE status = 'approved' AND promoted_at IS NULL AND station_id IS NOT NULL
+          AND contribution_id > :after
+        ORDER BY contribution_id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ),
+    inserted AS (
+        INSERT INTO measurements (station_id, "timestamp", {_POLLUTANTS}, aqi, source)
+        SELECT DISTINCT ON (station_id, reading_time)
+               station_id, reading_time, {_POLLUTANTS}, CAST(round(overall_aqi) AS integer), :source
+        FROM batch
+        ORDER BY station_id, reading_time, contribution_id DESC
+        ON CONFLICT (station_id, "timestamp") DO NOTHING
+        RETURNING 1
+    ),
+    marked AS (
+        UPDATE public_contributions c SET promoted_at = :now
+        FROM batch b
+        WHERE c.contribution_id = b.contribution_id
+        RETURNING c.contribution_id
+    )
+    SELECT (SELECT count(*) FROM marked) AS promoted,
+           (SELECT max(contribution_id) FROM marked) AS last_id,
+           (SELECT count(*) FROM inserted) AS inserted
+"""
+
+
+def promote_contributions(db: Session, batch_size: int = PROMOTION_BATCH_SIZE) -> dict:
+    """
+    Copy approved contributions into measurements.
+
+    Incremental: promoted rows are stamped with promoted_at and a partial
+    index covers only the ones still waiting, so a run reads just what was
+    approved since the last one. Works upwards through contribution_id in
+    batches, each a single statement committed on its own; rows another
+    run holds are skipped. Returns counts of contributions promoted and
+    measurements created (lower where a reading already existed).
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    report = {"promoted": 0, "inserted": 0, "batches": 0}
+    after = 0
+    while True:
+        row = db.execute(text(_PROMOTE_BATCH), {
+            "after": after,
+            "batch_size": batch_size,
+            "source": PROMOTION_SOURCE,
+            "now": now,
+        }).one()
+        db.commit()
+        if not row.promoted:
+            break
+        after = row.last_id
+        report["promoted"] += row.promoted
+        report["inserted"] += row.inserted
+        report["batches"] += 1
+    return report
+
+
+if __name__ == "__main__":
+    # Periodic entry point, e.g. from cron: python -m air_quality_backend.utils.promotion
+    from ..database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        result = promote_contributions(session)
+        print(f"Promotion: {result}")
+    finally:
+        session.close()
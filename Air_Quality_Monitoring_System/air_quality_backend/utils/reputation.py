@@ -1,50 +1,310 @@
 # air_quality_backend/utils/reputation.py
-from datetime import datetime, timedelta
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, text
 from sqlalchemy.orm import Session
-from ..models import UserReputation, Report, ReportStatus
-
-def update_streak(db: Session, user_id: int):
-    today = datetime.now().date()
-    reputation = db.query(UserReputation).filter(UserReputation.user_id == user_id).first()
-    if not reputation:
-        reputation = UserReputation(user_id=user_id, last_streak_date=today, streak_points=1)
-        db.add(reputation)
-    else:
-        last_streak = reputation.last_streak_date
-        if last_streak == today:
-            pass  # Already logged in today
-        elif last_streak == today - timedelta(days=1):
-            reputation.streak_points += 1
-            reputation.last_streak_date = today
-        else:
-            reputation.streak_points = 1
-            reputation.last_streak_date = today
-    db.commit()
 
-def update_aura_points(db: Session, user_id: int):
-    reputation = db.query(UserReputation).filter(UserReputation.user_id == user_id).first()
-    if not reputation:
-        reputation = UserReputation(user_id=user_id, aura_points=1)
-        db.add(reputation)
-    else:
-        reputation.aura_points += 1
-    db.commit()
+from ..models import Report, ReportStatus, ReputationEvent, ReputationEventType
+from .leaderboard import reputation_leaderboard
+
+# (aura, credibility) each event is worth; the ledger stores the deltas,
+# so changing these only affects later events
+EVENT_POINTS = {
+    ReputationEventType.upvote_received: (1, 0),
+    ReputationEventType.upvote_withdrawn: (-1, 0),
+    ReputationEventType.comment_posted: (1, 0),
+    ReputationEventType.report_verified: (0, 5),
+    ReputationEventType.report_upheld: (0, -10),
+    ReputationEventType.report_false: (0, -10),
+    ReputationEventType.activity: (0, 0),
+}
+STARTING_CREDIBILITY = 100
+# New events are folded in this long after they are recorded
+REPUTATION_FOLD_SECONDS = 1.0
+# Key for pg_try_advisory_xact_lock, so only one worker folds at a time
+REPUTATION_LOCK_KEY = 0x52455055
+
+Totals = Tuple[int, int, int]
 
-def update_credibility_points(db: Session, report: Report, status: ReportStatus):
-    reporter_reputation = db.query(UserReputation).filter(UserReputation.user_id == report.reporter_id).first()
-    reported_reputation = db.query(UserReputation).filter(UserReputation.user_id == report.reported_user_id).first()
 
-    if not reporter_reputation:
-        reporter_reputation = UserReputation(user_id=report.reporter_id, credibility_points=100)
-        db.add(reporter_reputation)
-    if not reported_reputation:
-        reported_reputation = UserReputation(user_id=report.reported_user_id, credibility_points=100)
-        db.add(reported_reputation)
+# -------------------------
+# Recording
+# -------------------------
 
+def record_events(db: Session, events: Iterable[Tuple[int, ReputationEventType]]):
+    """
+    Append (user_id, event_type) events to the ledger in the caller's
+    transaction. user_reputation picks them up on the next fold.
+    """
+    rows = [
+        {
+            "user_id": user_id,
+            "event_type": event_type,
+            "aura_delta": EVENT_POINTS[event_type][0],
+            "credibility_delta": EVENT_POINTS[event_type][1],
+        }
+        for user_id, event_type in events
+    ]
+    if rows:
+        db.execute(insert(ReputationEvent), rows)
+
+
+def record_report_outcome(db: Session, report: Report, status: ReportStatus):
     if status == ReportStatus.verified:
-        reported_reputation.credibility_points -= 10  # Adjustable value
-        reporter_reputation.credibility_points += 5   # Adjustable value
+        record_events(db, [
+            (report.reported_user_id, ReputationEventType.report_upheld),
+            (report.reporter_id, ReputationEventType.report_verified),
+        ])
     elif status == ReportStatus.false:
-        reporter_reputation.credibility_points -= 10  # Adjustable value
+        record_events(db, [(report.reporter_id, ReputationEventType.report_false)])
+
+
+# -------------------------
+# Folding
+# -------------------------
+
+# Every transaction below the snapshot's xmin has finished, so no event
+# with a lower txid can still appear: that is how far a fold can safely go
+_HORIZON = "SELECT CAST(CAST(pg_snapshot_xmin(pg_current_snapshot()) AS text) AS bigint)"
+
+_PENDING = """
+    SELECT user_id,
+           sum(aura_delta) AS aura,
+           sum(credibility_delta) AS credibility,
+           array_agg(DISTINCT CAST(created_at AS date))
+               FILTER (WHERE event_type = 'activity') AS active_days
+    FROM reputation_events
+    WHERE txid >= :low AND txid < :high
+    GROUP BY user_id
+    ORDER BY user_id
+"""
+
+_APPLY = f"""
+    INSERT INTO user_reputation (user_id, aura_points, credibility_points, streak_points, last_streak_date)
+    SELECT user_id, aura, {STARTING_CREDIBILITY} + credibility, streak, streak_date
+    FROM unnest(
+        CAST(:user_ids AS integer[]), CAST(:aura AS integer[]), CAST(:credibility AS integer[]),
+        CAST(:streaks AS integer[]), CAST(:streak_dates AS timestamp[])
+    ) AS v(user_id, aura, credibility, streak, streak_date)
+    ON CONFLICT (user_id) DO UPDATE SET
+        aura_points = COALESCE(user_reputation.aura_points, 0) + excluded.aura_points,
+        credibility_points = COALESCE(user_reputation.credibility_points, {STARTING_CREDIBILITY})
+            + excluded.credibility_points - {STARTING_CREDIBILITY},
+        streak_points = CASE WHEN excluded.last_streak_date IS NULL
+            THEN user_reputation.streak_points ELSE excluded.streak_points END,
+        last_streak_date = COALESCE(excluded.last_streak_date, user_reputation.last_streak_date)
+    RETURNING user_id, aura_points, credibility_points, streak_points
+"""
+
+_ADVANCE = """
+    INSERT INTO reputation_watermark (watermark_id, last_txid, updated_at) VALUES (1, :high, now())
+    ON CONFLICT (watermark_id) DO UPDATE SET last_txid = excluded.last_txid, updated_at = now()
+"""
+
+
+def advance_streak(streak: int, last_day: Optional[date], days: Iterable[date]) -> Tuple[int, Optional[date]]:
+    """Consecutive active days up to the latest one: +1 for the next day, reset to 1 after a gap."""
+    for day in sorted(days):
+        if last_day is not None and day <= last_day:
+            continue
+        streak = streak + 1 if last_day is not None and day == last_day + timedelta(days=1) else 1
+        last_day = day
+    return streak, last_day
+
+
+def fold_reputation_events(db: Session) -> Optional[Dict[int, Totals]]:
+    """
+    Fold ledger events recorded since the last fold into user_reputation.
+
+    All pending events are summed per user in one GROUP BY and applied with
+    one INSERT ... ON CONFLICT over unnest arrays, so a fold costs one pass
+    however many interactions it covers. Commits, then moves the users
+    touched on this process's leaderboard. Returns their new (aura,
+    credibility, streak), or None if another worker is folding.
+    """
+    locked = db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": REPUTATION_LOCK_KEY}).scalar()
+    if not locked:
+        db.rollback()
+        return None
+
+    high = db.execute(text(_HORIZON)).scalar()
+    low = db.execute(text("SELECT last_txid FROM reputation_watermark WHERE watermark_id = 1")).scalar() or 0
+    rows = db.execute(text(_PENDING), {"low": low, "high": high}).all() if high > low else []
+
+    current = {}
+    active = [row.user_id for row in rows if row.active_days]
+    if active:
+        current = {
+            user_id: (streak or 0, last.date() if last else None)
+            for user_id, streak, last in db.execute(text("""
+                SELECT user_id, streak_points, last_streak_date FROM user_reputation
+                WHERE user_id = ANY(:user_ids)
+                FOR UPDATE
+            """), {"user_ids": active})
+        }
 
-    db.commit()
\ No newline at end of file
+    streaks: List[Optional[int]] = []
+    streak_dates: List[Optional[datetime]] = []
+    for row in rows:
+        if not row.active_days:
+            streaks.append(0)
+            streak_dates.append(None)
+            continue
+        streak, last_day = advance_streak(*current.get(row.user_id, (0, None)), row.active_days)
+        streaks.append(streak)
+        streak_dates.append(datetime.combine(last_day, datetime.min.time()))
+
+    totals = {}
+    if rows:
+        totals = {
+            user_id: (aura, credibility, streak)
+            for user_id, aura, credibility, streak in db.execute(text(_APPLY), {
+                "user_ids": [row.user_id for row in rows],
+                "aura": [int(row.aura) for row in rows],
+                "credibility": [int(row.credibility) for row in rows],
+                "streaks": streaks,
+                "streak_dates": streak_dates,
+            })
+        }
+    if high > low:
+        db.execute(text(_ADVANCE), {"high": high})
+    db.commit()
+    reputation_leaderboard.update(totals)
+    return totals
+
+
+_RECOMPUTE = f"""
+    WITH sums AS (
+        SELECT user_id, sum(aura_delta) AS aura, sum(credibility_delta) AS credibility
+        FROM reputation_events
+        WHERE txid < :high
+        GROUP BY user_id
+    ),
+    days AS (
+        SELECT DISTINCT user_id, CAST(created_at AS date) AS day
+        FROM reputation_events
+        WHERE event_type = 'activity' AND txid < :high
+    ),
+    -- Consecutive days share day - row_number(); the latest run is the streak
+    runs AS (
+        SELECT user_id, day, day - CAST(row_number() OVER (PARTITION BY user_id ORDER BY day) AS integer) AS run
+        FROM days
+    ),
+    streaks AS (
+        SELECT DISTINCT ON (user_id) user_id, count(*) OVER (PARTITION BY user_id, run) AS streak, day
+        FROM runs
+        ORDER BY user_id, day DESC
+    ),
+    totals AS (
+        SELECT u.user_id,
+               COALESCE(s.aura, 0) AS aura,
+               {STARTING_CREDIBILITY} + COALESCE(s.credibility, 0) AS credibility,
+               COALESCE(k.streak, 0) AS streak,
+               CAST(k.day AS timestamp) AS streak_date
+        FROM (SELECT user_id FROM sums UNION SELECT user_id FROM user_reputation) u
+        LEFT JOIN sums s ON s.user_id = u.user_id
+        LEFT JOIN streaks k ON k.user_id = u.user_id
+    )
+    INSERT INTO user_reputation (user_id, aura_points, credibility_points, streak_points, last_streak_date)
+    SELECT user_id, aura, credibility, streak, streak_date FROM totals
+    ON CONFLICT (user_id) DO UPDATE SET
+        aura_points = excluded.aura_points,
+        credibility_points = excluded.credibility_points,
+        streak_points = excluded.streak_points,
+        last_streak_date = excluded.last_streak_date
+"""
+
+
+def recompute_reputation(db: Session) -> Optional[int]:
+    """
+    Rebuild every user_reputation row from the whole ledger and move the
+    watermark to match. Commits. Returns rows written, or None if a fold
+    is running.
+    """
+    locked = db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": REPUTATION_LOCK_KEY}).scalar()
+    if not locked:
+        db.rollback()
+        return None
+    high = db.execute(text(_HORIZON)).scalar()
+    written = db.execute(text(_RECOMPUTE), {"high": high}).rowcount
+    db.execute(text(_ADVANCE), {"high": high})
+    db.commit()
+    reputation_leaderboard.invalidate()
+    return written
+
+
+class ReputationAggregator:
+    """
+    Runs fold_reputation_events in the background, REPUTATION_FOLD_SECONDS
+    after events are recorded, so request handlers only append to the
+    ledger. Call schedule() once the recording transaction has committed.
+    """
+
+    def __init__(self, interval: float = REPUTATION_FOLD_SECONDS):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def schedule(self):
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval, self.fold)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def fold(self) -> Optional[Dict[int, Totals]]:
+        from ..database import SessionLocal
+
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        db = SessionLocal()
+        try:
+            totals = fold_reputation_events(db)
+            # Events of transactions still open at the fold wait for the next one
+            behind = db.execute(text("""
+                SELECT EXISTS (
+                    SELECT 1 FROM reputation_events
+                    WHERE txid >= COALESCE((SELECT last_txid FROM reputation_watermark WHERE watermark_id = 1), 0)
+                )
+            """)).scalar()
+            db.rollback()
+        except Exception as e:
+            db.rollback()
+            logging.error(f"Reputation fold error: {str(e)}")
+            totals, behind = None, True
+        finally:
+            db.close()
+        if totals is None or behind:
+            self.schedule()
+        return totals
+
+
+reputation_aggregator = ReputationAggregator()
+
+
+if __name__ == "__main__":
+    # Periodic entry point, e.g. from cron:
+    # python -m air_quality_backend.utils.reputation [--recompute]
+    import argparse
+
+    from ..database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Fold the reputation ledger into user_reputation")
+    parser.add_argument("--recompute", action="store_true", help="rebuild every user from the whole ledger")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        if args.recompute:
+            result = recompute_reputation(session)
+            print(f"Reputation: {'skipped, a fold is running' if result is None else f'{result} users rebuilt'}")
+        else:
+            result = fold_reputation_events(session)
+            print(f"Reputation: {'skipped, a fold is running' if result is None else f'{len(result)} users updated'}")
+    finally:
+        session.close()
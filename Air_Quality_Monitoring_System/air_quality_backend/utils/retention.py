@@ -0,0 +1,188 @@
+# air_quality_backend/utils/retention.py
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import NotificationType
+from .unread import unread_counter
+
+# Rows per DELETE; each batch is its own short transaction
+RETENTION_BATCH_SIZE = 5000
+# Key for pg_try_advisory_lock, so only one purge runs at a time
+RETENTION_LOCK_KEY = 0x4E4F5449
+
+_COLUMNS = (
+    "notification_id", "user_id", "notification_type", "title", "message",
+    "station_id", "aqi_value", "aqi_category", "is_read", "created_at",
+)
+
+# Walks the primary key upwards from the last batch, so rows deleted by
+# earlier batches are never scanned again
+_DELETE_BATCH = f"""
+    WITH doomed AS (
+        SELECT notification_id FROM notifications
+        WHERE notification_id > :after
+          AND notification_type = CAST(:notification_type AS notification_type)
+          AND is_read = :is_read
+          AND created_at < :cutoff
+        ORDER BY notification_id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    DELETE FROM notifications n USING doomed d
+    WHERE n.notification_id = d.notification_id
+    RETURNING {", ".join(f"n.{column}" for column in _COLUMNS)}
+"""
+
+Policy = Tuple[str, bool, int]
+
+
+def retention_policies(days: Optional[Dict[str, int]] = None) -> List[Policy]:
+    """(notification_type, is_read, days) for every type/state with a TTL."""
+    days = settings.NOTIFICATION_RETENTION_DAYS if days is None else days
+    policies = []
+    for notification_type in NotificationType:
+        for is_read, state in ((True, "read"), (False, "unread")):
+            ttl = days.get(f"{notification_type.value}.{state}", days.get(state))
+            if ttl is not None:
+                policies.append((notification_type.value, is_read, ttl))
+    return policies
+
+
+def _archive_line(row) -> str:
+    return json.dumps({
+        column: value.isoformat() if isinstance(value, datetime) else value
+        for column, value in zip(_COLUMNS, row)
+    })
+
+
+def purge_notifications(
+        db: Session,
+        policies: Optional[List[Policy]] = None,
+        archive_dir: Optional[str] = None,
+        batch_size: int = RETENTION_BATCH_SIZE,
+        pause: float = 0.0
+) -> Optional[dict]:
+    """
+    Delete notifications older than their type's read/unread TTL.
+
+    Works in batches of `batch_size` rows, committing after each, so row
+    locks are held briefly and concurrent readers and writers are never
+    blocked for long; `pause` sleeps between batches to spread the I/O.
+    With `archive_dir`, deleted rows are first appended to a gzipped
+    NDJSON file there. Returns a report of rows removed per policy and
+    time taken, or None if another purge holds the lock.
+    """
+    policies = retention_policies() if policies is None else policies
+    # Session-level lock on a connection of its own: the batches commit
+    # and may each run on a different pooled connection
+    lock_conn = db.get_bind().connect()
+    locked = lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": RETENTION_LOCK_KEY}).scalar()
+    lock_conn.commit()
+    if not locked:
+        lock_conn.close()
+        return None
+
+    started = time.monotonic()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    archive, archive_path = None, None
+    if archive_dir:
+        os.makedirs(archive_dir, exist_ok=True)
+        archive_path = os.path.join(archive_dir, f"notifications-{now:%Y%m%dT%H%M%S}.ndjson.gz")
+        archive = gzip.open(archive_path, "at", encoding="utf-8")
+
+    report = {"deleted": 0, "batches": 0, "policies": [], "archive": archive_path}
+    try:
+        for notification_type, is_read, days in policies:
+            deleted, after = 0, 0
+            params = {
+                "notification_type": notification_type,
+                "is_read": is_read,
+                "cutoff": now - timedelta(days=days),
+                "batch_size": batch_size,
+            }
+            while True:
+                rows = db.execute(text(_DELETE_BATCH), {**params, "after": after}).all()
+                if not rows:
+                    db.commit()
+                    break
+                if archive is not None:
+                    archive.write("".join(_archive_line(row) + "\n" for row in rows))
+                    archive.flush()
+                db.commit()
+
+                if not is_read:
+                    unread_counter.add((row.user_id for row in rows), -1)
+                after = max(row.notification_id for row in rows)
+                deleted += len(rows)
+                report["batches"] += 1
+                if pause:
+                    time.sleep(pause)
+
+            report["policies"].append({
+                "notification_type": notification_type,
+                "state": "read" if is_read else "unread",
+                "days": days,
+                "deleted": deleted,
+            })
+            report["deleted"] += deleted
+    finally:
+        if archive is not None:
+            archive.close()
+        db.rollback()
+        lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": RETENTION_LOCK_KEY})
+        lock_conn.commit()
+        lock_conn.close()
+
+    report["seconds"] = round(time.monotonic() - started, 3)
+    return report
+
+
+def vacuum_notifications():
+    """Make the space of purged rows reusable; VACUUM cannot run in a transaction."""
+    from ..database import engine
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM (ANALYZE) notifications"))
+
+
+if __name__ == "__main__":
+    # Periodic entry point, e.g. from cron:
+    # python -m air_quality_backend.utils.retention [--archive DIR] [--vacuum]
+    import argparse
+
+    from ..database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Purge notifications past their retention period")
+    parser.add_argument("--archive", default=settings.NOTIFICATION_ARCHIVE_DIR, help="directory for archives")
+    parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM (ANALYZE) notifications afterwards")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        result = purge_notifications(session, archive_dir=args.archive, batch_size=args.batch_size, pause=args.pause)
+    finally:
+        session.close()
+
+    if result is None:
+        print("Retention: skipped, another run in progress")
+    else:
+        for policy in result["policies"]:
+            print(f"{policy['notification_type']:<16} {policy['state']:<7} "
+                  f"> {policy['days']:>4} days: {policy['deleted']} deleted")
+        print(f"Deleted {result['deleted']} notifications in {result['batches']} batches, {result['seconds']} s")
+        if result["archive"]:
+            print(f"Archived to {result['archive']}")
+        if args.vacuum and result["deleted"]:
+            started = time.monotonic()
+            vacuum_notifications()
+            print(f"Vacuumed in {time.monotonic() - started:.1f} s")
@@ -0,0 +1,253 @@
+# air_quality_backend/utils/rollup.py
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .aqi import AQI_CATEGORY_BREAKPOINTS
+
+# (aggregation_type, date_trunc unit, bucket length, finer level it is built from)
+ROLLUP_LEVELS = (
+    ("hourly", "hour", "1 hour", None),
+    ("daily", "day", "1 day", "hourly"),
+    ("monthly", "month", "1 month", "daily"),
+)
+AGGREGATION_TYPES = tuple(level[0] for level in ROLLUP_LEVELS)
+
+# Key for pg_try_advisory_xact_lock, so only one rollup writes at a time
+ROLLUP_LOCK_KEY = 0x41514931
+
+# Buckets per statement when rebuilding a long backlog
+ROLLUP_BATCH_SIZE = 20000
+# Written readings are folded in this long after they commit
+ROLLUP_DELAY_SECONDS = 1.0
+# Folded changes stay in the log this long for the NowCast buffers, which
+# read it on their own schedule in every worker
+CHANGE_RETENTION = "1 day"
+
+Bucket = Tuple[int, datetime]
+
+# Every transaction below the snapshot's xmin has finished, so no change
+# with a lower txid can still appear: that is how far a run can safely go
+_HORIZON = "SELECT CAST(CAST(pg_snapshot_xmin(pg_current_snapshot()) AS text) AS bigint)"
+
+
+def _category_sql(column: str) -> str:
+    whens = " ".join(
+        f"WHEN round({column}) <= {upper} THEN '{category}'"
+        for upper, category in AQI_CATEGORY_BREAKPOINTS
+    )
+    return f"(CASE {whens} ELSE 'hazardous' END)::aqi_category"
+
+
+# Upserts every dirty bucket that still has readings behind it and deletes
+# the ones that no longer do, e.g. after their readings were removed
+_REBUILD = """
+    WITH dirty AS (
+        SELECT * FROM unnest(CAST(:station_ids AS integer[]), CAST(:buckets AS timestamp[]))
+            AS d(station_id, bucket)
+    ),
+    rolled AS ({source}),
+    upserted AS (
+        INSERT INTO aqi_aggregations (
+            station_id, aggregation_type, start_time, end_time,
+            avg_value, min_value, max_value, sample_count, aqi_category
+        )
+        SELECT station_id, :level, bucket, bucket + CAST(:length AS interval),
+               avg_value, min_value, max_value, sample_count, {category}
+        FROM rolled
+        ON CONFLICT (station_id, aggregation_type, start_time) DO UPDATE SET
+            avg_value = excluded.avg_value,
+            min_value = excluded.min_value,
+            max_value = excluded.max_value,
+            sample_count = excluded.sample_count,
+            aqi_category = excluded.aqi_category,
+            created_at = now()
+    )
+    DELETE FROM aqi_aggregations a
+    USING dirty d
+    WHERE a.station_id = d.station_id
+      AND a.aggregation_type = :level
+      AND a.start_time = d.bucket
+      AND NOT EXISTS (SELECT 1 FROM rolled r WHERE r.station_id = d.station_id AND r.bucket = d.bucket)
+"""
+
+# Hourly buckets are recomputed from the raw readings of each dirty hour
+_FROM_MEASUREMENTS = """
+    SELECT d.station_id, d.bucket,
+           avg(m.aqi) AS avg_value, min(m.aqi) AS min_value, max(m.aqi) AS max_value,
+           count(m.aqi) AS sample_count
+    FROM dirty d
+    JOIN measurements m
+      ON m.station_id = d.station_id
+     AND m.timestamp >= d.bucket
+     AND m.timestamp < d.bucket + CAST(:length AS interval)
+     AND m.aqi IS NOT NULL
+    GROUP BY d.station_id, d.bucket
+"""
+
+# Coarser buckets merge the finer ones, weighting each average by its sample count
+_FROM_FINER = """
+    SELECT d.station_id, d.bucket,
+           sum(a.avg_value * a.sample_count) / sum(a.sample_count) AS avg_value,
+           min(a.min_value) AS min_value, max(a.max_value) AS max_value,
+           sum(a.sample_count) AS sample_count
+    FROM dirty d
+    JOIN aqi_aggregations a
+      ON a.station_id = d.station_id
+     AND a.aggregation_type = :finer
+     AND a.start_time >= d.bucket
+     AND a.start_time < d.bucket + CAST(:length AS interval)
+    GROUP BY d.station_id, d.bucket
+    HAVING sum(a.sample_count) > 0
+"""
+
+_ADVANCE = """
+    INSERT INTO rollup_watermark (watermark_id, last_txid, updated_at) VALUES (1, :high, now())
+    ON CONFLICT (watermark_id) DO UPDATE SET last_txid = excluded.last_txid, updated_at = now()
+"""
+
+
+def _truncate(moment: datetime, unit: str) -> datetime:
+    if unit == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if unit == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def rebuild_buckets(db: Session, hours: Set[Bucket], batch_size: int = ROLLUP_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Recompute the given (station_id, hour) buckets and every day and month
+    containing them. Returns the number of buckets rebuilt per level.
+    """
+    written = {}
+    dirty = hours
+    for level, unit, length, finer in ROLLUP_LEVELS:
+        dirty = {(station_id, _truncate(bucket, unit)) for station_id, bucket in dirty}
+        if not dirty:
+            break
+        ordered = sorted(dirty)
+        statement = text(_REBUILD.format(
+            source=_FROM_FINER if finer else _FROM_MEASUREMENTS,
+            category=_category_sql("avg_value")
+        ))
+        for start in range(0, len(ordered), batch_size):
+            batch = ordered[start:start + batch_size]
+            db.execute(statement, {
+                "level": level,
+                "length": length,
+                "finer": finer,
+                "station_ids": [station_id for station_id, _ in batch],
+                "buckets": [bucket for _, bucket in batch],
+            })
+        written[level] = len(ordered)
+    return written
+
+
+def run_rollup(db: Session) -> Optional[Dict[str, int]]:
+    """
+    Fold logged measurement changes into aqi_aggregations.
+
+    The triggers on measurements log every (station_id, hour) that an
+    insert, update or delete touched, in the writing transaction. A run
+    rebuilds just those buckets from their source rows, so it costs
+    O(changed hours) however long the history is, and late, corrected or
+    removed readings are handled like new ones. It folds every change of
+    transactions below the snapshot's xmin and moves the watermark there;
+    changes of transactions still open are left for the next run.
+
+    Commits. Returns buckets rebuilt per level, or None if another run
+    holds the lock.
+    """
+    locked = db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ROLLUP_LOCK_KEY}).scalar()
+    if not locked:
+        db.rollback()
+        return None
+
+    high = db.execute(text(_HORIZON)).scalar()
+    low = db.execute(text("SELECT last_txid FROM rollup_watermark WHERE watermark_id = 1")).scalar() or 0
+    written = {}
+    if high > low:
+        hours = {
+            (station_id, bucket)
+            for station_id, bucket in db.execute(text("""
+                SELECT DISTINCT station_id, bucket FROM measurement_changes
+                WHERE txid >= :low AND txid < :high
+            """), {"low": low, "high": high})
+        }
+        written = rebuild_buckets(db, hours)
+        db.execute(text(_ADVANCE), {"high": high})
+        db.execute(text(f"""
+            DELETE FROM measurement_changes
+            WHERE txid < :high AND created_at < now() - interval '{CHANGE_RETENTION}'
+        """), {"high": high})
+    db.commit()
+    return written
+
+
+class RollupScheduler:
+    """
+    Runs run_rollup in the background, ROLLUP_DELAY_SECONDS after readings
+    are written, so neither writes nor GET /measurements/aggregates do the
+    rollup themselves. Call schedule() once the writing transaction has
+    committed; the cron entry point below covers writes from elsewhere.
+    """
+
+    def __init__(self, delay: float = ROLLUP_DELAY_SECONDS):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def schedule(self):
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.run)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def run(self) -> Optional[Dict[str, int]]:
+        from ..database import SessionLocal
+
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        db = SessionLocal()
+        try:
+            written = run_rollup(db)
+            # Changes of transactions still open at the run wait for the next one
+            behind = db.execute(text("""
+                SELECT EXISTS (
+                    SELECT 1 FROM measurement_changes
+                    WHERE txid >= COALESCE((SELECT last_txid FROM rollup_watermark WHERE watermark_id = 1), 0)
+                )
+            """)).scalar()
+            db.rollback()
+        except Exception as e:
+            db.rollback()
+            logging.error(f"Rollup error: {str(e)}")
+            written, behind = None, True
+        finally:
+            db.close()
+        if written is None or behind:
+            self.schedule()
+        return written
+
+
+rollup_scheduler = RollupScheduler()
+
+
+if __name__ == "__main__":
+    # Periodic entry point, e.g. from cron: python -m air_quality_backend.utils.rollup
+    from ..database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        result = run_rollup(session)
+        print(f"Rollup: {result if result is not None else 'skipped, another run in progress'}")
+    finally:
+        session.close()
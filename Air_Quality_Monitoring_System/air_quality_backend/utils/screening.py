@@ -0,0 +1,182 @@
+# air_quality_backend/utils/screening.py
+import warnings
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .asof import float_column
+from .geo import station_geo_index
+from .ingest import POLLUTANT_FIELDS
+from .promotion import PROMOTION_SOURCE
+
+# Reference stations are those within this distance of the contribution's station
+SCREEN_RADIUS_KM = 25.0
+# A reference reading counts if taken at most this long before the contribution
+SCREEN_WINDOW = timedelta(hours=1)
+# Fewer reference readings than this for a pollutant and it is not scored
+MIN_REFERENCES = 3
+# Scales MAD to a standard deviation for normally distributed readings
+MAD_SCALE = 1.4826
+# Floors for that scale, so near-identical references do not turn every
+# small difference into a huge score: a share of the median, and absolute
+RELATIVE_FLOOR = 0.1
+ABSOLUTE_FLOOR = 0.5
+SCREEN_BATCH_SIZE = 5000
+
+# (contribution column, measurement column)
+SCREENED_FIELDS = tuple((field, field) for field in POLLUTANT_FIELDS) + (("overall_aqi", "aqi"),)
+
+_PENDING = f"""
+    SELECT c.contribution_id, c.station_id, COALESCE(c."timestamp", c.created_at) AS reading_time,
+           s.latitude, s.longitude,
+           {", ".join(f"c.{field}" for field, _ in SCREENED_FIELDS)}
+    FROM public_contributions c
+    JOIN stations s ON s.station_id = c.station_id
+    WHERE c.status = 'pending' AND c.screened_at IS NULL AND c.contribution_id > :after
+    ORDER BY c.contribution_id
+    LIMIT :batch_size
+"""
+
+# The latest reading of each (reference station, time) pair within its own
+# window: one (station_id, timestamp) index probe per pair, so a batch whose
+# readings span months reads no more than one spanning an hour
+_REFERENCES = f"""
+    SELECT p.pair_no, {", ".join(f"m.{column}" for _, column in SCREENED_FIELDS)}
+    FROM unnest(CAST(:station_ids AS integer[]), CAST(:times AS timestamp[]))
+        WITH ORDINALITY AS p(station_id, reading_time, pair_no)
+    CROSS JOIN LATERAL (
+        SELECT {", ".join(column for _, column in SCREENED_FIELDS)}
+        FROM measurements
+        WHERE station_id = p.station_id
+          AND "timestamp" <= p.reading_time
+          AND "timestamp" >= p.reading_time - CAST(:window AS interval)
+          AND source <> :excluded_source
+        ORDER BY "timestamp" DESC
+        LIMIT 1
+    ) m
+"""
+
+_STORE = """
+    UPDATE public_contributions c
+    SET suspicion_score = v.score, screened_at = :now
+    FROM unnest(CAST(:ids AS integer[]), CAST(:scores AS double precision[])) AS v(contribution_id, score)
+    WHERE c.contribution_id = v.contribution_id
+"""
+
+
+def robust_z(values: np.ndarray, references: np.ndarray) -> np.ndarray:
+    """
+    |value - median| / (MAD_SCALE * MAD) of each row of `references`.
+
+    `references` is (len(values), k) with NaN padding. Rows with fewer than
+    MIN_REFERENCES readings, or a NaN value, score NaN.
+    """
+    counts = np.count_nonzero(~np.isnan(references), axis=1)
+    with warnings.catch_warnings():
+        # All-NaN rows are expected and end up NaN either way
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(references, axis=1)
+        mad = np.nanmedian(np.abs(references - median[:, None]), axis=1)
+    scale = np.maximum(MAD_SCALE * mad, np.maximum(RELATIVE_FLOOR * np.abs(median), ABSOLUTE_FLOOR))
+    z = np.abs(values - median) / scale
+    z[(counts < MIN_REFERENCES) | np.isnan(values)] = np.nan
+    return z
+
+
+def score_batch(
+        db: Session,
+        rows: List,
+        radius_km: float = SCREEN_RADIUS_KM,
+        window: timedelta = SCREEN_WINDOW
+) -> np.ndarray:
+    """
+    Suspicion score of each pending row: its highest robust z-score over
+    the pollutants it reports, against the readings of reference stations
+    around its station at the time. NaN where nothing could be compared.
+    """
+    geo_index = station_geo_index.get(db)
+    neighbours: Dict[int, List[int]] = {}
+    for row in rows:
+        if row.station_id not in neighbours:
+            neighbours[row.station_id] = [
+                station_id for station_id, _ in geo_index.within(row.latitude, row.longitude, radius_km)
+            ]
+
+    # One (contribution, reference station) pair per row of these arrays
+    counts = np.array([len(neighbours[row.station_id]) for row in rows], dtype=np.intp)
+    pair_row = np.repeat(np.arange(len(rows)), counts)
+    pair_slot = np.arange(len(pair_row)) - np.repeat(np.cumsum(counts) - counts, counts)
+    # Contributions from one station at one time share their lookups
+    lookups: Dict[tuple, int] = {}
+    pair_lookup = np.array([
+        lookups.setdefault((station_id, rows[row_no].reading_time), len(lookups))
+        for row_no in range(len(rows)) for station_id in neighbours[rows[row_no].station_id]
+    ], dtype=np.intp)
+
+    references = np.full((len(lookups), len(SCREENED_FIELDS)), np.nan)
+    if lookups:
+        found = db.execute(text(_REFERENCES), {
+            "station_ids": [station_id for station_id, _ in lookups],
+            "times": [reading_time for _, reading_time in lookups],
+            "window": window,
+            "excluded_source": PROMOTION_SOURCE,
+        }).all()
+        for position, _ in enumerate(SCREENED_FIELDS):
+            # WITH ORDINALITY counts from 1
+            references[[reference[0] - 1 for reference in found], position] = float_column(found, 1 + position)
+
+    width = max(int(counts.max()), 1) if len(counts) else 1
+    scores = np.full(len(rows), np.nan)
+    for position, _ in enumerate(SCREENED_FIELDS):
+        values = float_column(rows, 5 + position)
+        grid = np.full((len(rows), width), np.nan)
+        grid[pair_row, pair_slot] = references[pair_lookup, position]
+        scores = np.fmax(scores, robust_z(values, grid))
+    return scores
+
+
+def screen_contributions(
+        db: Session,
+        radius_km: float = SCREEN_RADIUS_KM,
+        window: timedelta = SCREEN_WINDOW,
+        batch_size: int = SCREEN_BATCH_SIZE
+) -> dict:
+    """
+    Score every pending, not yet screened contribution that names a station.
+
+    Each batch is scored in one vectorized pass and written back with a
+    single UPDATE ... FROM unnest, then committed. Rows that could not be
+    compared keep a NULL score but are marked screened all the same.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    report = {"screened": 0, "scored": 0}
+    after = 0
+    while True:
+        rows = db.execute(text(_PENDING), {"after": after, "batch_size": batch_size}).all()
+        if not rows:
+            break
+        scores = score_batch(db, rows, radius_km, window)
+        db.execute(text(_STORE), {
+            "ids": [row.contribution_id for row in rows],
+            "scores": [None if np.isnan(score) else round(float(score), 3) for score in scores],
+            "now": now,
+        })
+        db.commit()
+        after = rows[-1].contribution_id
+        report["screened"] += len(rows)
+        report["scored"] += int(np.count_nonzero(~np.isnan(scores)))
+    return report
+
+
+if __name__ == "__main__":
+    # Periodic entry point, e.g. from cron: python -m air_quality_backend.utils.screening
+    from ..database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"Screening: {screen_contributions(session)}")
+    finally:
+        session.close()
@@ -0,0 +1,134 @@
+# air_quality_backend/utils/search.py
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, or_, text
+from sqlalchemy.orm import Session
+
+from ..models import Station
+from .trigram import TrigramIndex
+
+INDEX_TTL_SECONDS = 300
+TRGM_INDEXES = ("ix_stations_station_name_trgm", "ix_stations_epa_name_trgm")
+
+
+class StationSearchCache:
+    """Process-wide TrigramIndex over station_name and epa_name."""
+
+    def __init__(self, ttl: float = INDEX_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index: Optional[TrigramIndex] = None
+        self._loaded_at = 0.0
+        self.stations: Dict[int, dict] = {}
+
+    @staticmethod
+    def _summary(station) -> dict:
+        return {
+            "station_id": station.station_id,
+            "station_name": station.station_name,
+            "epa_name": station.epa_name,
+            "latitude": station.latitude,
+            "longitude": station.longitude,
+        }
+
+    def _is_stale(self) -> bool:
+        return self._index is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def _ensure_loaded(self, db: Session) -> TrigramIndex:
+        # Local writes are patched in place; the TTL picks up other workers' writes
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    index = TrigramIndex()
+                    stations = {}
+                    for station in db.query(Station).all():
+                        stations[station.station_id] = self._summary(station)
+                        index.add(station.station_id, station.station_name, station.epa_name)
+                    self.stations = stations
+                    self._index = index
+                    self._loaded_at = time.monotonic()
+        return self._index
+
+    def upsert(self, station: Station):
+        # Nothing to patch until the first search loads the index
+        if self._index is None:
+            return
+        with self._lock:
+            self.stations[station.station_id] = self._summary(station)
+            self._index.add(station.station_id, station.station_name, station.epa_name)
+
+    def remove(self, station_id: int):
+        if self._index is None:
+            return
+        with self._lock:
+            self.stations.pop(station_id, None)
+            self._index.remove(station_id)
+
+    def search(self, db: Session, query: str, limit: int = 10) -> List[dict]:
+        index = self._ensure_loaded(db)
+        # Resolve the matches under the same lock as the search, and skip any
+        # station a concurrent remove() or reload has dropped since
+        with self._lock:
+            matches = index.search(query, limit)
+            stations = self.stations
+            return [
+                {**stations[station_id], "score": round(score, 4)}
+                for station_id, score in matches
+                if station_id in stations
+            ]
+
+
+station_search_index = StationSearchCache()
+
+
+_trgm_indexes_present: Optional[bool] = None
+
+
+def trgm_indexes_present(db: Session) -> bool:
+    """Whether migration 5b1e9c2f7a40 created the indexes; it skips them where pg_trgm isn't installed."""
+    global _trgm_indexes_present
+    if _trgm_indexes_present is None:
+        found = db.execute(
+            text("SELECT count(*) FROM pg_indexes WHERE tablename = 'stations' AND indexname = ANY(:names)"),
+            {"names": list(TRGM_INDEXES)}
+        ).scalar()
+        _trgm_indexes_present = found == len(TRGM_INDEXES)
+        if not _trgm_indexes_present:
+            logging.warning(
+                "STATION_SEARCH_BACKEND=pg_trgm but the pg_trgm indexes are missing; "
+                "using the in-memory station search instead"
+            )
+    return _trgm_indexes_present
+
+
+def search_stations_pg_trgm(db: Session, query: str, limit: int = 10) -> List[dict]:
+    """Same search pushed down to Postgres; needs the pg_trgm GIN indexes."""
+    # Without the extension similarity() and % don't exist at all
+    if not trgm_indexes_present(db):
+        return station_search_index.search(db, query, limit)
+
+    score = func.greatest(
+        func.similarity(Station.station_name, query),
+        func.coalesce(func.similarity(Station.epa_name, query), 0)
+    ).label("score")
+
+    rows = db.query(
+        Station.station_id,
+        Station.station_name,
+        Station.epa_name,
+        Station.latitude,
+        Station.longitude,
+        score
+    ).filter(
+        or_(
+            Station.station_name.op("%")(query),
+            Station.epa_name.op("%")(query),
+            Station.station_name.ilike(f"%{query}%"),
+            Station.epa_name.ilike(f"%{query}%")
+        )
+    ).order_by(score.desc()).limit(limit).all()
+
+    return [dict(row._mapping) for row in rows]
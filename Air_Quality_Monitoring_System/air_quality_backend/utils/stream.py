@@ -0,0 +1,105 @@
+# air_quality_backend/utils/stream.py
+import asyncio
+from datetime import datetime
+from typing import Dict, Iterable, List, Set
+
+from .ingest import POLLUTANT_FIELDS
+
+# A subscriber gets at most one batch per interval; a station reporting
+# faster than that only has its latest reading in the batch
+COALESCE_SECONDS = 1.0
+KEEPALIVE_SECONDS = 15
+
+
+def measurement_event(record: dict) -> dict:
+    timestamp = record.get("timestamp")
+    return {
+        "station_id": record["station_id"],
+        "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
+        **{field: record.get(field) for field in POLLUTANT_FIELDS},
+        "aqi": record.get("aqi"),
+        "source": record.get("source"),
+    }
+
+
+class Subscription:
+    """One stream client: the stations it follows and readings not yet sent."""
+
+    __slots__ = ("station_ids", "interval", "pending", "coalesced", "_ready", "_flushed_at")
+
+    def __init__(self, station_ids: Iterable[int], interval: float = COALESCE_SECONDS):
+        self.station_ids = frozenset(station_ids)
+        self.interval = interval
+        self.pending: Dict[int, dict] = {}
+        self.coalesced = 0
+        self._ready = asyncio.Event()
+        self._flushed_at = 0.0
+
+    def offer(self, station_id: int, event: dict):
+        if station_id in self.pending:
+            self.coalesced += 1
+        self.pending[station_id] = event
+        self._ready.set()
+
+    async def next_batch(self) -> List[dict]:
+        """Wait for readings, at most one batch per interval, latest per station."""
+        await self._ready.wait()
+        loop = asyncio.get_running_loop()
+        delay = self._flushed_at + self.interval - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._ready.clear()
+        batch, self.pending = list(self.pending.values()), {}
+        self._flushed_at = loop.time()
+        return batch
+
+
+class MeasurementHub:
+    """
+    In-process pub/sub for newly committed measurements.
+
+    Subscriptions are indexed by station, so publishing a reading costs
+    O(subscribers of that station) however many clients are connected.
+    Only used from the event loop: handlers publish after their commit
+    returns. Each worker has its own hub and only sees readings ingested
+    through that worker.
+    """
+
+    def __init__(self):
+        self._by_station: Dict[int, Set[Subscription]] = {}
+        self._subscriptions: Set[Subscription] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, station_ids: Iterable[int], interval: float = COALESCE_SECONDS) -> Subscription:
+        subscription = Subscription(station_ids, interval)
+        self._subscriptions.add(subscription)
+        for station_id in subscription.station_ids:
+            self._by_station.setdefault(station_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+        for station_id in subscription.station_ids:
+            subscribers = self._by_station.get(station_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_station[station_id]
+
+    def publish(self, records: Iterable[dict]) -> int:
+        """Queue readings for their stations' subscribers. Returns deliveries queued."""
+        delivered = 0
+        for record in records:
+            subscribers = self._by_station.get(record["station_id"])
+            if not subscribers:
+                continue
+            event = measurement_event(record)
+            for subscription in subscribers:
+                subscription.offer(record["station_id"], event)
+            delivered += len(subscribers)
+        return delivered
+
+
+measurement_hub = MeasurementHub()
@@ -0,0 +1,150 @@
+# air_quality_backend/utils/trigram.py
+# Plain data structure with no app imports, so the legacy API in backend/
+# can use it too
+import bisect
+import heapq
+import math
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Same default cut-off pg_trgm uses for its % operator
+SIMILARITY_THRESHOLD = 0.3
+RESULT_CACHE_SIZE = 1024
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Casefold, strip accents and collapse punctuation so "Čačak," matches "cacak"."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", stripped.casefold()).strip()
+
+
+def trigrams(text: str) -> set:
+    """pg_trgm style trigrams: each word padded with two leading and one trailing space."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    In-memory fuzzy name index combining trigram similarity with prefix lookup.
+
+    Every key can carry several texts (e.g. station_name and epa_name); a key
+    scores by its best-matching text. Exact and prefix hits come from a sorted
+    term list, fuzzy hits from trigram postings, so a search only touches
+    documents sharing something with the query. Results are memoised per query
+    until the next add/remove, since typeahead repeats the same prefixes.
+    """
+
+    def __init__(self):
+        self._docs: Dict[object, List[str]] = {}
+        self._postings: Dict[str, set] = {}  # trigram -> {(key, field_no)}
+        self._grams: Dict[Tuple[object, int], set] = {}
+        self._terms: List[Tuple[str, object]] = []  # sorted (term, key)
+        self._cached_search = lru_cache(maxsize=RESULT_CACHE_SIZE)(self._search)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @staticmethod
+    def _suffixes(text: str):
+        # The full text plus every word suffix, so "north" finds "Los Angeles - North Main"
+        words = text.split()
+        return (" ".join(words[i:]) for i in range(len(words)))
+
+    def add(self, key, *texts: Optional[str]):
+        if key in self._docs:
+            self.remove(key)
+        fields = [text for text in map(normalize, texts) if text]
+        self._docs[key] = fields
+        for field_no, text in enumerate(fields):
+            grams = trigrams(text)
+            self._grams[(key, field_no)] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add((key, field_no))
+            for term in self._suffixes(text):
+                bisect.insort(self._terms, (term, key))
+        self._cached_search.cache_clear()
+
+    def remove(self, key):
+        fields = self._docs.pop(key, None)
+        if fields is None:
+            return
+        for field_no, text in enumerate(fields):
+            for gram in self._grams.pop((key, field_no)):
+                entries = self._postings.get(gram)
+                if entries is not None:
+                    entries.discard((key, field_no))
+                    if not entries:
+                        del self._postings[gram]
+            for term in self._suffixes(text):
+                pos = bisect.bisect_left(self._terms, (term, key))
+                if pos < len(self._terms) and self._terms[pos] == (term, key):
+                    del self._terms[pos]
+        self._cached_search.cache_clear()
+
+    def _prefix_hits(self, query: str) -> Dict[object, float]:
+        hits = {}
+        terms = self._terms
+        for pos in range(bisect.bisect_left(terms, (query,)), len(terms)):
+            term, key = terms[pos]
+            if not term.startswith(query):
+                break
+            if key in hits:
+                continue
+            boost = 1.5
+            for text in self._docs[key]:
+                if text == query:
+                    boost = max(boost, 3.0)
+                elif text.startswith(query):
+                    boost = max(boost, 2.0)
+            hits[key] = boost
+        return hits
+
+    def _similarities(self, query: str, prefix_hits: Dict[object, float]) -> Dict[object, float]:
+        query_grams = trigrams(query)
+        # A field needs min_shared of the query trigrams, so it must contain at
+        # least one of the rarest (len - min_shared + 1); skip the common ones.
+        min_shared = max(1, math.ceil(SIMILARITY_THRESHOLD * len(query_grams)))
+        by_rarity = sorted(query_grams, key=lambda gram: len(self._postings.get(gram, ())))
+        candidates = set()
+        for gram in by_rarity[:len(query_grams) - min_shared + 1]:
+            candidates.update(self._postings.get(gram, ()))
+        for key in prefix_hits:
+            candidates.update((key, field_no) for field_no in range(len(self._docs[key])))
+
+        best = {}
+        for key, field_no in candidates:
+            grams = self._grams[(key, field_no)]
+            common = len(query_grams & grams)
+            # Mean of how much of the query is covered and whole-string Jaccard,
+            # so a short query still scores well against a long station name
+            similarity = (
+                common / len(query_grams)
+                + common / (len(query_grams) + len(grams) - common)
+            ) / 2
+            if query in self._docs[key][field_no]:
+                similarity += 1.0
+            if similarity > best.get(key, 0.0):
+                best[key] = similarity
+        return best
+
+    def _search(self, query: str, limit: int) -> List[Tuple[object, float]]:
+        scores = self._prefix_hits(query)
+        for key, similarity in self._similarities(query, scores).items():
+            if similarity >= SIMILARITY_THRESHOLD or key in scores:
+                scores[key] = scores.get(key, 0.0) + similarity
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[object, float]]:
+        """Best matches as (key, score), highest score first."""
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+        return list(self._cached_search(query, limit))
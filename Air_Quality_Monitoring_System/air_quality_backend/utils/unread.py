@@ -0,0 +1,61 @@
+# air_quality_backend/utils/unread.py
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+# Other workers write notifications too, so a cached count is re-read from
+# the database once it is this old
+UNREAD_TTL_SECONDS = 30
+MAX_CACHED_USERS = 100000
+
+
+class UnreadCounter:
+    """
+    Process-wide cache of each user's unread notification count.
+
+    Writers in this process (send jobs, alerts, mark-as-read) adjust cached
+    counts as they commit; users without a cached count are left alone and
+    counted from the partial unread index on their next request. Entries
+    older than the TTL are recounted the same way, which reconciles them
+    with writes made by other workers.
+    """
+
+    def __init__(self, ttl: float = UNREAD_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts: Dict[int, Tuple[int, float]] = {}
+
+    def invalidate(self, user_id: Optional[int] = None):
+        with self._lock:
+            if user_id is None:
+                self._counts = {}
+            else:
+                self._counts.pop(user_id, None)
+
+    def cached(self, user_id: int) -> Optional[int]:
+        entry = self._counts.get(user_id)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def store(self, user_id: int, count: int):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._counts) >= MAX_CACHED_USERS:
+                self._counts = {
+                    cached_id: entry for cached_id, entry in self._counts.items()
+                    if now - entry[1] <= self.ttl
+                }
+            self._counts[user_id] = (count, now)
+
+    def add(self, user_ids: Iterable[int], delta: int = 1):
+        """Adjust cached counts by delta, once per occurrence of a user in user_ids."""
+        with self._lock:
+            counts = self._counts
+            for user_id in user_ids:
+                entry = counts.get(user_id)
+                if entry is not None:
+                    counts[user_id] = (max(entry[0] + delta, 0), entry[1])
+
+
+unread_counter = UnreadCounter()
@@ -0,0 +1,166 @@
+# air_quality_backend/utils/votes.py
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..models import VoteTarget
+
+# Counter deltas are held this long before being written, so a burst of
+# votes on one post costs one row update instead of one per vote
+VOTE_FLUSH_SECONDS = 0.25
+
+# (table, primary key) holding the counters of each target type
+VOTE_TABLES = {
+    VoteTarget.post: ("posts", "post_id"),
+    VoteTarget.comment: ("comments", "comment_id"),
+}
+
+_KEY = """
+    user_id = :user_id AND target_type = CAST(:target_type AS vote_target) AND target_id = :target_id
+"""
+
+# Inserts a vote or flips an opposite one; returns nothing when the user
+# already voted this way, so repeats never count twice
+_SET_VOTE = """
+    INSERT INTO votes (user_id, target_type, target_id, value)
+    VALUES (:user_id, CAST(:target_type AS vote_target), :target_id, :value)
+    ON CONFLICT (user_id, target_type, target_id) DO UPDATE SET
+        value = excluded.value,
+        created_at = now()
+    WHERE votes.value <> excluded.value
+    RETURNING (xmax = 0) AS inserted
+"""
+
+_CLEAR_VOTE = f"DELETE FROM votes WHERE {_KEY} AND value = :value RETURNING value"
+
+# Ids are sorted before binding, so concurrent flushes lock rows in the
+# same order and cannot deadlock
+_APPLY = """
+    UPDATE {table} t SET
+        upvotes = COALESCE(t.upvotes, 0) + v.up,
+        downvotes = COALESCE(t.downvotes, 0) + v.down
+    FROM unnest(CAST(:ids AS integer[]), CAST(:ups AS integer[]), CAST(:downs AS integer[]))
+        AS v(id, up, down)
+    WHERE t.{key} = v.id
+"""
+
+Delta = Tuple[int, int]
+
+
+def set_vote(db: Session, user_id: int, target_type: VoteTarget, target_id: int, value: int) -> Delta:
+    """
+    Record an upvote (1) or downvote (-1), replacing an opposite vote.
+
+    Returns the (upvotes, downvotes) change for the target's counters,
+    (0, 0) if the user had already voted this way. The caller owns the
+    transaction.
+    """
+    row = db.execute(text(_SET_VOTE), {
+        "user_id": user_id, "target_type": target_type.value, "target_id": target_id, "value": value,
+    }).first()
+    if row is None:
+        return 0, 0
+    if row.inserted:
+        return (1, 0) if value > 0 else (0, 1)
+    return (1, -1) if value > 0 else (-1, 1)
+
+
+def clear_vote(db: Session, user_id: int, target_type: VoteTarget, target_id: int, value: int) -> Delta:
+    """Withdraw the user's upvote (1) or downvote (-1), if they cast one; see set_vote."""
+    row = db.execute(text(_CLEAR_VOTE), {
+        "user_id": user_id, "target_type": target_type.value, "target_id": target_id, "value": value,
+    }).first()
+    if row is None:
+        return 0, 0
+    return (-1, 0) if value > 0 else (0, -1)
+
+
+class VoteCounter:
+    """
+    Process-wide write-behind buffer for upvote/downvote counters.
+
+    Handlers commit the vote row, then add its delta here. Deltas are
+    summed per target and written every VOTE_FLUSH_SECONDS as one
+    UPDATE ... FROM unnest per target type. The writes are relative, so
+    every worker can keep its own buffer. Counters trail the votes table
+    by up to one interval; deltas still buffered when a process dies
+    without shutting down are lost.
+    """
+
+    def __init__(self, interval: float = VOTE_FLUSH_SECONDS):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[VoteTarget, int], List[int]] = {}
+        self._timer = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _schedule(self):
+        # Called with the lock held
+        if self._timer is None and self._pending:
+            self._timer = threading.Timer(self.interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def add(self, target_type: VoteTarget, target_id: int, delta: Delta):
+        up, down = delta
+        if not up and not down:
+            return
+        with self._lock:
+            pending = self._pending.setdefault((target_type, target_id), [0, 0])
+            pending[0] += up
+            pending[1] += down
+            self._schedule()
+
+    def flush(self) -> int:
+        """Write all buffered deltas now; returns the number of targets updated."""
+        from ..database import SessionLocal
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        batches = {
+            target_type: sorted(
+                (target_id, up, down) for (kind, target_id), (up, down) in pending.items()
+                if kind == target_type and (up or down)
+            )
+            for target_type in VOTE_TABLES
+        }
+        if not any(batches.values()):
+            return 0
+
+        db = SessionLocal()
+        try:
+            for target_type, rows in batches.items():
+                if not rows:
+                    continue
+                table, key = VOTE_TABLES[target_type]
+                db.execute(text(_APPLY.format(table=table, key=key)), {
+                    "ids": [row[0] for row in rows],
+                    "ups": [row[1] for row in rows],
+                    "downs": [row[2] for row in rows],
+                })
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logging.error(f"Vote counter flush error: {str(e)}")
+            # Put the deltas back for the next attempt
+            with self._lock:
+                for target, (up, down) in pending.items():
+                    merged = self._pending.setdefault(target, [0, 0])
+                    merged[0] += up
+                    merged[1] += down
+                self._schedule()
+            return 0
+        finally:
+            db.close()
+        return sum(len(rows) for rows in batches.values())
+
+
+vote_counter = VoteCounter()
@@ -0,0 +1,111 @@
+"""
+Throughput of the vectorized AQI engine against a per-row Python reference.
+
+Scores the same synthetic readings both ways, checks that every overall AQI
+and category agrees, and prints rows per second.
+
+Usage (from Air_Quality_Monitoring_System/):
+    python benchmarks/aqi_engine.py [--rows 1000000]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from air_quality_backend.utils.aqi import (
+    AQI_CATEGORY_BREAKPOINTS, AQI_POLLUTANTS, BREAKPOINTS, MAX_AQI, OZONE_1H_BREAKPOINTS, OZONE_8H_MAX,
+    categorize, compute_aqi
+)
+
+# Upper end of the generated concentrations, a little past each table
+RANGES = {"pm25": 400, "pm10": 700, "ozone": 700, "co": 60, "so2": 1100, "no2": 2100}
+MISSING_RATE = 0.2
+REFERENCE_ROWS = 200_000
+
+
+def reference_sub_index(pollutant, concentration):
+    """Textbook EPA formula, one value at a time."""
+    if concentration is None or concentration < 0:
+        return None
+    decimals, rows = BREAKPOINTS[pollutant]
+    scale = 10 ** decimals
+    c = math.floor(concentration * scale + 1e-9) / scale
+    if pollutant == "ozone" and c > OZONE_8H_MAX:
+        rows = OZONE_1H_BREAKPOINTS[1]
+    for c_lo, c_hi, i_lo, i_hi in rows:
+        if c_lo <= c <= c_hi:
+            return math.floor((i_hi - i_lo) / (c_hi - c_lo) * (c - c_lo) + i_lo + 0.5)
+    return MAX_AQI
+
+
+def reference_aqi(reading):
+    indices = [reference_sub_index(p, reading[p]) for p in AQI_POLLUTANTS]
+    indices = [index for index in indices if index is not None]
+    return max(indices) if indices else None
+
+
+def reference_category(aqi):
+    if aqi is None:
+        return None
+    for upper, category in AQI_CATEGORY_BREAKPOINTS:
+        if aqi <= upper:
+            return category
+    return "hazardous"
+
+
+def synthetic_columns(rows, seed=7):
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for pollutant in AQI_POLLUTANTS:
+        values = np.round(rng.uniform(0, RANGES[pollutant], rows), 2)
+        values[rng.random(rows) < MISSING_RATE] = np.nan
+        columns[pollutant] = values
+    return columns
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    columns = synthetic_columns(args.rows)
+
+    start = time.perf_counter()
+    aqi, _ = compute_aqi(columns)
+    categories = categorize(aqi)
+    vectorized = time.perf_counter() - start
+
+    # The reference is slow, so it scores a prefix and is extrapolated
+    sample = min(args.rows, REFERENCE_ROWS)
+    readings = [
+        {p: (None if math.isnan(columns[p][i]) else float(columns[p][i])) for p in AQI_POLLUTANTS}
+        for i in range(sample)
+    ]
+    start = time.perf_counter()
+    expected = [reference_aqi(reading) for reading in readings]
+    expected_categories = [reference_category(value) for value in expected]
+    per_row = (time.perf_counter() - start) / sample * args.rows
+
+    mismatches = sum(
+        (e is None) != np.isnan(a) or (e is not None and e != a) or ec != c
+        for e, a, ec, c in zip(expected, aqi[:sample], expected_categories, categories[:sample])
+    )
+
+    print(f"rows: {args.rows:,} ({sample:,} checked against the reference)")
+    print(f"vectorized: {vectorized:8.3f}s  {args.rows / vectorized:14,.0f} rows/s")
+    print(f"per-row:    {per_row:8.3f}s  {args.rows / per_row:14,.0f} rows/s (extrapolated)")
+    print(f"speed-up:   {per_row / vectorized:8.1f}x")
+    if mismatches:
+        print(f"{mismatches} rows differ from the reference")
+        return 1
+    print("Vectorized results match the reference")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
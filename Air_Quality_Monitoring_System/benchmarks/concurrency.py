@@ -0,0 +1,152 @@
+"""
+Latency under concurrent load: sync session vs async session handlers.
+
+"sync" serves GET /measurements/ the way the routers did before the async
+engine: an `async def` handler running blocking queries on SessionLocal, so
+every query stalls the event loop. "async" serves the same request through
+the real measurements router on AsyncSession + asyncpg. Each mode runs in
+its own single-worker uvicorn process and is hit over HTTP by the same
+number of concurrent clients, so time a request spends queued behind a
+blocked loop shows up in its latency. Every --slow-every'th request asks
+for a deep offset page, the kind of slow query that holds up everything
+behind it when the loop is blocked.
+
+Point DATABASE_URL at a database that already holds measurements.
+
+Usage (from Air_Quality_Monitoring_System/):
+    python benchmarks/concurrency.py [--clients 200] [--requests 20] [--limit 100] [--slow-every 20]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import httpx
+from fastapi import FastAPI, Query
+from sqlalchemy import select
+
+from air_quality_backend.database import SessionLocal, engine
+from air_quality_backend.models import Measurement
+from air_quality_backend.schemas import MeasurementResponse
+from air_quality_backend.utils.pagination import keyset_paginate
+
+SLOW_OFFSET = 100_000
+PORT = 8765
+APPS = {
+    "sync": "benchmarks.concurrency:sync_app",
+    "async": "air_quality_backend.main:app",
+}
+
+sync_app = FastAPI()
+
+
+@sync_app.get("/measurements/", response_model=List[MeasurementResponse])
+async def get_measurements_blocking(
+        station_id: Optional[int] = None,
+        limit: int = Query(100, ge=1, le=1000),
+        offset: int = 0
+):
+    # The session is closed before returning; a get_db dependency would hold
+    # its pooled connection until a threadpool teardown the blocked loop
+    # cannot get to, and the run would stall on pool timeouts instead
+    with SessionLocal() as db:
+        query = db.query(Measurement)
+        if station_id:
+            query = query.filter(Measurement.station_id == station_id)
+        measurements, _ = keyset_paginate(
+            query, (Measurement.timestamp, Measurement.measurement_id), None, limit, offset=offset
+        )
+        return [MeasurementResponse.model_validate(m) for m in measurements]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def start_server(mode: str) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", APPS[mode], "--port", str(PORT), "--log-level", "warning",
+         # Clients queued behind a slow loop must not find their idle
+         # keep-alive connection closed under them
+         "--timeout-keep-alive", "120"],
+        cwd=ROOT
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/measurements/", params={"limit": 1}).raise_for_status()
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"{mode} server did not come up on port {PORT}")
+
+
+async def run_load(station_ids: List[int], args):
+    latencies = []
+    limits = httpx.Limits(max_connections=args.clients)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=120) as client:
+        async def worker(seed: int):
+            rng = random.Random(seed)
+            for n in range(args.requests):
+                params = {"station_id": rng.choice(station_ids), "limit": args.limit}
+                if args.slow_every and (seed + n) % args.slow_every == 0:
+                    params = {"offset": SLOW_OFFSET, "limit": args.limit}
+                start = time.perf_counter()
+                response = await client.get("/measurements/", params=params)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        # One warm-up round fills the connection pools
+        await asyncio.gather(*(worker(-i) for i in range(min(args.clients, 20))))
+        latencies.clear()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(args.clients)))
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--limit", type=int, default=100, help="rows per response")
+    parser.add_argument("--slow-every", type=int, default=20, help="every Nth request is a deep page; 0 disables")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        station_ids = list(db.scalars(select(Measurement.station_id).distinct().limit(1000)))
+    engine.dispose()
+    if not station_ids:
+        print("No measurements to query; load some data first")
+        return 1
+
+    print(f"{args.clients} clients x {args.requests} requests, {args.limit} rows each")
+    print(f"{'mode':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for mode in APPS:
+        server = start_server(mode)
+        try:
+            latencies, elapsed = asyncio.run(run_load(station_ids, args))
+        finally:
+            server.terminate()
+            server.wait()
+        ms = [latency * 1000 for latency in latencies]
+        print(
+            f"{mode:<6} {len(ms) / elapsed:>8.0f} {statistics.median(ms):>8.1f} "
+            f"{percentile(ms, 95):>8.1f} {percentile(ms, 99):>8.1f} {max(ms):>8.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Forum feed: one page of posts via the old ORM handler vs GET /forum/feed.
+
+"orm" is what GET /forum/posts used to do: load Post objects, reach each
+author through the lazy relationship and spread __dict__ into a dict.
+"feed" is the column query behind GET /forum/feed, for each order, on the
+first page and on a page deep into the cursor chain. "hot@read" ranks by
+the hot formula computed per row at read time, which the stored, indexed
+hot_score replaces.
+
+Posts and authors are throwaway rows, created up front and removed at
+the end. Point DATABASE_URL at a scratch database.
+
+Usage (from Air_Quality_Monitoring_System/):
+    python benchmarks/forum_feed.py [--posts 1000000] [--authors 1000] [--depth 100] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import text
+
+from air_quality_backend.database import SessionLocal
+from air_quality_backend.models import HOT_SCORE_SQL, Post, User
+from air_quality_backend.routers.forum import FEED_ORDERS, feed_query
+from air_quality_backend.utils.pagination import keyset_paginate
+
+PREFIX = "feed_bench_"
+PAGE_SIZE = 50
+
+
+def create_posts(db, posts: int, authors: int):
+    db.execute(text("""
+        INSERT INTO users (username, email, password_hash, is_active)
+        SELECT :p || g, :p || g || '@bench.invalid', 'x', true
+        FROM generate_series(1, :n) AS g
+    """), {"p": PREFIX, "n": authors})
+    # A year of posts with a long-tailed vote distribution
+    db.execute(text("""
+        INSERT INTO posts (user_id, title, content, upvotes, downvotes, created_at, updated_at)
+        SELECT a.ids[1 + g % :authors], 'Post ' || g, 'Benchmark post',
+               floor(power(random(), 4) * 2000)::int, floor(random() * 20)::int,
+               now() - random() * interval '365 days', now()
+        FROM generate_series(1, :n) AS g,
+             (SELECT array_agg(user_id) AS ids FROM users WHERE username LIKE :p) AS a
+    """), {"p": PREFIX + "%", "n": posts, "authors": authors})
+    db.commit()
+    db.execute(text("ANALYZE posts"))
+    db.commit()
+
+
+def drop_posts(db):
+    db.execute(text("""
+        DELETE FROM posts WHERE user_id IN (SELECT user_id FROM users WHERE username LIKE :p)
+    """), {"p": PREFIX + "%"})
+    db.execute(text("DELETE FROM users WHERE username LIKE :p"), {"p": PREFIX + "%"})
+    db.commit()
+
+
+def orm_page(db, cursor):
+    posts, cursor = keyset_paginate(db.query(Post).join(User), FEED_ORDERS["new"], cursor, PAGE_SIZE)
+    page = [{**post.__dict__, "username": post.user.username} for post in posts]
+    db.expunge_all()
+    return page, cursor
+
+
+def feed_page(sort):
+    def page(db, cursor):
+        posts, cursor = keyset_paginate(feed_query(db), FEED_ORDERS[sort], cursor, PAGE_SIZE)
+        return [post._asdict() for post in posts], cursor
+    return page
+
+
+def hot_at_read_page(db, cursor):
+    rows = db.execute(text(f"""
+        SELECT p.post_id, p.title, p.upvotes, p.downvotes, p.created_at, u.username, p.hot
+        FROM (SELECT *, {HOT_SCORE_SQL} AS hot FROM posts) p
+        JOIN users u ON u.user_id = p.user_id
+        ORDER BY p.hot DESC, p.post_id DESC
+        LIMIT :n
+    """), {"n": PAGE_SIZE}).all()
+    return [row._asdict() for row in rows], None
+
+
+def time_page(db, fetch, depth: int, repeat: int) -> float:
+    """Median ms to fetch the page after walking `depth` pages of cursors."""
+    cursor = None
+    for _ in range(depth):
+        _, cursor = fetch(db, cursor)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fetch(db, cursor)
+        samples.append((time.perf_counter() - start) * 1000)
+        db.rollback()
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--authors", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=100, help="pages to walk before the deep measurement")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        create_posts(db, args.posts, args.authors)
+        print(f"Created {args.posts:,} posts in {time.perf_counter() - start:.1f} s")
+
+        cases = [("orm", orm_page, True)]
+        cases += [(f"feed {sort}", feed_page(sort), True) for sort in FEED_ORDERS]
+        cases += [("hot@read", hot_at_read_page, False)]
+        print(f"{'mode':<10} {'page 1 ms':>10} {f'page {args.depth + 1} ms':>12}")
+        for name, fetch, pages in cases:
+            first = time_page(db, fetch, 0, args.repeat)
+            deep = f"{time_page(db, fetch, args.depth, args.repeat):>12.2f}" if pages else f"{'-':>12}"
+            print(f"{name:<10} {first:>10.2f} {deep}")
+    finally:
+        db.rollback()
+        drop_posts(db)
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Leaderboard: SQL ranking over user_reputation vs the in-memory skip lists.
+
+"sql" answers each question the straightforward way: ORDER BY aura_points
+with LIMIT/OFFSET for a page, and COUNT(*) of users ahead for a user's
+rank. "memory" asks ReputationLeaderboard, as GET /forum/leaderboard does.
+Pages are timed at the top of the board and --offset places down; ranks
+for random users. The last line times a full rebuild from the database,
+as at startup and on every reload, and moving users after a fold.
+
+Users are throwaway rows, created up front and removed at the end. Point
+DATABASE_URL at a scratch database.
+
+Usage (from Air_Quality_Monitoring_System/):
+    python benchmarks/leaderboard.py [--users 500000] [--offset 100000] [--repeat 50]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import text
+
+from air_quality_backend.database import SessionLocal
+from air_quality_backend.utils.leaderboard import ReputationLeaderboard
+
+PREFIX = "leaderboard_bench_"
+PAGE_SIZE = 50
+MOVES = 10_000
+
+
+def create_users(db, users: int):
+    db.execute(text("""
+        INSERT INTO users (username, email, password_hash, is_active)
+        SELECT :p || g, :p || g || '@bench.invalid', 'x', true
+        FROM generate_series(1, :n) AS g
+    """), {"p": PREFIX, "n": users})
+    # Long-tailed points, as votes pile up on a few users
+    db.execute(text("""
+        INSERT INTO user_reputation (user_id, aura_points, credibility_points, streak_points)
+        SELECT user_id, floor(power(random(), 6) * 50000)::int, 50 + floor(random() * 100)::int, 0
+        FROM users WHERE username LIKE :p
+    """), {"p": PREFIX + "%"})
+    db.commit()
+    db.execute(text("ANALYZE user_reputation"))
+    db.commit()
+    return db.execute(text("SELECT user_id FROM users WHERE username LIKE :p"), {"p": PREFIX + "%"}).scalars().all()
+
+
+def drop_users(db):
+    users = "SELECT user_id FROM users WHERE username LIKE :p"
+    db.execute(text(f"DELETE FROM user_reputation WHERE user_id IN ({users})"), {"p": PREFIX + "%"})
+    db.execute(text("DELETE FROM users WHERE username LIKE :p"), {"p": PREFIX + "%"})
+    db.commit()
+
+
+def sql_page(db, offset: int):
+    return db.execute(text("""
+        SELECT user_id, aura_points, credibility_points FROM user_reputation
+        ORDER BY aura_points DESC, user_id
+        LIMIT :limit OFFSET :offset
+    """), {"limit": PAGE_SIZE, "offset": offset}).all()
+
+
+def sql_rank(db, user_id: int):
+    return db.execute(text("""
+        SELECT count(*) + 1 FROM user_reputation r, user_reputation me
+        WHERE me.user_id = :user_id
+          AND (r.aura_points > me.aura_points OR (r.aura_points = me.aura_points AND r.user_id < me.user_id))
+    """), {"user_id": user_id}).scalar()
+
+
+def median_ms(call, arguments, repeat: int) -> float:
+    samples = []
+    for n in range(repeat):
+        argument = arguments[n % len(arguments)]
+        start = time.perf_counter()
+        call(argument)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=500_000)
+    parser.add_argument("--offset", type=int, default=100_000, help="rank of the deep page")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user_ids = create_users(db, args.users)
+        rng = random.Random(0)
+        sample = rng.sample(user_ids, min(args.repeat, len(user_ids)))
+
+        board = ReputationLeaderboard()
+        start = time.perf_counter()
+        board.load(db)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        cases = [
+            ("sql", lambda offset: sql_page(db, offset), lambda user_id: sql_rank(db, user_id)),
+            ("memory", lambda offset: board.top(db, "aura", offset, PAGE_SIZE),
+             lambda user_id: board.rank(db, user_id)),
+        ]
+        print(f"{len(board):,} users, pages of {PAGE_SIZE}")
+        print(f"{'mode':<8} {'top ms':>8} {f'@{args.offset:,} ms':>12} {'rank ms':>8}")
+        for name, page, rank in cases:
+            top = median_ms(page, [0], args.repeat)
+            deep = median_ms(page, [args.offset], args.repeat)
+            ranked = median_ms(rank, sample, args.repeat)
+            print(f"{name:<8} {top:>8.2f} {deep:>12.2f} {ranked:>8.3f}")
+
+        moves = {
+            user_id: (rng.randrange(50000), rng.randrange(50, 150), 0)
+            for user_id in rng.sample(user_ids, min(MOVES, len(user_ids)))
+        }
+        start = time.perf_counter()
+        board.update(moves)
+        update_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        board.load(db)
+        reload_ms = (time.perf_counter() - start) * 1000
+        print(f"load at startup {load_ms:,.0f} ms, periodic reload {reload_ms:,.0f} ms; "
+              f"moving {len(moves):,} users {update_ms:,.0f} ms ({update_ms * 1000 / len(moves):.1f} us each)")
+    finally:
+        db.rollback()
+        drop_users(db)
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
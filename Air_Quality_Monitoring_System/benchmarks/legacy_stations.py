@@ -0,0 +1,160 @@
+"""
+Legacy station API: per-station latest-reading queries vs the shared snapshot.
+
+"per-station" is what GET /stations in backend/api.py used to do: load
+every station, then run one ORDER BY timestamp DESC LIMIT 1 query per
+station for its newest reading. "snapshot cold" rebuilds LatestSnapshot
+(one stations query plus one DISTINCT ON over measurements), as the first
+request after the TTL does; "snapshot warm" serves the list from the built
+snapshot, as every other request does. Each is timed for the whole station
+list and for a single GET /station/{id}, at every station count given.
+
+Stations and their readings are throwaway rows, created up front and
+removed after each size. Point DATABASE_URL at a scratch database.
+
+Usage (from Air_Quality_Monitoring_System/):
+    python benchmarks/legacy_stations.py [--stations 50 500 5000] [--readings 100] [--repeat 10]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+# The legacy API lives next to the main app, at the repository root
+sys.path.insert(0, os.path.dirname(ROOT))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from air_quality_backend.utils.nowcast import nowcast_buffers
+from backend.models import StationInfo, TSPAQI
+from backend.snapshot import POLLUTANT_FIELDS, latest_snapshot, station_payload
+
+SOURCE = "legacy_bench"
+
+
+def create_stations(db, stations: int, readings: int):
+    db.execute(text("""
+        INSERT INTO stations (station_name, latitude, longitude, source, is_active)
+        SELECT 'Bench station ' || g, 25 + random() * 20, -120 + random() * 45, :source, true
+        FROM generate_series(1, :n) AS g
+    """), {"source": SOURCE, "n": stations})
+    # Hourly readings up to now, so the snapshot's NowCast buffers have data too
+    db.execute(text("""
+        INSERT INTO measurements (station_id, "timestamp", pm25, pm10, no2, co, so2, ozone, aqi, source)
+        SELECT s.station_id, date_trunc('hour', now() AT TIME ZONE 'utc') - h * interval '1 hour',
+               round(CAST(random() * 80 AS numeric), 2), round(CAST(random() * 150 AS numeric), 2),
+               round(CAST(random() * 50 AS numeric), 2), round(CAST(random() * 5 AS numeric), 2),
+               round(CAST(random() * 20 AS numeric), 2), round(CAST(random() * 0.1 AS numeric), 2),
+               floor(random() * 200)::int, :source
+        FROM stations s, generate_series(0, :readings - 1) AS h
+        WHERE s.source = :source
+    """), {"source": SOURCE, "readings": readings})
+    db.commit()
+    db.execute(text("ANALYZE stations"))
+    db.execute(text("ANALYZE measurements"))
+    db.commit()
+    return db.execute(text("SELECT station_id FROM stations WHERE source = :source"), {"source": SOURCE}).scalars().all()
+
+
+def drop_stations(db):
+    db.execute(text("""
+        DELETE FROM measurements WHERE station_id IN (SELECT station_id FROM stations WHERE source = :source)
+    """), {"source": SOURCE})
+    db.execute(text("DELETE FROM stations WHERE source = :source"), {"source": SOURCE})
+    db.commit()
+
+
+def latest_reading(db, station_id: int):
+    return (
+        db.query(TSPAQI)
+        .filter(TSPAQI.station_id == station_id)
+        .order_by(TSPAQI.timestamp.desc())
+        .first()
+    )
+
+
+def reading_payload(station, reading) -> dict:
+    payload = {
+        "station_id": station.station_id,
+        "station_name": station.station_name,
+        "latitude": station.latitude,
+        "longitude": station.longitude,
+    }
+    payload.update({field: getattr(reading, field) if reading else "N/A" for field in POLLUTANT_FIELDS})
+    return payload
+
+
+def per_station_list(db, _station_id):
+    return [reading_payload(station, latest_reading(db, station.station_id)) for station in db.query(StationInfo).all()]
+
+
+def per_station_one(db, station_id):
+    station = db.query(StationInfo).filter(StationInfo.station_id == station_id).first()
+    return reading_payload(station, latest_reading(db, station_id))
+
+
+def snapshot_cold_list(db, _station_id):
+    latest_snapshot.invalidate()
+    return [station_payload(entry) for entry in latest_snapshot.get(db).stations]
+
+
+def snapshot_warm_list(db, _station_id):
+    return [station_payload(entry) for entry in latest_snapshot.get(db).stations]
+
+
+def snapshot_warm_one(db, station_id):
+    return station_payload(latest_snapshot.get(db).by_id[station_id])
+
+
+def median_ms(db, fetch, station_ids, repeat: int) -> float:
+    samples = []
+    for n in range(repeat):
+        start = time.perf_counter()
+        fetch(db, station_ids[n % len(station_ids)])
+        samples.append((time.perf_counter() - start) * 1000)
+        db.rollback()
+        db.expunge_all()
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stations", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--readings", type=int, default=100, help="hourly readings per station")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    # backend.database points at the developer database, so bind our own session
+    session_factory = sessionmaker(bind=create_engine(os.environ["DATABASE_URL"]))
+    cases = [
+        ("per-station", per_station_list, per_station_one),
+        ("snapshot cold", snapshot_cold_list, None),
+        ("snapshot warm", snapshot_warm_list, snapshot_warm_one),
+    ]
+    print(f"{'stations':>8} {'mode':<14} {'list ms':>10} {'one ms':>8}")
+    for stations in args.stations:
+        db = session_factory()
+        try:
+            station_ids = create_stations(db, stations, args.readings)
+            rng = random.Random(0)
+            sample = [rng.choice(station_ids) for _ in range(args.repeat)]
+            nowcast_buffers.invalidate()
+            latest_snapshot.invalidate()
+            for name, fetch_list, fetch_one in cases:
+                listed = median_ms(db, fetch_list, sample, args.repeat)
+                one = f"{median_ms(db, fetch_one, sample, args.repeat):>8.2f}" if fetch_one else f"{'-':>8}"
+                print(f"{stations:>8} {name:<14} {listed:>10.2f} {one}")
+        finally:
+            db.rollback()
+            drop_stations(db)
+            db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
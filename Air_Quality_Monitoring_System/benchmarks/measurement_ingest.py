@@ -0,0 +1,126 @@
+"""
+Bulk measurement ingest: rows per second through each stage of POST /measurements/bulk.
+
+"parse" decodes the JSON body, "validate" runs validate_measurement_rows
+and "upsert" writes the accepted rows with upsert_measurements, in batches
+of UPSERT_BATCH_SIZE. Upsert is timed twice: a first pass that inserts
+every row, then the same payload again, which updates every row in place.
+"single-row" is the baseline: one INSERT ... ON CONFLICT per reading, as
+sending each one to POST /measurements would do, on the first --single
+rows only.
+
+Stations and their readings are throwaway rows, created up front and
+removed at the end. Point DATABASE_URL at a scratch database.
+
+Usage (from Air_Quality_Monitoring_System/):
+    python benchmarks/measurement_ingest.py [--rows 50000] [--stations 500] [--single 2000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import text
+
+from air_quality_backend.database import SessionLocal
+from air_quality_backend.utils.ingest import (
+    POLLUTANT_FIELDS, known_station_ids, parse_rows, upsert_measurements, validate_measurement_rows
+)
+
+SOURCE = "ingest_bench"
+
+
+def create_stations(db, stations: int):
+    db.execute(text("""
+        INSERT INTO stations (station_name, latitude, longitude, source, is_active)
+        SELECT 'Bench station ' || g, 25 + random() * 20, -120 + random() * 45, :source, true
+        FROM generate_series(1, :n) AS g
+    """), {"source": SOURCE, "n": stations})
+    db.commit()
+    known_station_ids.invalidate()
+    return db.execute(text("SELECT station_id FROM stations WHERE source = :source"), {"source": SOURCE}).scalars().all()
+
+
+def drop_stations(db):
+    db.execute(text("""
+        DELETE FROM measurements WHERE station_id IN (SELECT station_id FROM stations WHERE source = :source)
+    """), {"source": SOURCE})
+    db.execute(text("DELETE FROM stations WHERE source = :source"), {"source": SOURCE})
+    db.commit()
+
+
+def payload(station_ids, rows: int) -> bytes:
+    """A JSON array of hourly readings, as an uploader would send it, with a mix of UTC spellings."""
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1)
+    readings = []
+    for n in range(rows):
+        station_id = station_ids[n % len(station_ids)]
+        moment = start + timedelta(hours=n // len(station_ids))
+        reading = {
+            "station_id": station_id,
+            "timestamp": moment.isoformat() + ("Z" if n % 2 else ""),
+            "source": SOURCE,
+        }
+        reading.update({field: round(rng.uniform(0, 150), 2) for field in POLLUTANT_FIELDS})
+        readings.append(reading)
+    return json.dumps(readings).encode()
+
+
+def rate(rows: int, seconds: float) -> str:
+    return f"{rows / seconds:>12,.0f}" if rows else f"{'-':>12}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000, help="readings per payload, at most MAX_BULK_ROWS")
+    parser.add_argument("--stations", type=int, default=500)
+    parser.add_argument("--single", type=int, default=2000, help="readings written one statement each")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        body = payload(create_stations(db, args.stations), args.rows)
+        print(f"{args.rows:,} readings, {len(body) / 2 ** 20:.1f} MiB of JSON")
+        print(f"{'stage':<16} {'seconds':>8} {'rows/s':>12}")
+
+        start = time.perf_counter()
+        rows = parse_rows(body, "application/json")
+        parsed = time.perf_counter() - start
+        print(f"{'parse':<16} {parsed:>8.3f} {rate(len(rows), parsed)}")
+
+        start = time.perf_counter()
+        records, errors = validate_measurement_rows(db, rows)
+        validated = time.perf_counter() - start
+        print(f"{'validate':<16} {validated:>8.3f} {rate(len(rows), validated)}")
+        if errors:
+            print(f"  {len(errors)} rows rejected, e.g. {errors[0]}")
+
+        for name in ("upsert insert", "upsert update"):
+            start = time.perf_counter()
+            upsert_measurements(db, records)
+            db.commit()
+            written = time.perf_counter() - start
+            print(f"{name:<16} {written:>8.3f} {rate(len(records), written)}")
+
+        single = records[:args.single]
+        start = time.perf_counter()
+        for record in single:
+            upsert_measurements(db, [record])
+            db.commit()
+        written = time.perf_counter() - start
+        print(f"{'single-row':<16} {written:>8.3f} {rate(len(single), written)}")
+    finally:
+        db.rollback()
+        drop_stations(db)
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Notification fan-out: per-recipient ORM loop vs chunked INSERT ... SELECT job.
+
+"loop" is what POST /notifications/send used to do inside the request:
+one User lookup per recipient, then bulk_save_objects. "job" is
+run_fanout_job, the background job the endpoint now starts. Both send to
+an explicit list of throwaway users, created up front and removed at the
+end together with their notifications; real users are never notified.
+
+Point DATABASE_URL at a scratch database.
+
+Usage (from Air_Quality_Monitoring_System/):
+    python benchmarks/notification_fanout.py [--sizes 10000 100000 1000000] [--loop-max 10000]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import text
+
+from air_quality_backend.database import SessionLocal
+from air_quality_backend.models import Notification, NotificationJob, NotificationType, User
+from air_quality_backend.utils.fanout import run_fanout_job
+
+PREFIX = "fanout_bench_"
+PAYLOAD = {"notification_type": "system_update", "title": "Benchmark", "message": "Fan-out benchmark"}
+
+
+def create_users(db, count: int):
+    have = db.execute(text("SELECT count(*) FROM users WHERE username LIKE :p"), {"p": PREFIX + "%"}).scalar()
+    if have < count:
+        db.execute(text("""
+            INSERT INTO users (username, email, password_hash, is_active)
+            SELECT :p || g, :p || g || '@bench.invalid', 'x', true
+            FROM generate_series(:start, :stop) AS g
+        """), {"p": PREFIX, "start": have + 1, "stop": count})
+        db.commit()
+    return list(db.execute(text("""
+        SELECT user_id FROM users WHERE username LIKE :p ORDER BY user_id LIMIT :n
+    """), {"p": PREFIX + "%", "n": count}).scalars())
+
+
+def clear_notifications(db):
+    db.execute(text("""
+        DELETE FROM notifications WHERE user_id IN (SELECT user_id FROM users WHERE username LIKE :p)
+    """), {"p": PREFIX + "%"})
+    db.commit()
+
+
+def loop_send(db, user_ids):
+    notifications = []
+    for user_id in user_ids:
+        user = db.query(User).get(user_id)
+        if not user:
+            continue
+        notifications.append(Notification(
+            notification_type=NotificationType.system_update,
+            title=PAYLOAD["title"],
+            message=PAYLOAD["message"],
+            user_id=user_id,
+            created_at=datetime.now(timezone.utc)
+        ))
+    db.bulk_save_objects(notifications)
+    db.commit()
+    return len(notifications)
+
+
+def job_send(db, user_ids):
+    job = NotificationJob(total_recipients=len(user_ids))
+    db.add(job)
+    db.commit()
+    run_fanout_job(job.job_id, PAYLOAD, user_ids)
+    db.expire_all()
+    job = db.get(NotificationJob, job.job_id)
+    sent = job.sent
+    db.delete(job)
+    db.commit()
+    return sent
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--loop-max", type=int, default=10000, help="largest size to run the old loop for")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(f"{'recipients':>10} {'mode':<5} {'seconds':>8} {'rows/s':>10}")
+        for size in sorted(args.sizes):
+            user_ids = create_users(db, size)
+            modes = (("loop", loop_send), ("job", job_send)) if size <= args.loop_max else (("job", job_send),)
+            for mode, send in modes:
+                clear_notifications(db)
+                start = time.perf_counter()
+                sent = send(db, user_ids)
+                elapsed = time.perf_counter() - start
+                assert sent == len(user_ids), (mode, sent)
+                print(f"{size:>10} {mode:<5} {elapsed:>8.2f} {sent / elapsed:>10,.0f}")
+    finally:
+        db.rollback()
+        clear_notifications(db)
+        db.execute(text("DELETE FROM users WHERE username LIKE :p"), {"p": PREFIX + "%"})
+        db.commit()
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
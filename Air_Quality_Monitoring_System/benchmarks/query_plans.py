@@ -0,0 +1,226 @@
+"""
+Query-plan regression check for the router hot paths.
+
+Builds the model schema (tables plus the indexes declared on the models) in
+a scratch schema of a local Postgres database, loads a synthetic dataset,
+runs EXPLAIN ANALYZE on the queries the routers issue and fails if any of
+them falls back to a sequential scan on a large table. Everything happens
+inside one transaction that is rolled back, so nothing is left behind.
+
+Usage (from Air_Quality_Monitoring_System/):
+    python benchmarks/query_plans.py [--scale 1.0] [--database-url URL]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, select, text, tuple_
+
+from air_quality_backend.database import Base
+from air_quality_backend.models import (
+    ContributionStatus, Measurement, Notification, Post, PublicContribution, Station, User
+)
+from air_quality_backend.routers.stations import recent_measurements_query
+
+PAGE = 101  # routers fetch limit + 1 to detect the next page
+SCRATCH_SCHEMA = "query_plan_check"
+
+
+def load_dataset(conn, scale: float):
+    counts = {
+        "stations": int(2000 * scale),
+        "measurements": int(1_000_000 * scale),
+        "users": int(20_000 * scale),
+        "notifications": int(500_000 * scale),
+        "contributions": int(200_000 * scale),
+        "posts": int(100_000 * scale),
+    }
+
+    statements = [
+        """INSERT INTO stations (station_id, station_name, latitude, longitude, source, is_active)
+           SELECT i, 'Bench station ' || i, (i % 180) - 90, (i % 360) - 180, 'bench', true
+           FROM generate_series(1, :stations) AS i""",
+        # Hourly readings going back in time, spread evenly over the stations
+        """INSERT INTO measurements (station_id, timestamp, pm25, pm10, aqi, source)
+           SELECT 1 + (i % :stations),
+                  date_trunc('hour', now()) - (i / :stations) * interval '1 hour',
+                  (i % 500) / 2.0, (i % 600) / 2.0, i % 300, 'bench'
+           FROM generate_series(0, :measurements - 1) AS i""",
+        """INSERT INTO users (user_id, username, email, password_hash, role, is_active)
+           SELECT i, 'bench_user_' || i,
+                  'bench_user_' || i || '@example.com', 'x', 'user', true
+           FROM generate_series(1, :users) AS i""",
+        """INSERT INTO notifications (user_id, notification_type, title, message, is_read, created_at)
+           SELECT 1 + (i % :users), 'system_update', 'Bench', 'Synthetic notification',
+                  i % 5 <> 0, now() - i * interval '1 second'
+           FROM generate_series(0, :notifications - 1) AS i""",
+        """INSERT INTO public_contributions (user_id, station_id, pm25, source, status, created_at)
+           SELECT 1 + (i % :users), 1 + (i % :stations), (i % 500) / 2.0, 'bench',
+                  (CASE WHEN i % 50 = 0 THEN 'pending' WHEN i % 3 = 0 THEN 'rejected' ELSE 'approved' END)::contribution_status,
+                  now() - i * interval '1 minute'
+           FROM generate_series(0, :contributions - 1) AS i""",
+        """INSERT INTO posts (user_id, title, content, upvotes, downvotes, created_at)
+           SELECT 1 + (i % :users), 'Bench post ' || i, 'Synthetic post', i % 40, i % 7,
+                  now() - i * interval '1 minute'
+           FROM generate_series(0, :posts - 1) AS i""",
+    ]
+    for statement in statements:
+        conn.execute(text(statement), counts)
+    for table in ("stations", "measurements", "users", "notifications", "public_contributions", "posts"):
+        conn.execute(text(f"ANALYZE {table}"))
+
+
+def router_queries():
+    """(name, statement, tables that must not be sequentially scanned)"""
+    now = datetime.now(timezone.utc)
+    station_id = 7
+    user_id = 11
+    station_ids = list(range(1, 101))
+    measurement_key = (Measurement.timestamp, Measurement.measurement_id)
+    notification_key = (Notification.created_at, Notification.notification_id)
+    contribution_key = (PublicContribution.created_at, PublicContribution.contribution_id)
+
+    def newest_first(stmt, keys):
+        return stmt.order_by(*(key.desc().nulls_first() for key in keys)).limit(PAGE)
+
+    return [
+        (
+            "GET /measurements (first page)",
+            newest_first(select(Measurement), measurement_key),
+            {"measurements"},
+        ),
+        (
+            "GET /measurements?station_id (deep cursor)",
+            newest_first(
+                select(Measurement).where(
+                    Measurement.station_id == station_id,
+                    tuple_(*measurement_key) < tuple_(now - timedelta(days=15), 0)
+                ),
+                measurement_key
+            ),
+            {"measurements"},
+        ),
+        (
+            "GET /measurements?start_time&end_time",
+            newest_first(
+                select(Measurement).where(
+                    Measurement.timestamp >= now - timedelta(days=11),
+                    Measurement.timestamp <= now - timedelta(days=10)
+                ),
+                measurement_key
+            ),
+            {"measurements"},
+        ),
+        (
+            "GET /measurements/nearby/",
+            select(Measurement).where(
+                Measurement.station_id.in_(station_ids[:10]),
+                Measurement.timestamp >= now - timedelta(hours=24)
+            ).order_by(Measurement.timestamp.desc()).limit(100),
+            {"measurements"},
+        ),
+        (
+            "GET /stations (latest reading per station)",
+            recent_measurements_query(station_ids),
+            {"measurements"},
+        ),
+        (
+            "GET /stations (page by name)",
+            select(Station).where(Station.is_active).order_by(
+                Station.station_name.asc().nulls_last(), Station.station_id.asc().nulls_last()
+            ).limit(PAGE),
+            {"stations"},
+        ),
+        (
+            "GET /notifications",
+            newest_first(select(Notification).where(Notification.user_id == user_id), notification_key),
+            {"notifications"},
+        ),
+        (
+            "GET /notifications?is_read=false",
+            newest_first(
+                select(Notification).where(
+                    Notification.user_id == user_id,
+                    Notification.is_read == False  # noqa: E712
+                ),
+                notification_key
+            ),
+            {"notifications"},
+        ),
+        (
+            "GET /contributions?status_filter=pending",
+            newest_first(
+                select(PublicContribution).where(
+                    PublicContribution.status == ContributionStatus.pending
+                ),
+                contribution_key
+            ),
+            {"public_contributions"},
+        ),
+        (
+            "GET /contributions",
+            newest_first(select(PublicContribution), contribution_key),
+            {"public_contributions"},
+        ),
+        (
+            "GET /forum/posts",
+            newest_first(select(Post, User.username).join(User), (Post.created_at, Post.post_id)),
+            {"posts"},
+        ),
+    ]
+
+
+def seq_scanned(plan: dict) -> set:
+    found = set()
+    if plan.get("Node Type") == "Seq Scan":
+        found.add(plan.get("Relation Name"))
+    for child in plan.get("Plans", ()):
+        found |= seq_scanned(child)
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="dataset size multiplier (1.0 = 1M measurements)")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+
+    engine = create_engine(args.database_url)
+    failures = 0
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            conn.execute(text(f"CREATE SCHEMA {SCRATCH_SCHEMA}"))
+            conn.execute(text(f"SET LOCAL search_path TO {SCRATCH_SCHEMA}"))
+            Base.metadata.create_all(conn)
+            print(f"Loading synthetic dataset (scale={args.scale}) ...")
+            load_dataset(conn, args.scale)
+
+            print(f"{'query':<48} {'ms':>9}  result")
+            for name, stmt, guarded in router_queries():
+                sql = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+                (plan_json,) = conn.exec_driver_sql(
+                    "EXPLAIN (ANALYZE, FORMAT JSON) " + str(sql).replace("%", "%%")
+                ).one()
+                plan = plan_json[0]
+                scanned = seq_scanned(plan["Plan"]) & guarded
+                failures += bool(scanned)
+                result = "SEQ SCAN on " + ", ".join(sorted(scanned)) if scanned else "ok"
+                print(f"{name:<48} {plan['Execution Time']:>9.2f}  {result}")
+        finally:
+            trans.rollback()
+
+    if failures:
+        print(f"{failures} query plan(s) regressed to sequential scans")
+        return 1
+    print("All query plans use indexes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
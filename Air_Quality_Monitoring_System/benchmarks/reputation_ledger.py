@@ -0,0 +1,174 @@
+"""
+Reputation writes: per-interaction read-modify-write vs the event ledger.
+
+Every interaction is an upvote on a post: the vote row is written and the
+post's author earns one aura point. "direct" is what the vote handlers
+used to do: commit the vote, then load the author's UserReputation, add
+one and commit again. "ledger" appends a reputation event inside the vote
+transaction while a background thread folds the ledger into
+user_reputation, as the reputation aggregator does. Votes go to a few
+authors with a long tail, so concurrent handlers keep hitting the same
+reputation rows. Both modes report interactions per second and how many
+points went missing; "fold" then times folding a large backlog of events
+in one pass, and a full recompute from the ledger.
+
+Voters, authors and their posts are throwaway rows, created up front and
+removed at the end. Point DATABASE_URL at a scratch database.
+
+Usage (from Air_Quality_Monitoring_System/):
+    python benchmarks/reputation_ledger.py [--interactions 20000] [--threads 16] [--authors 50] [--backlog 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import text
+
+from air_quality_backend.database import SessionLocal
+from air_quality_backend.models import ReputationEventType, UserReputation, VoteTarget
+from air_quality_backend.utils.reputation import (
+    REPUTATION_FOLD_SECONDS, fold_reputation_events, record_events, recompute_reputation
+)
+from air_quality_backend.utils.votes import set_vote
+
+PREFIX = "reputation_bench_"
+
+
+def create_users(db, voters: int, authors: int):
+    db.execute(text("""
+        INSERT INTO users (username, email, password_hash, is_active)
+        SELECT :p || g, :p || g || '@bench.invalid', 'x', true
+        FROM generate_series(1, :n) AS g
+    """), {"p": PREFIX, "n": voters + authors})
+    ids = db.execute(text("SELECT user_id FROM users WHERE username LIKE :p ORDER BY user_id"),
+                     {"p": PREFIX + "%"}).scalars().all()
+    author_ids = ids[:authors]
+    post_ids = db.execute(text("""
+        INSERT INTO posts (user_id, title, content, created_at, updated_at)
+        SELECT user_id, 'Post', 'Benchmark post', now(), now() FROM unnest(CAST(:ids AS integer[])) AS user_id
+        RETURNING post_id
+    """), {"ids": author_ids}).scalars().all()
+    db.execute(text("""
+        INSERT INTO user_reputation (user_id, aura_points, credibility_points, streak_points)
+        SELECT user_id, 0, 100, 0 FROM unnest(CAST(:ids AS integer[])) AS user_id
+    """), {"ids": author_ids})
+    db.commit()
+    return ids[authors:], list(zip(post_ids, author_ids))
+
+
+def drop_users(db):
+    users = "SELECT user_id FROM users WHERE username LIKE :p"
+    for table in ("votes", "reputation_events", "user_reputation", "posts"):
+        db.execute(text(f"DELETE FROM {table} WHERE user_id IN ({users})"), {"p": PREFIX + "%"})
+    db.execute(text("DELETE FROM users WHERE username LIKE :p"), {"p": PREFIX + "%"})
+    db.commit()
+
+
+def reset(db, author_ids):
+    users = "SELECT user_id FROM users WHERE username LIKE :p"
+    db.execute(text(f"DELETE FROM votes WHERE user_id IN ({users})"), {"p": PREFIX + "%"})
+    db.execute(text(f"DELETE FROM reputation_events WHERE user_id IN ({users})"), {"p": PREFIX + "%"})
+    db.execute(text("UPDATE user_reputation SET aura_points = 0 WHERE user_id = ANY(:ids)"), {"ids": author_ids})
+    db.commit()
+
+
+def direct_upvote(db, voter_id: int, post_id: int, author_id: int):
+    upvoted, _ = set_vote(db, voter_id, VoteTarget.post, post_id, 1)
+    db.commit()
+    if upvoted > 0:
+        reputation = db.query(UserReputation).filter(UserReputation.user_id == author_id).first()
+        reputation.aura_points += 1
+        db.commit()
+
+
+def ledger_upvote(db, voter_id: int, post_id: int, author_id: int):
+    upvoted, _ = set_vote(db, voter_id, VoteTarget.post, post_id, 1)
+    if upvoted > 0:
+        record_events(db, [(author_id, ReputationEventType.upvote_received)])
+    db.commit()
+
+
+def run(upvote, interactions, threads: int, fold: bool) -> float:
+    """Seconds for `threads` workers to get through `interactions`, folding alongside if asked."""
+    done = threading.Event()
+
+    def folder():
+        while not done.wait(REPUTATION_FOLD_SECONDS):
+            with SessionLocal() as db:
+                fold_reputation_events(db)
+
+    def worker(chunk):
+        with SessionLocal() as db:
+            for interaction in chunk:
+                upvote(db, *interaction)
+
+    background = threading.Thread(target=folder) if fold else None
+    workers = [threading.Thread(target=worker, args=(interactions[i::threads],)) for i in range(threads)]
+    start = time.perf_counter()
+    if background:
+        background.start()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    if background:
+        background.join()
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--interactions", type=int, default=20_000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--authors", type=int, default=50)
+    parser.add_argument("--backlog", type=int, default=1_000_000, help="events for the fold timing")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        voters, posts = create_users(db, args.interactions, args.authors)
+        author_ids = [author_id for _, author_id in posts]
+        rng = random.Random(0)
+        # One vote per voter, mostly on the first few authors' posts
+        weights = [1 / (rank + 1) for rank in range(len(posts))]
+        interactions = [(voter_id, *rng.choices(posts, weights)[0]) for voter_id in voters]
+
+        print(f"{args.interactions:,} upvotes, {args.threads} threads, {args.authors} authors")
+        print(f"{'mode':<8} {'upvotes/s':>10} {'points lost':>12}")
+        for name, upvote, fold in (("direct", direct_upvote, False), ("ledger", ledger_upvote, True)):
+            reset(db, author_ids)
+            elapsed = run(upvote, interactions, args.threads, fold)
+            fold_reputation_events(db)
+            awarded = db.execute(text("SELECT sum(aura_points) FROM user_reputation WHERE user_id = ANY(:ids)"),
+                                 {"ids": author_ids}).scalar()
+            db.commit()
+            print(f"{name:<8} {len(interactions) / elapsed:>10.0f} {len(interactions) - awarded:>12,}")
+
+        db.execute(text("""
+            INSERT INTO reputation_events (user_id, event_type, aura_delta)
+            SELECT (CAST(:ids AS integer[]))[1 + g % :n], 'upvote_received', 1
+            FROM generate_series(1, :backlog) AS g
+        """), {"ids": voters, "n": len(voters), "backlog": args.backlog})
+        db.commit()
+        start = time.perf_counter()
+        folded = fold_reputation_events(db)
+        print(f"fold     {args.backlog:,} events into {len(folded):,} users in {time.perf_counter() - start:.2f} s")
+        start = time.perf_counter()
+        rebuilt = recompute_reputation(db)
+        print(f"recompute {rebuilt:,} users from the ledger in {time.perf_counter() - start:.2f} s")
+    finally:
+        db.rollback()
+        drop_users(db)
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Station responses: eager-loading every measurement vs the LATERAL latest-N query.
+
+"eager" is what GET /stations used to do: joinedload(Station.measurements)
+on a page of stations, which pulls every reading those stations ever took
+into the session. "lateral" runs recent_measurements_query, as the routers
+do now, for the latest reading (--latest 1, the default) of each station on
+the same page. Each is timed over the page of --page stations, and its peak
+Python allocation is measured with tracemalloc in a separate, untimed run.
+
+Stations and their hourly readings are throwaway rows, created up front
+and removed after each size; the table holds stations x readings rows.
+Point DATABASE_URL at a scratch database.
+
+Usage (from Air_Quality_Monitoring_System/):
+    python benchmarks/station_measurements.py [--stations 500] [--readings 400 4000] [--page 100] [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import text
+from sqlalchemy.orm import joinedload
+
+from air_quality_backend.database import SessionLocal
+from air_quality_backend.models import Station
+from air_quality_backend.routers.stations import recent_measurements_query
+
+SOURCE = "station_measurements_bench"
+
+
+def create_stations(db, stations: int, readings: int):
+    db.execute(text("""
+        INSERT INTO stations (station_name, latitude, longitude, source, is_active)
+        SELECT 'Bench station ' || lpad(CAST(g AS text), 6, '0'), 25 + random() * 20, -120 + random() * 45,
+               :source, true
+        FROM generate_series(1, :n) AS g
+    """), {"source": SOURCE, "n": stations})
+    db.execute(text("""
+        INSERT INTO measurements (station_id, "timestamp", pm25, pm10, no2, co, so2, ozone, aqi, source)
+        SELECT s.station_id, date_trunc('hour', now() AT TIME ZONE 'utc') - h * interval '1 hour',
+               round(CAST(random() * 80 AS numeric), 2), round(CAST(random() * 150 AS numeric), 2),
+               round(CAST(random() * 50 AS numeric), 2), round(CAST(random() * 5 AS numeric), 2),
+               round(CAST(random() * 20 AS numeric), 2), round(CAST(random() * 0.1 AS numeric), 2),
+               floor(random() * 200)::int, :source
+        FROM stations s, generate_series(0, :readings - 1) AS h
+        WHERE s.source = :source
+    """), {"source": SOURCE, "readings": readings})
+    db.commit()
+    db.execute(text("ANALYZE stations"))
+    db.execute(text("ANALYZE measurements"))
+    db.commit()
+
+
+def drop_stations(db):
+    db.execute(text("""
+        DELETE FROM measurements WHERE station_id IN (SELECT station_id FROM stations WHERE source = :source)
+    """), {"source": SOURCE})
+    db.execute(text("DELETE FROM stations WHERE source = :source"), {"source": SOURCE})
+    db.commit()
+
+
+def station_page(db, page: int):
+    return db.query(Station).filter(Station.source == SOURCE).order_by(Station.station_name).limit(page)
+
+
+def eager(db, page: int, _latest: int) -> int:
+    stations = station_page(db, page).options(joinedload(Station.measurements)).all()
+    return sum(len(station.measurements) for station in stations)
+
+
+def lateral(db, page: int, latest: int) -> int:
+    station_ids = [station.station_id for station in station_page(db, page)]
+    return len(db.scalars(recent_measurements_query(station_ids, limit=latest)).all())
+
+
+def run(db, fetch, page: int, latest: int) -> int:
+    try:
+        return fetch(db, page, latest)
+    finally:
+        db.rollback()
+        db.expunge_all()
+
+
+def median_ms(db, fetch, page: int, latest: int, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(db, fetch, page, latest)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def peak_mib(db, fetch, page: int, latest: int):
+    tracemalloc.start()
+    try:
+        loaded = run(db, fetch, page, latest)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return loaded, peak / 2 ** 20
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stations", type=int, default=500)
+    parser.add_argument("--readings", type=int, nargs="+", default=[400, 4000], help="hourly readings per station")
+    parser.add_argument("--page", type=int, default=100, help="stations per response, as GET /stations?limit=")
+    parser.add_argument("--latest", type=int, default=1, help="readings per station, as measurements_limit=")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cases = [("eager", eager), ("lateral", lateral)]
+    print(f"{'measurements':>12} {'mode':<8} {'loaded':>9} {'median ms':>10} {'peak MiB':>9}")
+    for readings in args.readings:
+        db = SessionLocal()
+        try:
+            create_stations(db, args.stations, readings)
+            for name, fetch in cases:
+                elapsed = median_ms(db, fetch, args.page, args.latest, args.repeat)
+                loaded, peak = peak_mib(db, fetch, args.page, args.latest)
+                print(f"{args.stations * readings:>12,} {name:<8} {loaded:>9,} {elapsed:>10.1f} {peak:>9.1f}")
+        finally:
+            db.rollback()
+            drop_stations(db)
+            db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
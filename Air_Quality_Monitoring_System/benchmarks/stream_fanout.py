@@ -0,0 +1,108 @@
+"""
+Fan-out of the measurement stream hub to thousands of local subscribers.
+
+Every subscriber follows a run of neighbouring stations, the way a map
+viewport does, and drains its batches like the SSE/WebSocket handlers.
+Readings are published in bursts, with a few hot stations reporting far
+more often than the rest, so coalescing has something to do. No database
+or HTTP is involved: this measures the hub itself.
+
+Usage (from Air_Quality_Monitoring_System/):
+    python benchmarks/stream_fanout.py [--subscribers 5000] [--stations 500] [--seconds 10]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from air_quality_backend.utils.stream import MeasurementHub
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(args):
+    hub = MeasurementHub()
+    rng = random.Random(1)
+    published_at = []
+    latencies = []
+    received = {"batches": 0, "events": 0}
+
+    subscriptions = []
+    for _ in range(args.subscribers):
+        first = rng.randrange(args.stations)
+        stations = [(first + i) % args.stations for i in range(args.viewport)]
+        subscriptions.append(hub.subscribe(stations, args.interval))
+
+    async def consume(subscription):
+        while True:
+            batch = await subscription.next_batch()
+            now = time.perf_counter()
+            received["batches"] += 1
+            received["events"] += len(batch)
+            latencies.extend(now - published_at[event["source"]] for event in batch)
+
+    consumers = [asyncio.ensure_future(consume(s)) for s in subscriptions]
+    hot = list(range(0, args.stations, max(1, args.stations // 10)))
+
+    deliveries = 0
+    publish_time = 0.0
+    bursts = int(args.seconds / args.burst_every)
+    for _ in range(bursts):
+        records = []
+        for _ in range(args.burst_size):
+            station_id = rng.choice(hot) if rng.random() < 0.5 else rng.randrange(args.stations)
+            records.append({
+                "station_id": station_id,
+                "timestamp": datetime.now(timezone.utc),
+                "pm25": rng.uniform(0, 80),
+                "aqi": rng.randrange(200),
+                "source": len(published_at) + len(records),
+            })
+        start = time.perf_counter()
+        published_at.extend([start] * len(records))
+        deliveries += hub.publish(records)
+        publish_time += time.perf_counter() - start
+        await asyncio.sleep(args.burst_every)
+
+    # Let the last interval drain
+    await asyncio.sleep(args.interval * 1.5)
+    for consumer in consumers:
+        consumer.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+
+    coalesced = sum(s.coalesced for s in subscriptions)
+    ms = [latency * 1000 for latency in latencies]
+    print(f"{args.subscribers} subscribers x {args.viewport} stations, {len(published_at)} readings published")
+    print(f"publish:   {len(published_at) / publish_time:,.0f} readings/s, "
+          f"{deliveries / publish_time:,.0f} deliveries/s, {publish_time * 1000:.0f} ms total")
+    print(f"delivered: {received['batches']:,} batches, {received['events']:,} events, "
+          f"{coalesced:,} coalesced ({coalesced / max(deliveries, 1):.0%} of deliveries)")
+    if ms:
+        print(f"latency:   p50 {statistics.median(ms):.0f} ms, p99 {percentile(ms, 99):.0f} ms, "
+              f"max {max(ms):.0f} ms (interval {args.interval * 1000:.0f} ms)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--stations", type=int, default=500)
+    parser.add_argument("--viewport", type=int, default=25, help="stations per subscriber")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--burst-size", type=int, default=200, help="readings per publish")
+    parser.add_argument("--burst-every", type=float, default=0.1, help="seconds between publishes")
+    parser.add_argument("--interval", type=float, default=1.0, help="coalescing interval")
+    asyncio.run(run(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""station name trigram indexes
+
+Revision ID: 5b1e9c2f7a40
+Revises: 37963225ef04
+Create Date: 2026-10-18 09:12:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e9c2f7a40'
+down_revision: Union[str, None] = '37963225ef04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Backs STATION_SEARCH_BACKEND=pg_trgm (similarity, % and ILIKE lookups).
+    # The in-memory search needs none of this, so skip where pg_trgm isn't installed.
+    available = op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).first()
+    if not available:
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_stations_station_name_trgm', 'stations', ['station_name'],
+        postgresql_using='gin', postgresql_ops={'station_name': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_stations_epa_name_trgm', 'stations', ['epa_name'],
+        postgresql_using='gin', postgresql_ops={'epa_name': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP INDEX IF EXISTS ix_stations_epa_name_trgm')
+    op.execute('DROP INDEX IF EXISTS ix_stations_station_name_trgm')
@@ -0,0 +1,36 @@
+"""unique measurement station timestamp
+
+Revision ID: 8c4f2d1a9e73
+Revises: 5b1e9c2f7a40
+Create Date: 2026-10-18 11:03:52.640217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4f2d1a9e73'
+down_revision: Union[str, None] = '5b1e9c2f7a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep the newest row of any existing duplicates so the constraint can be built
+    op.execute("""
+        DELETE FROM measurements m
+        USING measurements newer
+        WHERE m.station_id = newer.station_id
+          AND m.timestamp = newer.timestamp
+          AND m.measurement_id < newer.measurement_id
+    """)
+    op.create_unique_constraint('uix_station_timestamp', 'measurements', ['station_id', 'timestamp'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uix_station_timestamp', 'measurements', type_='unique')
@@ -0,0 +1,43 @@
+"""upvote withdrawn event
+
+Revision ID: a2e8c5f1d937
+Revises: f1c7a3e9b254
+Create Date: 2026-10-19 11:26:03.815472
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2e8c5f1d937'
+down_revision: Union[str, None] = 'f1c7a3e9b254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A new enum value cannot be used in the transaction that adds it
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE reputation_event_type ADD VALUE IF NOT EXISTS 'upvote_withdrawn' AFTER 'upvote_received'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Postgres cannot drop an enum value, so rebuild the type without it.
+    # Withdrawals keep their points as opening_balance rows, so the ledger
+    # still sums to user_reputation.
+    op.execute("UPDATE reputation_events SET event_type = 'opening_balance' WHERE event_type = 'upvote_withdrawn'")
+    op.execute("ALTER TYPE reputation_event_type RENAME TO reputation_event_type_old")
+    sa.Enum(
+        'opening_balance', 'upvote_received', 'comment_posted', 'report_verified', 'report_upheld',
+        'report_false', 'activity', name='reputation_event_type'
+    ).create(op.get_bind())
+    op.execute("""
+        ALTER TABLE reputation_events ALTER COLUMN event_type TYPE reputation_event_type
+        USING CAST(CAST(event_type AS text) AS reputation_event_type)
+    """)
+    op.execute("DROP TYPE reputation_event_type_old")
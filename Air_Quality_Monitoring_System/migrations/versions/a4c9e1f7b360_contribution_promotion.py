@@ -0,0 +1,37 @@
+"""contribution promotion
+
+Revision ID: a4c9e1f7b360
+Revises: f3a6c0d58e92
+Create Date: 2026-10-19 00:41:18.094522
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c9e1f7b360'
+down_revision: Union[str, None] = 'f3a6c0d58e92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('public_contributions', sa.Column('promoted_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'ix_public_contributions_unpromoted', 'public_contributions', ['contribution_id'],
+        unique=False,
+        postgresql_where=sa.text("status = 'approved' AND promoted_at IS NULL AND station_id IS NOT NULL")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        'ix_public_contributions_unpromoted', table_name='public_contributions',
+        postgresql_where=sa.text("status = 'approved' AND promoted_at IS NULL AND station_id IS NOT NULL")
+    )
+    op.drop_column('public_contributions', 'promoted_at')
@@ -0,0 +1,44 @@
+"""aqi rollup watermarks
+
+Revision ID: a7d3f9c21b84
+Revises: e41b7a9d0c56
+Create Date: 2026-10-18 15:02:41.377205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3f9c21b84'
+down_revision: Union[str, None] = 'e41b7a9d0c56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'aqi_aggregations',
+        sa.Column('sample_count', sa.Integer(), server_default=sa.text('0'), nullable=False)
+    )
+    op.create_unique_constraint(
+        'uix_aggregation_station_type_start', 'aqi_aggregations',
+        ['station_id', 'aggregation_type', 'start_time']
+    )
+    op.create_table('aggregation_watermarks',
+    sa.Column('station_id', sa.Integer(), nullable=False),
+    sa.Column('last_measurement_id', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['station_id'], ['stations.station_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('station_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('aggregation_watermarks')
+    op.drop_constraint('uix_aggregation_station_type_start', 'aqi_aggregations', type_='unique')
+    op.drop_column('aqi_aggregations', 'sample_count')
@@ -0,0 +1,35 @@
+"""contribution suspicion score
+
+Revision ID: b7e3d5a1c846
+Revises: a4c9e1f7b360
+Create Date: 2026-10-19 01:27:50.316209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3d5a1c846'
+down_revision: Union[str, None] = 'a4c9e1f7b360'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('public_contributions', sa.Column('suspicion_score', sa.Float(), nullable=True))
+    op.add_column('public_contributions', sa.Column('screened_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'ix_public_contributions_status_suspicion', 'public_contributions',
+        ['status', sa.text('suspicion_score DESC'), sa.text('contribution_id DESC')], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_public_contributions_status_suspicion', table_name='public_contributions')
+    op.drop_column('public_contributions', 'screened_at')
+    op.drop_column('public_contributions', 'suspicion_score')
@@ -0,0 +1,43 @@
+"""post feed scores
+
+Revision ID: c2f8a6d4e917
+Revises: b7e3d5a1c846
+Create Date: 2026-10-19 02:08:44.730158
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f8a6d4e917'
+down_revision: Union[str, None] = 'b7e3d5a1c846'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+POST_SCORE_SQL = "COALESCE(upvotes, 0) - COALESCE(downvotes, 0)"
+HOT_SCORE_SQL = (
+    f"sign({POST_SCORE_SQL}) * log(greatest(abs({POST_SCORE_SQL}), 1))"
+    " + (extract(epoch from created_at) - 1704067200) / 45000"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The forum tables predate these migrations on some installs and are missing on others
+    if not sa.inspect(op.get_bind()).has_table('posts'):
+        return
+    op.add_column('posts', sa.Column('score', sa.Integer(), sa.Computed(POST_SCORE_SQL, persisted=True), nullable=True))
+    op.add_column('posts', sa.Column('hot_score', sa.Float(), sa.Computed(HOT_SCORE_SQL, persisted=True), nullable=True))
+    op.create_index('ix_posts_score', 'posts', [sa.text('score DESC'), sa.text('post_id DESC')])
+    op.create_index('ix_posts_hot_score', 'posts', [sa.text('hot_score DESC'), sa.text('post_id DESC')])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP INDEX IF EXISTS ix_posts_hot_score')
+    op.execute('DROP INDEX IF EXISTS ix_posts_score')
+    op.execute('ALTER TABLE IF EXISTS posts DROP COLUMN IF EXISTS hot_score')
+    op.execute('ALTER TABLE IF EXISTS posts DROP COLUMN IF EXISTS score')
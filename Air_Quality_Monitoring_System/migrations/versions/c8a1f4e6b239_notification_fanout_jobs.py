@@ -0,0 +1,43 @@
+"""notification fanout jobs
+
+Revision ID: c8a1f4e6b239
+Revises: b52e8c7d1f03
+Create Date: 2026-10-18 21:06:52.118034
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8a1f4e6b239'
+down_revision: Union[str, None] = 'b52e8c7d1f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('notification_jobs',
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('pending', 'running', 'completed', 'failed', name='job_status'), server_default='pending', nullable=False),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('total_recipients', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('sent', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('last_user_id', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.user_id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_index(op.f('ix_notification_jobs_job_id'), 'notification_jobs', ['job_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_notification_jobs_job_id'), table_name='notification_jobs')
+    op.drop_table('notification_jobs')
+    sa.Enum(name='job_status').drop(op.get_bind(), checkfirst=True)
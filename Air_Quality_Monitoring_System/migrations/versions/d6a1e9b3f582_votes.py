@@ -0,0 +1,41 @@
+"""votes
+
+Revision ID: d6a1e9b3f582
+Revises: c2f8a6d4e917
+Create Date: 2026-10-19 02:51:12.604883
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6a1e9b3f582'
+down_revision: Union[str, None] = 'c2f8a6d4e917'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('votes',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('target_type', sa.Enum('post', 'comment', name='vote_target'), nullable=False),
+    sa.Column('target_id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.SmallInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'target_type', 'target_id')
+    )
+    # The forum tables predate these migrations on some installs and are missing on others
+    if sa.inspect(op.get_bind()).has_table('comments'):
+        op.add_column('comments', sa.Column('downvotes', sa.Integer(), server_default=sa.text('0'), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('ALTER TABLE IF EXISTS comments DROP COLUMN IF EXISTS downvotes')
+    op.drop_table('votes')
+    sa.Enum(name='vote_target').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,31 @@
+"""weather station time index
+
+Revision ID: d9e2b6a4c175
+Revises: c8a1f4e6b239
+Create Date: 2026-10-18 23:14:05.502917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e2b6a4c175'
+down_revision: Union[str, None] = 'c8a1f4e6b239'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_weather_conditions_station_time', 'weather_conditions',
+        ['station_id', 'measurement_time'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_weather_conditions_station_time', table_name='weather_conditions')
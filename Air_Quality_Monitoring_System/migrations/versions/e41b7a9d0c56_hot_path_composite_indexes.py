@@ -0,0 +1,63 @@
+"""hot path composite indexes
+
+Revision ID: e41b7a9d0c56
+Revises: 8c4f2d1a9e73
+Create Date: 2026-10-18 13:27:08.913442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41b7a9d0c56'
+down_revision: Union[str, None] = '8c4f2d1a9e73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Per-station reads (latest reading, station history pages) are served by
+    # uix_station_timestamp (station_id, timestamp), scanned backwards.
+    op.create_index(
+        'ix_measurements_timestamp_id', 'measurements',
+        [sa.text('timestamp DESC'), sa.text('measurement_id DESC')]
+    )
+    op.create_index(
+        'ix_notifications_user_created', 'notifications',
+        ['user_id', sa.text('created_at DESC'), sa.text('notification_id DESC')]
+    )
+    op.create_index(
+        'ix_notifications_user_unread_created', 'notifications',
+        ['user_id', sa.text('created_at DESC'), sa.text('notification_id DESC')],
+        postgresql_where=sa.text('is_read = false')
+    )
+    op.create_index(
+        'ix_public_contributions_created', 'public_contributions',
+        [sa.text('created_at DESC'), sa.text('contribution_id DESC')]
+    )
+    op.create_index(
+        'ix_public_contributions_status_created', 'public_contributions',
+        ['status', sa.text('created_at DESC'), sa.text('contribution_id DESC')]
+    )
+    # The forum tables predate these migrations on some installs and are missing on others
+    if sa.inspect(op.get_bind()).has_table('posts'):
+        op.create_index(
+            'ix_posts_created', 'posts',
+            [sa.text('created_at DESC'), sa.text('post_id DESC')]
+        )
+    op.create_index('ix_stations_name_id', 'stations', ['station_name', 'station_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_stations_name_id', table_name='stations')
+    op.execute('DROP INDEX IF EXISTS ix_posts_created')
+    op.drop_index('ix_public_contributions_status_created', table_name='public_contributions')
+    op.drop_index('ix_public_contributions_created', table_name='public_contributions')
+    op.drop_index('ix_notifications_user_unread_created', table_name='notifications')
+    op.drop_index('ix_notifications_user_created', table_name='notifications')
+    op.drop_index('ix_measurements_timestamp_id', table_name='measurements')
@@ -0,0 +1,70 @@
+"""reputation ledger
+
+Revision ID: e5b2d8f4a613
+Revises: d6a1e9b3f582
+Create Date: 2026-10-19 04:12:37.218945
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b2d8f4a613'
+down_revision: Union[str, None] = 'd6a1e9b3f582'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reputation_events',
+    sa.Column('event_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('event_type', sa.Enum('opening_balance', 'upvote_received', 'comment_posted', 'report_verified', 'report_upheld', 'report_false', 'activity', name='reputation_event_type'), nullable=False),
+    sa.Column('aura_delta', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('credibility_delta', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('txid', sa.BigInteger(), server_default=sa.text('CAST(CAST(pg_current_xact_id() AS text) AS bigint)'), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('event_id')
+    )
+    op.create_index('ix_reputation_events_txid', 'reputation_events', ['txid'], unique=False)
+    op.create_index('ix_reputation_events_user', 'reputation_events', ['user_id'], unique=False)
+    op.create_table('reputation_watermark',
+    sa.Column('watermark_id', sa.Integer(), nullable=False),
+    sa.Column('last_txid', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('watermark_id')
+    )
+    # The forum tables predate these migrations on some installs and are missing on others
+    if sa.inspect(op.get_bind()).has_table('user_reputation'):
+        # Existing totals become opening balances, and current streaks a run
+        # of activity days, so a recompute from the ledger reproduces them
+        op.execute("""
+            INSERT INTO reputation_events (user_id, event_type, aura_delta, credibility_delta)
+            SELECT user_id, 'opening_balance', COALESCE(aura_points, 0), COALESCE(credibility_points, 100) - 100
+            FROM user_reputation
+        """)
+        op.execute("""
+            INSERT INTO reputation_events (user_id, event_type, created_at)
+            SELECT r.user_id, 'activity', CAST(r.last_streak_date AS date) - d
+            FROM user_reputation r, generate_series(0, r.streak_points - 1) AS d
+            WHERE r.last_streak_date IS NOT NULL AND r.streak_points > 0
+        """)
+    # Everything above is already in user_reputation: start folding after it
+    op.execute("""
+        INSERT INTO reputation_watermark (watermark_id, last_txid)
+        VALUES (1, CAST(CAST(pg_current_xact_id() AS text) AS bigint) + 1)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('reputation_watermark')
+    op.drop_index('ix_reputation_events_user', table_name='reputation_events')
+    op.drop_index('ix_reputation_events_txid', table_name='reputation_events')
+    op.drop_table('reputation_events')
+    sa.Enum(name='reputation_event_type').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,103 @@
+"""measurement change log
+
+Revision ID: f1c7a3e9b254
+Revises: e5b2d8f4a613
+Create Date: 2026-10-19 09:41:12.604318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c7a3e9b254'
+down_revision: Union[str, None] = 'e5b2d8f4a613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('measurement_changes',
+    sa.Column('change_id', sa.BigInteger(), nullable=False),
+    sa.Column('station_id', sa.Integer(), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('txid', sa.BigInteger(), server_default=sa.text('CAST(CAST(pg_current_xact_id() AS text) AS bigint)'), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('change_id')
+    )
+    op.create_index('ix_measurement_changes_txid', 'measurement_changes', ['txid'], unique=False)
+    op.create_table('rollup_watermark',
+    sa.Column('watermark_id', sa.Integer(), nullable=False),
+    sa.Column('last_txid', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('watermark_id')
+    )
+    op.execute("""
+        CREATE OR REPLACE FUNCTION log_measurement_changes() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO measurement_changes (station_id, bucket)
+                SELECT DISTINCT station_id, date_trunc('hour', "timestamp")
+                FROM new_rows WHERE "timestamp" IS NOT NULL;
+            ELSIF TG_OP = 'UPDATE' THEN
+                INSERT INTO measurement_changes (station_id, bucket)
+                SELECT station_id, date_trunc('hour', "timestamp") FROM new_rows WHERE "timestamp" IS NOT NULL
+                UNION
+                SELECT station_id, date_trunc('hour', "timestamp") FROM old_rows WHERE "timestamp" IS NOT NULL;
+            ELSE
+                INSERT INTO measurement_changes (station_id, bucket)
+                SELECT DISTINCT station_id, date_trunc('hour', "timestamp")
+                FROM old_rows WHERE "timestamp" IS NOT NULL;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER measurements_log_insert AFTER INSERT ON measurements
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION log_measurement_changes()
+    """)
+    op.execute("""
+        CREATE TRIGGER measurements_log_update AFTER UPDATE ON measurements
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION log_measurement_changes()
+    """)
+    op.execute("""
+        CREATE TRIGGER measurements_log_delete AFTER DELETE ON measurements
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION log_measurement_changes()
+    """)
+    # Readings the old per-station watermarks had not folded yet become
+    # changes, so the first run picks them up
+    op.execute("""
+        INSERT INTO measurement_changes (station_id, bucket)
+        SELECT DISTINCT m.station_id, date_trunc('hour', m."timestamp")
+        FROM measurements m
+        LEFT JOIN aggregation_watermarks w ON w.station_id = m.station_id
+        WHERE m."timestamp" IS NOT NULL
+          AND m.measurement_id > COALESCE(w.last_measurement_id, 0)
+    """)
+    op.execute("INSERT INTO rollup_watermark (watermark_id, last_txid) VALUES (1, 0)")
+    op.drop_table('aggregation_watermarks')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table('aggregation_watermarks',
+    sa.Column('station_id', sa.Integer(), nullable=False),
+    sa.Column('last_measurement_id', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['station_id'], ['stations.station_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('station_id')
+    )
+    op.execute("DROP TRIGGER IF EXISTS measurements_log_delete ON measurements")
+    op.execute("DROP TRIGGER IF EXISTS measurements_log_update ON measurements")
+    op.execute("DROP TRIGGER IF EXISTS measurements_log_insert ON measurements")
+    op.execute("DROP FUNCTION IF EXISTS log_measurement_changes()")
+    op.drop_table('rollup_watermark')
+    op.drop_index('ix_measurement_changes_txid', table_name='measurement_changes')
+    op.drop_table('measurement_changes')
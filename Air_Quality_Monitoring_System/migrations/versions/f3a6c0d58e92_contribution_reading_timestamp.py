@@ -0,0 +1,28 @@
+"""contribution reading timestamp
+
+Revision ID: f3a6c0d58e92
+Revises: d9e2b6a4c175
+Create Date: 2026-10-19 00:02:37.861440
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a6c0d58e92'
+down_revision: Union[str, None] = 'd9e2b6a4c175'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('public_contributions', sa.Column('timestamp', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('public_contributions', 'timestamp')
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The station index structures are shared with the main app, which lives
+# next to this package
+APP_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Air_Quality_Monitoring_System"))
+if APP_ROOT not in sys.path:
+    sys.path.insert(0, APP_ROOT)
@@ -1,9 +1,10 @@
 from fastapi import FastAPI, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+from .aqi import aqi_category
 from .database import get_db
-from .models import StationInfo, TSPAQI, FactsAqi  # Corrected model name
-import math
+from .models import FactsAqi
+from .snapshot import latest_snapshot, station_payload
 import random
 
 app = FastAPI()
@@ -34,135 +35,67 @@ def get_random_fact(db: Session = Depends(get_db)):
 
 @app.get("/stations")
 def get_stations(db: Session = Depends(get_db)):
-    stations = db.query(StationInfo).all()
-    response = []
-
-    for station in stations:
-        latest_aqi = (
-            db.query(TSPAQI)  # Corrected model name
-            .filter(TSPAQI.station_id == station.station_id)
-            .order_by(TSPAQI.timestamp.desc())
-            .first()
-        )
-
-        response.append({
-            "station_id": station.station_id,
-            "station_name": station.station_name,
-            "latitude": station.latitude,
-            "longitude": station.longitude,
-            "aqi": latest_aqi.aqi if latest_aqi else "N/A",
-            "co": latest_aqi.co if latest_aqi else "N/A",
-            "no2": latest_aqi.no2 if latest_aqi else "N/A",
-            "so2": latest_aqi.so2 if latest_aqi else "N/A",
-            "ozone": latest_aqi.ozone if latest_aqi else "N/A",  # Corrected field name
-            "pm25": latest_aqi.pm25 if latest_aqi else "N/A",
-            "pm10": latest_aqi.pm10 if latest_aqi else "N/A",
-        })
-
-    return response
+    snapshot = latest_snapshot.get(db)
+    return [station_payload(entry) for entry in snapshot.stations]
 
 @app.get("/station/{station_id}")
 def get_station_by_id(station_id: int, db: Session = Depends(get_db)):
-    station = db.query(StationInfo).filter(StationInfo.station_id == station_id).first()
-    
-    if not station:
-        return {"error": "Station not found"}
-
-    latest_aqi = (
-        db.query(TSPAQI)  # Corrected model name
-        .filter(TSPAQI.station_id == station_id)
-        .order_by(TSPAQI.timestamp.desc())
-        .first()
-    )
-
-    return {
-        "station_id": station.station_id,
-        "station_name": station.station_name,
-        "latitude": station.latitude,
-        "longitude": station.longitude,
-        "aqi": latest_aqi.aqi if latest_aqi else "N/A",
-        "co": latest_aqi.co if latest_aqi else "N/A",
-        "no2": latest_aqi.no2 if latest_aqi else "N/A",
-        "so2": latest_aqi.so2 if latest_aqi else "N/A",
-        "ozone": latest_aqi.ozone if latest_aqi else "N/A",  # Corrected field name
-        "pm25": latest_aqi.pm25 if latest_aqi else "N/A",
-        "pm10": latest_aqi.pm10 if latest_aqi else "N/A",
-    }
+    entry = latest_snapshot.get(db).by_id.get(station_id)
 
-def calculate_distance(lat1, lon1, lat2, lon2):
-    return math.sqrt((lat1 - float(lat2)) ** 2 + (lon1 - float(lon2)) ** 2)
+    if not entry:
+        return {"error": "Station not found"}
 
+    return station_payload(entry)
 
 @app.get("/nearest_station")
 def get_nearest_station(lat: float, lon: float, db: Session = Depends(get_db)):
-    stations = db.query(StationInfo).all()
-    if not stations:
+    snapshot = latest_snapshot.get(db)
+    match = snapshot.geo.nearest(lat, lon)
+    if not match:
         return {"error": "No stations available"}
 
-    nearest = min(stations, key=lambda s: calculate_distance(lat, lon, s.latitude, s.longitude))
+    station_id, _ = match[0]
+    nearest = snapshot.by_id[station_id]
 
-    latest_aqi = (
-        db.query(TSPAQI)  # Corrected model name
-        .filter(TSPAQI.station_id == nearest.station_id)
-        .order_by(TSPAQI.timestamp.desc())
-        .first()
-    )
-
-    if not latest_aqi:
+    if not nearest["has_reading"]:
         return {"error": "AQI data not available"}
 
     return {
-        "station_name": nearest.station_name,
-        "latitude": nearest.latitude,
-        "longitude": nearest.longitude,
-        "aqi": latest_aqi.aqi,
-        "co": latest_aqi.co,
-        "no2": latest_aqi.no2,
-        "so2": latest_aqi.so2,
-        "ozone": latest_aqi.ozone,  # Corrected field name
-        "pm25": latest_aqi.pm25,
-        "pm10": latest_aqi.pm10,
-        "aqi_level": "good" if int(latest_aqi.aqi) < 50 else "moderate" if int(latest_aqi.aqi) < 100 else "unhealthy"
+        "station_name": nearest["station_name"],
+        "latitude": nearest["latitude"],
+        "longitude": nearest["longitude"],
+        "aqi": nearest["aqi"],
+        "co": nearest["co"],
+        "no2": nearest["no2"],
+        "so2": nearest["so2"],
+        "ozone": nearest["ozone"],
+        "pm25": nearest["pm25"],
+        "pm10": nearest["pm10"],
+        "aqi_level": aqi_category(nearest["aqi"])
     }
 
 @app.get("/station_by_name")
 def get_station_by_name(name: str, db: Session = Depends(get_db)):
-    station = db.query(StationInfo).filter(StationInfo.station_name.ilike(f"%{name}%")).first()
+    snapshot = latest_snapshot.get(db)
+    match = snapshot.search.search(name, limit=1)
 
-    if not station:
+    if not match:
         return {"error": "Station not found"}
 
-    latest_aqi = (
-        db.query(TSPAQI)  # Corrected model name
-        .filter(TSPAQI.station_id == station.station_id)
-        .order_by(TSPAQI.timestamp.desc())
-        .first()
-    )
-
-    return {
-        "station_id": station.station_id,
-        "station_name": station.station_name,
-        "latitude": station.latitude,
-        "longitude": station.longitude,
-        "aqi": latest_aqi.aqi if latest_aqi else "N/A",
-        "co": latest_aqi.co if latest_aqi else "N/A",
-        "no2": latest_aqi.no2 if latest_aqi else "N/A",
-        "so2": latest_aqi.so2 if latest_aqi else "N/A",
-        "ozone": latest_aqi.ozone if latest_aqi else "N/A",  # Corrected field name
-        "pm25": latest_aqi.pm25 if latest_aqi else "N/A",
-        "pm10": latest_aqi.pm10 if latest_aqi else "N/A",
-    }
+    station_id, _ = match[0]
+    return station_payload(snapshot.by_id[station_id])
 
 @app.get("/search_stations")
 def search_stations(query: str = Query(..., min_length=1), db: Session = Depends(get_db)):
-    stations = db.query(StationInfo).filter(StationInfo.station_name.ilike(f"%{query}%")).limit(10).all()
-    
+    snapshot = latest_snapshot.get(db)
+    stations = [snapshot.by_id[station_id] for station_id, _ in snapshot.search.search(query, limit=10)]
+
     return [
         {
-            "id": station.station_id,
-            "name": station.station_name,
-            "latitude": station.latitude,
-            "longitude": station.longitude
+            "id": station["station_id"],
+            "name": station["station_name"],
+            "latitude": station["latitude"],
+            "longitude": station["longitude"]
         }
         for station in stations
     ]
@@ -0,0 +1,20 @@
+from typing import Optional
+
+# Upper bound of each EPA AQI category
+AQI_CATEGORY_BREAKPOINTS = (
+    (50, "good"),
+    (100, "moderate"),
+    (150, "unhealthy_sensitive"),
+    (200, "unhealthy"),
+    (300, "very_unhealthy"),
+)
+
+
+def aqi_category(aqi: Optional[float]) -> Optional[str]:
+    """EPA category name for an AQI value, None when the AQI is unknown."""
+    if aqi is None:
+        return None
+    for upper, category in AQI_CATEGORY_BREAKPOINTS:
+        if round(aqi) <= upper:
+            return category
+    return "hazardous"
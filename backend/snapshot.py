@@ -0,0 +1,115 @@
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from air_quality_backend.utils.kdtree import GeoIndex
+from air_quality_backend.utils.nowcast import NOWCAST_VALUES, nowcast_buffers
+from air_quality_backend.utils.trigram import TrigramIndex
+
+from .models import StationInfo, TSPAQI
+
+# Measurements are written by the main API process, so the legacy API only
+# sees new readings through the database; re-read them at most this often.
+SNAPSHOT_TTL_SECONDS = 30
+
+POLLUTANT_FIELDS = ("aqi", "co", "no2", "so2", "ozone", "pm25", "pm10")
+
+
+class StationSnapshot:
+    """One build of the station list and its lookups; never changed once built."""
+
+    __slots__ = ("stations", "by_id", "geo", "search")
+
+    def __init__(self, entries=()):
+        self.stations = list(entries)
+        self.by_id = {entry["station_id"]: entry for entry in self.stations}
+        self.geo = GeoIndex(
+            (entry["station_id"], entry["latitude"], entry["longitude"]) for entry in self.stations
+        )
+        self.search = TrigramIndex()
+        for entry in self.stations:
+            self.search.add(entry["station_id"], entry["station_name"], entry["epa_name"])
+
+
+class LatestSnapshot:
+    """Shared, in-process view of every station and its newest measurement.
+
+    The whole snapshot is rebuilt with two set-based queries (all stations,
+    plus one DISTINCT ON over measurements) instead of one query per station.
+    NowCast values come from ring buffers that only read new measurements.
+    get() returns a StationSnapshot, and a rebuild swaps in a new one with a
+    single assignment, so a request that holds on to the one it got sees
+    stations, by_id, geo and search from the same build throughout.
+    """
+
+    def __init__(self, ttl: float = SNAPSHOT_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at = 0.0
+        self._current = StationSnapshot()
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._loaded_at > self.ttl
+
+    def invalidate(self):
+        self._loaded_at = 0.0
+
+    def refresh(self, db: Session):
+        stations = db.query(StationInfo).order_by(StationInfo.station_id).all()
+        latest = {
+            row.station_id: row
+            for row in (
+                db.query(TSPAQI)
+                .distinct(TSPAQI.station_id)
+                .order_by(TSPAQI.station_id, TSPAQI.timestamp.desc())
+                .all()
+            )
+        }
+
+        nowcast_buffers.sync(db)
+
+        entries = []
+        for station in stations:
+            reading = latest.get(station.station_id)
+            entry = {
+                "station_id": station.station_id,
+                "station_name": station.station_name,
+                "epa_name": station.epa_name,
+                "latitude": station.latitude,
+                "longitude": station.longitude,
+                "has_reading": reading is not None,
+            }
+            for field in POLLUTANT_FIELDS:
+                entry[field] = getattr(reading, field) if reading else "N/A"
+            # Smoothed values from the ring buffers, so the map does not jump on spikes
+            for key, value in nowcast_buffers.values(station.station_id).items():
+                entry[key] = round(value, 1) if value is not None else "N/A"
+            entries.append(entry)
+
+        self._current = StationSnapshot(entries)
+        self._loaded_at = time.monotonic()
+
+    def get(self, db: Session) -> StationSnapshot:
+        if self.is_stale():
+            with self._lock:
+                # Another request may have rebuilt it while we waited
+                if self.is_stale():
+                    self.refresh(db)
+        return self._current
+
+
+latest_snapshot = LatestSnapshot()
+
+
+def station_payload(entry: dict) -> dict:
+    """Public response shape shared by the station endpoints."""
+    payload = {
+        "station_id": entry["station_id"],
+        "station_name": entry["station_name"],
+        "latitude": entry["latitude"],
+        "longitude": entry["longitude"],
+    }
+    payload.update({field: entry[field] for field in POLLUTANT_FIELDS})
+    payload.update({key: entry[key] for key in NOWCAST_VALUES})
+    return payload